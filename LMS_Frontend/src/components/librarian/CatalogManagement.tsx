@@ -21,7 +21,7 @@ import { Badge } from "@/components/ui/badge";
 import { Plus } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
 import { booksService } from "@/services/books";
-import { absoluteUrl } from "@/lib/api_clean";
+import { coverVariant } from "@/lib/api_clean";
 import { AddBookForm } from "./AddBookForm";
 import { EditBookButton } from "./EditBookButton";
 
@@ -109,7 +109,8 @@ export const CatalogManagement = ({
                   <TableCell>
                     {book.cover_url ? (
                       <img
-                        src={absoluteUrl(book.cover_url)}
+                        src={coverVariant(book.cover_url, 80, 112)}
+                        loading="lazy"
                         className="w-10 h-14 object-cover rounded border"
                       />
                     ) : (
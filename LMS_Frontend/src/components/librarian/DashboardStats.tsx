@@ -23,6 +23,8 @@ type BookRow = {
 interface DashboardStatsProps {
   books: BookRow[];
   overdueBooks: BorrowRead[];
+  // all overdue borrows; overdueBooks may only hold the first page
+  overdueTotal?: number;
   overdueExpanded: boolean;
   onToggleOverdue: () => void;
 }
@@ -30,10 +32,11 @@ interface DashboardStatsProps {
 export const DashboardStats = ({
   books,
   overdueBooks,
+  overdueTotal,
   overdueExpanded,
   onToggleOverdue,
 }: DashboardStatsProps) => {
-  const overdueCount = overdueBooks.length;
+  const overdueCount = overdueTotal ?? overdueBooks.length;
 
   return (
     <div className="grid gap-4 md:grid-cols-3 mb-8">
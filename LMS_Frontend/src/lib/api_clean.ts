@@ -24,6 +24,30 @@ export function absoluteUrl(path?: string): string {
   return `${API_URL}/${path.replace(/^\/+/, "")}`;
 }
 
+// ----------------------------------------------
+// Helper: Resized cover variants
+// ----------------------------------------------
+// Content-addressed covers (/static/covers/<sha256>/thumb.jpg) can be fetched
+// at the sizes the backend allows (COVER_VARIANT_SIZES), e.g. 160x224.webp.
+// Other cover URLs are returned unchanged.
+const COVER_THUMB = /(\/static\/covers\/[0-9a-f]{64})\/thumb\.jpg$/;
+
+export function coverVariant(
+  url: string | undefined,
+  width: number,
+  height: number,
+  format: "webp" | "jpg" = "webp"
+): string {
+  const absolute = absoluteUrl(url);
+  return absolute.replace(COVER_THUMB, `$1/${width}x${height}.${format}`);
+}
+
+// srcSet for an image box of width x height CSS pixels, at 1x and 2x density
+export function coverSrcSet(url: string | undefined, width: number, height: number): string | undefined {
+  if (!url || !COVER_THUMB.test(absoluteUrl(url))) return undefined;
+  return `${coverVariant(url, width, height)} 1x, ${coverVariant(url, width * 2, height * 2)} 2x`;
+}
+
 // ----------------------------------------------
 // CORE REQUEST WRAPPER
 // ----------------------------------------------
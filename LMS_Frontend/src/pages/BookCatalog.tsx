@@ -21,7 +21,7 @@ import api from "@/lib/api_clean";
 import NotificationsBell from "@/components/NotificationsBell";
 import UserAvatar from "@/components/UserAvatar";
 import { useToast } from "@/hooks/use-toast";
-import { absoluteUrl } from "@/lib/api_clean";
+import { absoluteUrl, coverSrcSet, coverVariant } from "@/lib/api_clean";
 
 const BookCatalog = () => {
   const navigate = useNavigate();
@@ -36,6 +36,8 @@ const BookCatalog = () => {
 
   const [categories, setCategories] = useState<string[]>([]);
   const [books, setBooks] = useState<any[]>([]);
+  // cursor for the next server page; null once every match is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [borrowLoadingId, setBorrowLoadingId] = useState<number | null>(null);
@@ -44,7 +46,7 @@ const BookCatalog = () => {
   const [page, setPage] = useState(1);
   const pageSize = 9;
   const paginated = books.slice((page - 1) * pageSize, page * pageSize);
-  const hasNextPage = page * pageSize < books.length;
+  const hasNextPage = page * pageSize < books.length || !!nextCursor;
 
   // ------------------------------------------
   // Load categories
@@ -64,17 +66,18 @@ const BookCatalog = () => {
   const loadBooks = async () => {
     setIsLoading(true);
     try {
-      const data = await booksService.getBooks(undefined, {
+      const data = await booksService.getBooksPage(undefined, {
         category: filterCategory,
       });
 
       // 🔥 ensure cover_url is absolute
-      const mapped = data.map((b) => ({
+      const mapped = data.items.map((b) => ({
         ...b,
         cover_url: absoluteUrl(b.cover_url),
       }));
 
       setBooks(mapped);
+      setNextCursor(data.next_cursor ?? null);
       setError(null);
       setPage(1); // reset pagination
     } catch (err) {
@@ -90,6 +93,32 @@ const BookCatalog = () => {
     }
   };
 
+  // ------------------------------------------
+  // Next page: fetch another server page when the loaded books run out
+  // ------------------------------------------
+  const goToNextPage = async () => {
+    if ((page + 1) * pageSize > books.length && nextCursor) {
+      try {
+        const data = await booksService.getBooksPage(
+          undefined,
+          { category: filterCategory },
+          nextCursor
+        );
+        setBooks((prev) => [...prev, ...data.items]);
+        setNextCursor(data.next_cursor ?? null);
+      } catch (err) {
+        console.error(err);
+        toast({
+          variant: "destructive",
+          title: "Error",
+          description: "Failed to load more books.",
+        });
+        return;
+      }
+    }
+    setPage(page + 1);
+  };
+
   // Initial user + categories
   useEffect(() => {
     const storedUser = api.getUser();
@@ -280,7 +309,9 @@ const BookCatalog = () => {
                       <div className="w-20 h-28 bg-muted/10 rounded overflow-hidden">
                         {book.cover_url ? (
                           <img
-                            src={absoluteUrl(book.cover_url)}
+                            src={coverVariant(book.cover_url, 160, 224)}
+                            srcSet={coverSrcSet(book.cover_url, 80, 112)}
+                            loading="lazy"
                             alt=""
                             className="w-full h-full object-cover"
                           />
@@ -362,7 +393,7 @@ const BookCatalog = () => {
           )}
 
           {hasNextPage && (
-            <Button variant="outline" onClick={() => setPage(page + 1)}>
+            <Button variant="outline" onClick={goToNextPage}>
               Next
             </Button>
           )}
@@ -15,10 +15,10 @@ import { Avatar, AvatarFallback } from "@/components/ui/avatar";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Progress } from "@/components/ui/progress";
 import { ArrowLeft, BookOpen } from "lucide-react";
-import { booksService, absoluteUrl } from "@/services/books";
+import { booksService } from "@/services/books";
 import { borrowsService } from "@/services/borrows";
 import { useToast } from "@/hooks/use-toast";
-import api from "@/lib/api_clean";
+import api, { coverVariant } from "@/lib/api_clean";
 import { Skeleton } from "@/components/ui/skeleton";
 import { Input } from "@/components/ui/input";
 
@@ -199,7 +199,7 @@ const BookDetail = () => {
                     <div className="w-28 h-40 bg-muted overflow-hidden rounded">
                       {book.cover_url ? (
                         <img
-                          src={absoluteUrl(book.cover_url)}
+                          src={coverVariant(book.cover_url, 240, 336)}
                           alt={book.title}
                           className="w-full h-full object-cover"
                           onError={(e) =>
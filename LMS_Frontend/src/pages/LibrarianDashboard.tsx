@@ -74,6 +74,7 @@ const LibrarianDashboard = () => {
   const [loading, setLoading] = useState(true);
 
   const [overdueBooks, setOverdueBooks] = useState<BorrowRead[]>([]);
+  const [overdueTotal, setOverdueTotal] = useState(0);
   const [overdueExpanded, setOverdueExpanded] = useState(false);
 
   // ------------------- LOADERS -------------------
@@ -105,10 +106,12 @@ const LibrarianDashboard = () => {
 
   const loadOverdueBooks = async () => {
     try {
-      const data = await borrowsService.overdueBorrows();
-      setOverdueBooks(data || []);
+      const page = await borrowsService.overdueBorrows({ limit: 100 });
+      setOverdueBooks(page.items);
+      setOverdueTotal(page.total);
     } catch {
       setOverdueBooks([]);
+      setOverdueTotal(0);
     }
   };
 
@@ -206,6 +209,7 @@ const LibrarianDashboard = () => {
         <DashboardStats
           books={books}
           overdueBooks={overdueBooks}
+          overdueTotal={overdueTotal}
           overdueExpanded={overdueExpanded}
           onToggleOverdue={() => setOverdueExpanded((v) => !v)}
         />
@@ -55,16 +55,10 @@ const UserDashboard = () => {
 
         const bookIds = Array.from(new Set(borrowsList.map((b) => b.book_id)));
 
-        // Fetch metadata for each book
-        const bookMap: Record<number, any> = {};
-        await Promise.all(
-          bookIds.map(async (id) => {
-            try {
-              const book = await booksService.getBook(id);
-              bookMap[id] = book;
-            } catch (e) {}
-          })
-        );
+        // Fetch metadata for all books in one request
+        const bookMap: Record<number, any> = await booksService
+          .getBooksByIds(bookIds)
+          .catch(() => ({}));
 
         setBorrows(
           borrowsList.map((b) => ({
@@ -111,16 +105,9 @@ const UserDashboard = () => {
         const borrowsList = data || [];
 
         const bookIds = Array.from(new Set(borrowsList.map((b) => b.book_id)));
-        const bookMap: Record<number, any> = {};
-
-        await Promise.all(
-          bookIds.map(async (id) => {
-            try {
-              const book = await booksService.getBook(id);
-              bookMap[id] = book;
-            } catch (e) {}
-          })
-        );
+        const bookMap: Record<number, any> = await booksService
+          .getBooksByIds(bookIds)
+          .catch(() => ({}));
 
         setBorrows(
           borrowsList.map((b) => ({
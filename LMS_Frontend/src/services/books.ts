@@ -37,6 +37,20 @@ export type BookRead = {
 
 export type BookUpdate = Partial<BookCreate & { cover_url?: string }>;
 
+export type BookListOptions = {
+  category?: string;
+  subcategory?: string;
+  book_format?: string;
+  publication_year?: number;
+  shelf?: string;
+  limit?: number;
+};
+
+export type BookPage = {
+  items: BookRead[];
+  next_cursor?: string | null;
+};
+
 // --------------------------------------------------
 // Helper
 // --------------------------------------------------
@@ -65,18 +79,14 @@ export const booksService = {
   },
 
   // ----------------------------------------------
-  // List books (with optional filters)
+  // List books (with optional filters), one page at a time
+  // Pass the previous page's next_cursor to get the next one
   // ----------------------------------------------
-  getBooks: async (
+  getBooksPage: async (
     search?: string,
-    opts?: {
-      category?: string;
-      subcategory?: string;
-      book_format?: string;
-      publication_year?: number;
-      shelf?: string;
-    }
-  ): Promise<BookRead[]> => {
+    opts?: BookListOptions,
+    cursor?: string
+  ): Promise<BookPage> => {
     const params = new URLSearchParams();
 
     if (search) params.append("q", search);
@@ -87,18 +97,31 @@ export const booksService = {
     if (opts?.publication_year)
       params.append("publication_year", String(opts.publication_year));
     if (opts?.shelf) params.append("shelf", opts.shelf);
+    if (opts?.limit) params.append("limit", String(opts.limit));
+    if (cursor) params.append("cursor", cursor);
 
     const path =
       `/api/books` + (params.toString() ? `?${params.toString()}` : "");
 
     const resp = await api.get(path);
 
-    const mapped = (resp.data || []).map((b: BookRead) => ({
+    const items = (resp.data?.items || []).map((b: BookRead) => ({
       ...b,
       cover_url: absoluteUrl(b.cover_url),
     }));
 
-    return mapped;
+    return { items, next_cursor: resp.data?.next_cursor ?? null };
+  },
+
+  // ----------------------------------------------
+  // List books (first page only)
+  // ----------------------------------------------
+  getBooks: async (
+    search?: string,
+    opts?: BookListOptions
+  ): Promise<BookRead[]> => {
+    const page = await booksService.getBooksPage(search, opts);
+    return page.items;
   },
 
   // Backward compatibility wrapper
@@ -119,6 +142,20 @@ export const booksService = {
     };
   },
 
+  // ----------------------------------------------
+  // Get many books in one request (map keyed by id)
+  // ----------------------------------------------
+  getBooksByIds: async (ids: number[]): Promise<Record<number, BookRead>> => {
+    if (ids.length === 0) return {};
+    const resp = await api.get(`/api/books/batch?ids=${ids.join(",")}`);
+
+    const books: Record<number, BookRead> = {};
+    for (const [id, b] of Object.entries<BookRead>(resp.data || {})) {
+      books[Number(id)] = { ...b, cover_url: absoluteUrl(b.cover_url) };
+    }
+    return books;
+  },
+
   // ----------------------------------------------
   // Create book
   // ----------------------------------------------
@@ -26,6 +26,22 @@ export type BorrowRead = {
   };
 };
 
+export type OverdueQuery = {
+  sort?: "hours" | "fee";
+  order?: "asc" | "desc";
+  role?: string;
+  category?: string;
+  limit?: number;
+  cursor?: string;
+};
+
+export type OverduePage = {
+  items: BorrowRead[];
+  total: number;
+  total_fee: number;
+  next_cursor?: string | null;
+};
+
 // ------------------------------------------------------
 // SERVICE
 // ------------------------------------------------------
@@ -78,22 +94,32 @@ export const borrowsService = {
   },
 
   // --------------------------------------------------
-  // LIST OVERDUE BORROWS
+  // LIST OVERDUE BORROWS (one page, most overdue first)
+  // Backend: GET /api/borrows/overdue?sort=&order=&role=&category=&limit=&cursor=
+  // total / total_fee cover every overdue borrow, not just this page
   // --------------------------------------------------
-  async overdueBorrows(): Promise<BorrowRead[]> {
-    const resp = await api.fetchWithAuth(`/api/borrows/overdue`);
-
-    const list = (resp || []) as BorrowRead[];
-
-    return list.map((b) => ({
-      ...b,
-      book: b.book
-        ? {
-            ...b.book,
-            cover_url: absoluteUrl(b.book.cover_url),
-          }
-        : undefined,
-    }));
+  async overdueBorrows(params: OverdueQuery = {}): Promise<OverduePage> {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== "") query.set(key, String(value));
+    });
+    const qs = query.toString();
+    const resp = await api.fetchWithAuth(`/api/borrows/overdue${qs ? `?${qs}` : ""}`);
+
+    const page = (resp || { items: [], total: 0, total_fee: 0 }) as OverduePage;
+
+    return {
+      ...page,
+      items: (page.items || []).map((b) => ({
+        ...b,
+        book: b.book
+          ? {
+              ...b.book,
+              cover_url: absoluteUrl(b.book.cover_url),
+            }
+          : undefined,
+      })),
+    };
   },
 };
 
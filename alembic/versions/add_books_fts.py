@@ -0,0 +1,81 @@
+"""add full-text search index on books
+
+Revision ID: add_books_fts
+Revises: add_payment_fields
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = 'add_books_fts'
+down_revision = 'add_payment_fields'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The DDL is a frozen copy of backend.app.db.search_index at this revision.
+    # Migrations never import app code, so later edits there cannot change
+    # what an already applied revision did.
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+                title, author, isbn, category, subcategory,
+                content='books', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+                INSERT INTO books_fts(rowid, title, author, isbn, category, subcategory)
+                VALUES (new.id, new.title, new.author, new.isbn, new.category, new.subcategory);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+                INSERT INTO books_fts(books_fts, rowid, title, author, isbn, category, subcategory)
+                VALUES ('delete', old.id, old.title, old.author, old.isbn, old.category, old.subcategory);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS books_fts_au
+            AFTER UPDATE OF title, author, isbn, category, subcategory ON books BEGIN
+                INSERT INTO books_fts(books_fts, rowid, title, author, isbn, category, subcategory)
+                VALUES ('delete', old.id, old.title, old.author, old.isbn, old.category, old.subcategory);
+                INSERT INTO books_fts(rowid, title, author, isbn, category, subcategory)
+                VALUES (new.id, new.title, new.author, new.isbn, new.category, new.subcategory);
+            END
+        """)
+        # Backfill existing rows
+        op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        # Generated column is computed for existing rows when it is added
+        op.execute("""
+            ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(author, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(isbn, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(category, '')), 'C') ||
+                setweight(to_tsvector('simple', coalesce(subcategory, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING GIN (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS books_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS books_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS books_fts_ai")
+        op.execute("DROP TABLE IF EXISTS books_fts")
+
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_books_search_vector")
+        op.execute("ALTER TABLE books DROP COLUMN IF EXISTS search_vector")
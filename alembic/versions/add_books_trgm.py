@@ -0,0 +1,30 @@
+"""add trigram indexes for fuzzy title/author search
+
+Revision ID: add_books_trgm
+Revises: add_updated_at_columns
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = 'add_books_trgm'
+down_revision = 'add_updated_at_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Frozen copy of search_index.TRIGRAM_DDL at this revision; migrations never
+    # import app code.
+    # SQLite has no trigram support; the app keeps an in-process index instead
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING GIN (title gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_books_author_trgm ON books USING GIN (author gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_books_author_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_books_title_trgm")
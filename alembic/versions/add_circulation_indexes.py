@@ -0,0 +1,36 @@
+"""add composite indexes for circulation, payment and reservation queries
+
+Revision ID: add_circulation_indexes
+Revises: add_books_trgm
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = 'add_circulation_indexes'
+down_revision = 'add_books_trgm'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_borrows_user_id_returned_at', 'borrows', ['user_id', 'returned_at']),
+    ('ix_borrows_returned_at_due_date', 'borrows', ['returned_at', 'due_date']),
+    ('ix_borrows_borrowed_at', 'borrows', ['borrowed_at']),
+    ('ix_borrows_book_id_returned_at', 'borrows', ['book_id', 'returned_at']),
+    ('ix_borrows_payment_status_fee_applied', 'borrows', ['payment_status', 'fee_applied']),
+    ('ix_reservations_book_id_notified_created_at', 'reservations', ['book_id', 'notified', 'created_at']),
+    ('ix_reservations_user_id', 'reservations', ['user_id']),
+    ('ix_users_role', 'users', ['role']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
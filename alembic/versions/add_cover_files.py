@@ -0,0 +1,30 @@
+"""add cover_files for content-addressed, reference-counted covers
+
+Revision ID: add_cover_files
+Revises: add_circulation_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_cover_files'
+down_revision = 'add_circulation_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cover_files',
+        sa.Column('sha256', sa.String(length=64), primary_key=True),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('cover_files')
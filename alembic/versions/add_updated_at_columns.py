@@ -0,0 +1,32 @@
+"""add updated_at row version to books and borrows
+
+Revision ID: add_updated_at_columns
+Revises: add_books_fts
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_updated_at_columns'
+down_revision = 'add_books_fts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('books', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('borrows', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Set initial value for existing rows
+    op.execute("UPDATE books SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+    op.execute("UPDATE borrows SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+    op.create_index(op.f('ix_books_updated_at'), 'books', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_books_updated_at'), table_name='books')
+    op.drop_column('borrows', 'updated_at')
+    op.drop_column('books', 'updated_at')
@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from backend.app.db.session import get_db
-from backend.app.schemas.book_schema import BookCreate, BookRead, BookUpdate
+from backend.app.schemas.book_schema import BookCreate, BookPage, BookRead, BookUpdate, normalize_isbn
 from backend.app.crud import books_crud as crud_book
 from backend.app.api.depend import get_current_user, require_librarian
-from backend.app.services.catalogue import LibraryCatalogue
+from backend.app.services.catalogue import LibraryCatalogue, book_event
+from backend.app.services.book_cache import BookCache, CachedBook
+from backend.app.services.catalogue_import import CatalogueImporter, DEFAULT_BATCH_SIZE
+from backend.app.services.export import export_response
+from backend.app.services.facet_cache import FacetCache
+from backend.app.services.search_cache import CachedSearch, SearchCache
+from backend.app.services.suggest_index import SuggestIndex
+from backend.app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from backend.app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from backend.app.core.serialization import RowSerializer
+from backend.app.core.config import settings
+from backend.app.db import models
+import io
 import os
-from uuid import uuid4
+import anyio
 from fastapi.responses import JSONResponse
-from PIL import Image
-from io import BytesIO
+from backend.app.crud import cover_crud
+from backend.app.services import covers
+from backend.app.services.covers import CoverPipeline, CoverPipelineBusy, InvalidImage
+from backend.app.services.cover_variants import VariantCache
 
 router = APIRouter()
 
+# list responses skip ORM entities and per-row BookRead validation
+book_rows = RowSerializer(BookRead)
+
 # ------------------------- ADD BOOK -------------------------
 
 @router.post("/", response_model=BookRead)
@@ -23,44 +40,231 @@ def add_book(book_in: BookCreate, db: Session = Depends(get_db), _=Depends(requi
     return b
 
 
+# ------------------------- BULK IMPORT -------------------------
+
+@router.post("/import")
+def import_books(
+    file: UploadFile = File(...),
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$",
+                               description="Defaults to the file extension"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    _=Depends(require_librarian),
+):
+    """
+    Bulk-load books from a CSV (header row with BookCreate field names) or
+    NDJSON upload. Rows are upserted on ISBN in batches; existing ISBNs get
+    their copies merged like POST /api/books/. Invalid rows are reported in
+    `error_details` without aborting the import.
+    """
+    if fmt is None:
+        ext = (file.filename or "").rsplit(".", 1)[-1].lower()
+        fmt = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}.get(ext)
+        if fmt is None:
+            raise HTTPException(400, detail="Pass ?format=csv or ?format=ndjson")
+
+    # the upload is spooled to disk by Starlette; read it back line by line
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    importer = CatalogueImporter(db, batch_size=batch_size)
+    try:
+        return importer.run(lines, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(400, detail="File must be UTF-8 encoded")
+    finally:
+        lines.detach()
+
+
+# ------------------------- STREAMING EXPORT -------------------------
+
+@router.get("/export")
+def export_books(
+    fmt: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    book_format: Optional[str] = None,
+    publication_year: Optional[int] = None,
+    shelf: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _=Depends(require_librarian),
+):
+    """
+    Stream the whole (optionally filtered) catalogue as CSV or NDJSON, gzipped
+    with ?gzip=true. Memory use is constant regardless of catalogue size.
+    """
+    rows = crud_book.iter_books_for_export(
+        db,
+        q=q,
+        category=category,
+        subcategory=subcategory,
+        book_format=book_format,
+        publication_year=publication_year,
+        shelf=shelf,
+    )
+    return export_response(rows, crud_book.EXPORT_COLUMNS, fmt, "books", gzip=gzip)
+
+
 # ------------------------- LIST BOOKS -------------------------
 
-@router.get("/", response_model=List[BookRead])
+@router.get("/", response_model=BookPage)
 def list_books(
+    request: Request,
     q: Optional[str] = None,
     category: Optional[str] = None,
     subcategory: Optional[str] = None,
     book_format: Optional[str] = None,
     publication_year: Optional[int] = None,
     shelf: Optional[str] = None,
+    fuzzy: bool = Query(False, description="Typo-tolerant title/author match for q; returns the top `limit` hits"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
     db: Session = Depends(get_db),
 ):
-    if any([q, category, subcategory, book_format, publication_year, shelf]):
-        return crud_book.search_books_with_filters(
-            db,
-            q=q,
-            category=category,
-            subcategory=subcategory,
-            book_format=book_format,
-            publication_year=publication_year,
-            shelf=shelf
-        )
-    return crud_book.list_books(db)
+    """
+    Return one page of books as `{items, next_cursor}`; pass `next_cursor`
+    back as `cursor` for the next page (null on the last one). Supports
+    If-None-Match / If-Modified-Since (answers 304 when nothing changed).
+    With `fuzzy=true` the best `limit` similarity matches for `q` are
+    returned instead, without a cursor.
+    """
+    fuzzy = fuzzy and bool(q)
+    filters = dict(
+        category=category,
+        subcategory=subcategory,
+        book_format=book_format,
+        publication_year=publication_year,
+        shelf=shelf,
+    )
+    cache = SearchCache.get_instance()
+    key = SearchCache.key(q, fuzzy=fuzzy, limit=limit, cursor=cursor, **filters)
+    # updated_at rides along for the validators; the serializer ignores it
+    columns = book_rows.columns(models.Book) + [models.Book.updated_at]
+
+    hit = cache.get(key)
+    if hit is not None:
+        rows = {row.id: row for row in crud_book.get_books(db, ids=hit.ids, columns=columns)}
+        books = [rows[book_id] for book_id in hit.ids if book_id in rows]
+        next_cursor = hit.next_cursor
+    else:
+        version = cache.version
+        try:
+            if fuzzy:
+                books = crud_book.fuzzy_search_books(db, q, limit=limit, columns=columns, **filters)
+                next_cursor = None
+            elif q or any(filters.values()):
+                books, next_cursor = crud_book.search_books_with_filters(
+                    db, q=q, limit=limit, cursor=cursor, columns=columns, **filters
+                )
+            else:
+                books, next_cursor = crud_book.list_books(db, limit=limit, cursor=cursor, columns=columns)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        cache.put(key, CachedSearch([b.id for b in books], next_cursor), version)
+
+    # the page's ids, versions and cursor fully determine the response body
+    last_modified = max((b.updated_at for b in books if b.updated_at), default=None)
+    etag = make_etag("books", key, next_cursor, [(b.id, b.updated_at) for b in books])
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
+    return book_rows.page_response(books, headers, next_cursor=next_cursor)
 
 
 # ------------------------- GET UNIQUE CATEGORIES -------------------------
 
 @router.get("/categories")
-def get_book_categories(db: Session = Depends(get_db)):
-    rows = db.query(crud_book.models.Book.category).distinct().all()
-    return [r[0] for r in rows if r[0]]
+def get_book_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Distinct categories, validated against the cached facet counts: the ETag
+    is derived from the categories themselves, so checkouts and returns do
+    not change it and a revalidation costs no query while the cache is warm.
+    """
+    facets, computed_at = FacetCache.get_instance().snapshot(db)
+    categories = sorted(f["value"] for f in facets["category"])
+    etag = make_etag("categories", *categories)
+    headers = cache_headers(etag, computed_at)
+    if is_not_modified(request, etag, computed_at):
+        return not_modified(headers)
+
+    response.headers.update(headers)
+    return categories
+
+
+# ------------------------- FACET COUNTS -------------------------
+
+@router.get("/facets")
+def get_book_facets(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    book_format: Optional[str] = None,
+    publication_year: Optional[int] = None,
+    shelf: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Book counts per category, subcategory, book_format, publication_year and
+    shelf for the current search. Counts for the unfiltered catalogue are cached
+    until the next catalogue change.
+    """
+    if not any([q, category, subcategory, book_format, publication_year, shelf]):
+        return FacetCache.get_instance().get(db)
+    return crud_book.book_facets(
+        db,
+        q=q,
+        category=category,
+        subcategory=subcategory,
+        book_format=book_format,
+        publication_year=publication_year,
+        shelf=shelf,
+    )
+
+
+# ------------------------- AUTOCOMPLETE -------------------------
+
+@router.get("/suggest")
+def suggest_books(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """
+    Title, author and category completions for a search box. Served from
+    an in-memory prefix index; the database is only read to build it and,
+    every SUGGEST_INDEX_TTL_SECONDS, to check whether the catalogue changed.
+    """
+    index = SuggestIndex.get_instance()
+    index.ensure_loaded(db)
+    return index.suggest(prefix, limit)
 
 
 # ------------------------- UPLOAD COVER / GENERATE THUMBNAIL -------------------------
 
-MAX_IMAGE_SIZE_MB = 3
 ALLOWED_EXT = {"jpg", "jpeg", "png"}
 
+
+def _stored_cover_format(db: Session, sha256: str) -> Optional[str]:
+    """Format of an already stored cover with this hash, or None if it must be rendered."""
+    stored = cover_crud.get_cover_file(db, sha256)
+    return stored.format if stored is not None and covers.is_stored(sha256) else None
+
+
+def _attach_cover(db: Session, book: models.Book, sha256: str, fmt: str, size_bytes: int) -> str:
+    """Point the book at the stored cover, moving its reference count, and commit."""
+    previous = covers.cover_hash_of(book.cover_url)
+    if previous != sha256:
+        cover_crud.add_reference(db, sha256, fmt, size_bytes)
+        if previous:
+            cover_crud.drop_reference(db, previous)
+    thumb_url = covers.thumbnail_url(sha256)
+    setattr(book, "cover_url", thumb_url)
+    db.commit()
+    db.refresh(book)
+    LibraryCatalogue.get_instance().notify("book_updated", book_event(book))
+    return thumb_url
+
+
 @router.post("/{book_id}/cover")
 async def upload_cover(
     book_id: int,
@@ -68,6 +272,17 @@ async def upload_cover(
     db: Session = Depends(get_db),
     _=Depends(require_librarian),
 ):
+    """
+    Upload a JPEG or PNG cover. Files are stored under the SHA-256 of the
+    upload, so the same image uploaded again (or for another edition) reuses
+    the stored original and thumbnail without re-encoding. Database and
+    filesystem calls run in worker threads, so nothing here blocks the
+    event loop.
+    """
+    # Validate the book before touching the upload
+    book = await anyio.to_thread.run_sync(crud_book.get_book, db, book_id)
+    if not book:
+        raise HTTPException(404, detail="book not found")
 
     # Validate extension
     if not file.filename:
@@ -76,72 +291,148 @@ async def upload_cover(
     if ext not in ALLOWED_EXT:
         raise HTTPException(400, detail="Only JPG and PNG images allowed")
 
-    # Validate size
-    content = await file.read()
-    size_mb = len(content) / (1024 * 1024)
-    if size_mb > MAX_IMAGE_SIZE_MB:
-        raise HTTPException(400, detail="Image must be under 3 MB")
-
-    # Validate image content using PIL
+    # Read in chunks up to the size cap, checking the signature on the first one
     try:
-        img = Image.open(BytesIO(content))
-        img_format = img.format.lower() if img.format else None
-        if img_format not in ["jpeg", "png"]:
-            raise HTTPException(400, detail="Only JPEG and PNG images are allowed")
-        img.verify()  # Verify it's a valid image
-    except Exception:
-        raise HTTPException(400, detail="Invalid image file")
-
-    # ------------------ Save Original Image ------------------
-    covers_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "..", "..", "static", "covers")
+        content = await covers.read_upload(file, settings.COVER_MAX_UPLOAD_MB * 1024 * 1024)
+    except covers.UploadTooLarge:
+        raise HTTPException(413, detail=f"Image must be under {settings.COVER_MAX_UPLOAD_MB} MB")
+    except InvalidImage as e:
+        raise HTTPException(400, detail=str(e))
+
+    sha256 = covers.content_hash(content)
+    fmt = await anyio.to_thread.run_sync(_stored_cover_format, db, sha256)
+    reused = fmt is not None
+    if not reused:
+        # Validate and render the thumbnail on the cover pool, off the event loop
+        pipeline = CoverPipeline.get_instance()
+        try:
+            cover = await pipeline.process(content)
+        except CoverPipelineBusy:
+            raise HTTPException(503, detail="Cover processing is busy, retry shortly",
+                                headers={"Retry-After": "1"})
+        except InvalidImage as e:
+            raise HTTPException(400, detail=str(e))
+
+        fmt = cover.format
+        target = covers.cover_dir(sha256)
+        await anyio.Path(target).mkdir(parents=True, exist_ok=True)
+        await pipeline.write(os.path.join(target, f"original.{covers.ORIGINAL_EXT[fmt]}"), content)
+        await pipeline.write(os.path.join(target, covers.THUMBNAIL_NAME), cover.thumbnail)
+
+    # Move the book's reference from its previous cover to this one
+    thumb_url = await anyio.to_thread.run_sync(_attach_cover, db, book, sha256, fmt, len(content))
+    return {"cover_url": thumb_url, "sha256": sha256, "reused": reused}
+
+
+@router.post("/covers/gc")
+def collect_cover_orphans(db: Session = Depends(get_db), _=Depends(require_librarian)):
+    """Delete stored covers no book references any more (after a grace period)."""
+    return covers.collect_orphans(db)
+
+
+@router.get("/covers/stats")
+def cover_pipeline_stats(_=Depends(require_librarian)):
+    """Queue depth, admission and per-stage latency of the cover processing pool,
+    plus the rendered-variant disk cache."""
+    stats = CoverPipeline.get_instance().stats()
+    stats["variants"] = VariantCache.get_instance().stats()
+    return stats
+
+
+# ------------------------- BOOK CACHE -------------------------
+
+def _cache_entry(b) -> CachedBook:
+    return CachedBook(
+        payload=BookRead.model_validate(b).model_dump(mode="json"),
+        etag=make_etag("book", b.id, b.updated_at),
+        last_modified=b.updated_at,
     )
-    os.makedirs(covers_dir, exist_ok=True)
 
-    filename = f"{uuid4().hex}.{ext}"
-    save_path = os.path.join(covers_dir, filename)
 
-    with open(save_path, "wb") as f:
-        f.write(content)
+@router.get("/cache/stats")
+def book_cache_stats(_=Depends(require_librarian)):
+    """Hit/miss counters and sizes of the book detail and search result caches."""
+    return {
+        "books": BookCache.get_instance().stats(),
+        "search": SearchCache.get_instance().stats(),
+    }
 
-    cover_url = f"/static/covers/{filename}"
 
-    # ------------------ Generate Thumbnail ------------------
-    thumb_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "..", "..", "static", "thumbnails")
-    )
-    os.makedirs(thumb_dir, exist_ok=True)
+# ------------------------- BATCH LOOKUP -------------------------
 
-    image = Image.open(BytesIO(content))
-    image.thumbnail((300, 300))
+MAX_BATCH_LOOKUP = 500
 
-    thumb_name = f"{uuid4().hex}.jpg"
-    thumb_path = os.path.join(thumb_dir, thumb_name)
-    image.save(thumb_path, "JPEG")
 
-    thumb_url = f"/static/thumbnails/{thumb_name}"
+def _split_param(values: List[str]) -> List[str]:
+    # accept both ?ids=1,2,3 and ?ids=1&ids=2
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
 
-    # Save cover_url or thumbnail in DB
-    book = crud_book.get_book(db, book_id)
-    if not book:
-        return JSONResponse(status_code=404, content={"detail": "book not found"})
-
-    setattr(book, "cover_url", thumb_url)
-    db.commit()
-    db.refresh(book)
 
-    return {"cover_url": thumb_url}
-    
+@router.get("/batch")
+def get_books_batch(
+    ids: List[str] = Query([], description="Book ids, comma-separated or repeated"),
+    isbns: List[str] = Query([], description="ISBNs, comma-separated or repeated"),
+    db: Session = Depends(get_db),
+):
+    """
+    Resolve many books in one round trip. Returns `{id: book}` for every
+    id or ISBN found; unknown ones are simply absent. Cached books are
+    served from the book cache and the rest come from a single query.
+    """
+    try:
+        wanted_ids = list(dict.fromkeys(int(i) for i in _split_param(ids)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    # stored ISBNs are normalized by BookCreate, so match them the same way
+    wanted_isbns = list(dict.fromkeys(normalize_isbn(i) for i in _split_param(isbns)))
+    if len(wanted_ids) + len(wanted_isbns) > MAX_BATCH_LOOKUP:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_BATCH_LOOKUP} ids/isbns per request")
+
+    cache = BookCache.get_instance()
+    found = {}
+    missing_ids, missing_isbns = [], []
+    for book_id in wanted_ids:
+        entry = cache.get(book_id)
+        if entry is None:
+            missing_ids.append(book_id)
+        else:
+            found[book_id] = entry.payload
+    for isbn in wanted_isbns:
+        entry = cache.get_by_isbn(isbn)
+        if entry is None:
+            missing_isbns.append(isbn)
+        else:
+            found[entry.payload["id"]] = entry.payload
+
+    if missing_ids or missing_isbns:
+        version = cache.version
+        for b in crud_book.get_books(db, ids=missing_ids, isbns=missing_isbns):
+            entry = _cache_entry(b)
+            cache.put(entry, version)
+            found[b.id] = entry.payload
+
+    return JSONResponse(content={str(book_id): payload for book_id, payload in found.items()})
 
 
 # ------------------------- GET BOOK -------------------------
 
 @router.get("/{book_id}", response_model=BookRead)
-def get_book(book_id: int, db: Session = Depends(get_db)):
-    b = crud_book.get_book(db, book_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="book not found")
-    return b
+def get_book(book_id: int, request: Request, db: Session = Depends(get_db)):
+    cache = BookCache.get_instance()
+    entry = cache.get(book_id)
+    if entry is None:
+        version = cache.version
+        b = crud_book.get_book(db, book_id)
+        if not b:
+            raise HTTPException(status_code=404, detail="book not found")
+        entry = _cache_entry(b)
+        cache.put(entry, version)
+
+    headers = cache_headers(entry.etag, entry.last_modified)
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return not_modified(headers)
+    # already serialized, skip response_model re-validation
+    return JSONResponse(content=entry.payload, headers=headers)
 
 
 # ------------------------- UPDATE BOOK -------------------------
@@ -1,19 +1,33 @@
 from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
 from sqlalchemy.orm import Session
 
 from backend.app.api.depend import get_current_user
 from backend.app.db.session import get_db
 from backend.app.db.models import Borrow
-from backend.app.schemas.borrow_schema import BorrowRequest, BorrowRead
+from backend.app.schemas.borrow_schema import (
+    BorrowBatchRequest, BorrowBatchResult, BorrowRequest, BorrowRead, OverdueBorrowRead,
+    BorrowReturnBatchRequest, BorrowReturnBatchResult, OverduePage,
+)
 from backend.app.services.borrow_books import BorrowService
+from backend.app.services.export import export_response
 from backend.app.services.notification import NotificationManager
-from backend.app.crud.borrow_crud import list_user_borrows, list_all_borrows
+from backend.app.crud import user_crud
+from backend.app.crud.borrow_crud import (
+    BORROW_EXPORT_COLUMNS, iter_borrows_for_export, list_user_borrows, list_all_borrows,
+    list_overdue_borrows, user_borrows_version
+)
+from backend.app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from backend.app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from backend.app.core.serialization import RowSerializer
 
 
 router = APIRouter()
 
+borrow_rows = RowSerializer(BorrowRead)
+overdue_rows = RowSerializer(OverdueBorrowRead)
+
 
 @router.post("/", response_model=BorrowRead)
 def borrow_book(
@@ -36,16 +50,79 @@ def borrow_book(
     return borrow
 
 
+@router.post("/batch", response_model=BorrowBatchResult)
+def borrow_books_batch(
+    req: BorrowBatchRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Check out a stack of books for one patron in a single transaction.
+    Librarians and admins may pass `user_id` to lend on a patron's behalf.
+    Each item reports its own success or error; one notification is sent
+    for the whole batch.
+    """
+    user = current_user
+    if req.user_id is not None and req.user_id != current_user.id:
+        if current_user.role not in ["librarian", "admin"]:
+            raise HTTPException(status_code=403, detail="Access forbidden: librarians only")
+        user = user_crud.get_user(db, req.user_id)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    results = BorrowService(db).borrow_many(user, req.book_ids)
+    items = [
+        {"book_id": r["book_id"], "ok": r["borrow"] is not None, "borrow": r["borrow"], "error": r["error"]}
+        for r in results
+    ]
+    borrowed = [r["book_id"] for r in results if r["borrow"] is not None]
+    if borrowed:
+        NotificationManager.get_instance().push({
+            "type": "borrowed",
+            "user_id": user.id,
+            "book_ids": borrowed,
+        })
+
+    return {"borrowed": len(borrowed), "failed": len(results) - len(borrowed), "items": items}
+
+
+@router.post("/return/batch", response_model=BorrowReturnBatchResult)
+def return_books_batch(
+    req: BorrowReturnBatchRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Check in a pile of returns, e.g. the morning book-drop, in one transaction.
+    Accepts borrow ids and/or book ids (each book id closes that book's oldest
+    open loan). Librarians and admins may return anyone's loans; other users
+    only their own. Reservation holders are notified after the response.
+    """
+    user_id = None if current_user.role in ["librarian", "admin"] else current_user.id
+    results = BorrowService(db).return_many(req.borrow_ids, req.book_ids, user_id, background_tasks)
+    items = [dict(r, ok=r["borrow"] is not None) for r in results]
+    returned = [r["borrow_id"] for r in results if r["borrow"] is not None]
+    if returned:
+        NotificationManager.get_instance().push({
+            "type": "returned",
+            "borrow_ids": returned,
+        })
+
+    return {"returned": len(returned), "failed": len(results) - len(returned), "items": items}
+
+
 @router.post("/return/{borrow_id}", response_model=BorrowRead)
 def return_book(
     borrow_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
     service = BorrowService(db)
 
     try:
-        borrow = service.return_book(borrow_id, current_user.id)
+        borrow = service.return_book(borrow_id, current_user.id, background_tasks)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -59,6 +136,7 @@ def return_book(
 
 @router.get("/me", response_model=list[BorrowRead])
 def my_borrows(
+    request: Request,
     include_returned: bool = False,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
@@ -66,61 +144,52 @@ def my_borrows(
     """
     Return the current user's borrows.
     ?include_returned=true to show history.
+    Answers 304 to If-None-Match / If-Modified-Since when nothing changed.
     """
-    records = list_user_borrows(db, current_user.id, include_returned)
-    return records
+    count, last_modified = user_borrows_version(db, current_user.id, include_returned)
+    etag = make_etag("borrows", current_user.id, include_returned, count, last_modified)
+    headers = cache_headers(etag, last_modified, private=True)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
+
+    records = list_user_borrows(db, current_user.id, include_returned, columns=borrow_rows.columns(Borrow))
+    return borrow_rows.response(records, headers)
 
 
-@router.get("/overdue")
-def overdue_borrows(db: Session = Depends(get_db)):
+@router.get("/overdue", response_model=OverduePage)
+def overdue_borrows(
+    sort: str = Query("hours", pattern="^(hours|fee)$", description="Sort by hours overdue or current fee"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    role: Optional[str] = Query(None, description="Only borrowers with this role"),
+    category: Optional[str] = Query(None, description="Only books in this category"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+    db: Session = Depends(get_db)
+):
     """
-    Returns all overdue borrows with real-time calculated fees:
-    - not returned
-    - due_date < now
-    Includes user information and current accumulated fine
+    Returns one page of overdue borrows (not returned, due_date < now) with
+    the borrower and the real-time hours overdue and fee, all computed in
+    SQL. `total` and `total_fee` cover every matching borrow; pass
+    `next_cursor` back as `cursor` for the next page.
     """
-    from backend.app.db import models
-    now = datetime.utcnow()
-
-    # Query with user join to get username and role
-    records = (
-        db.query(Borrow, models.User.username, models.User.full_name, models.User.role)
-        .join(models.User, models.User.id == Borrow.user_id)
-        .filter(
-            Borrow.returned_at.is_(None),
-            Borrow.due_date < now  # type: ignore
+    try:
+        rows, next_cursor, total, total_fee = list_overdue_borrows(
+            db, sort=sort, descending=order == "desc", role=role, category=category,
+            limit=limit, cursor=cursor,
         )
-        .all()
-    )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Calculate real-time fees for each overdue borrow
-    results = []
-    for borrow, username, full_name, role in records:
-        time_diff = now - borrow.due_date  # type: ignore
-        hours_overdue = int(time_diff.total_seconds() / 3600)
-        if hours_overdue < 1 and time_diff.total_seconds() > 0:
-            hours_overdue = 1
-        # Initial fee of £5 + £1 for each hour overdue
-        current_fee = 5 + (hours_overdue * 1)
-        
-        results.append({
-            "id": borrow.id,
-            "user_id": borrow.user_id,
-            "username": username,
-            "full_name": full_name,
-            "role": role,
-            "book_id": borrow.book_id,
-            "borrowed_at": borrow.borrowed_at,
-            "due_date": borrow.due_date,
-            "returned_at": borrow.returned_at,
-            "hours_overdue": hours_overdue,
-            "current_fee": current_fee,
-            "fee_applied": borrow.fee_applied,
-            "payment_status": borrow.payment_status,
-            "paid_at": borrow.paid_at,
-        })
+    return overdue_rows.page_response(rows, total=total, total_fee=total_fee, next_cursor=next_cursor)
 
-    return results
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} format. Use YYYY-MM-DD")
 
 
 @router.get("/all", response_model=list[BorrowRead])
@@ -141,20 +210,8 @@ def get_all_borrows(
         raise HTTPException(status_code=403, detail="Access forbidden: librarians only")
     
     # Parse dates if provided
-    start_datetime = None
-    end_datetime = None
-    
-    if start_date:
-        try:
-            start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid start_date format. Use YYYY-MM-DD")
-    
-    if end_date:
-        try:
-            end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
+    start_datetime = _parse_date(start_date, "start_date")
+    end_datetime = _parse_date(end_date, "end_date")
     
     # Get filtered borrows
     borrows = list_all_borrows(
@@ -162,7 +219,38 @@ def get_all_borrows(
         start_date=start_datetime,
         end_date=end_datetime,
         category=category,
-        include_returned=include_returned
+        include_returned=include_returned,
+        columns=borrow_rows.columns(Borrow),
     )
     
-    return borrows
+    return borrow_rows.response(borrows)
+
+
+@router.get("/export")
+def export_borrows(
+    fmt: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    start_date: Optional[str] = Query(None, description="Filter from this date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Filter until this date (YYYY-MM-DD)"),
+    category: Optional[str] = Query(None, description="Filter by book category"),
+    include_returned: bool = Query(True, description="Include returned books"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Stream the borrow history matching the /all filters as CSV or NDJSON,
+    gzipped with ?gzip=true, with borrower and book fields on every row.
+    Memory use is constant however long the history is.
+    Only accessible by librarians and admins.
+    """
+    if current_user.role not in ["librarian", "admin"]:
+        raise HTTPException(status_code=403, detail="Access forbidden: librarians only")
+
+    rows = iter_borrows_for_export(
+        db,
+        start_date=_parse_date(start_date, "start_date"),
+        end_date=_parse_date(end_date, "end_date"),
+        category=category,
+        include_returned=include_returned,
+    )
+    return export_response(rows, BORROW_EXPORT_COLUMNS, fmt, "borrows", gzip=gzip)
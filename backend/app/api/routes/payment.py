@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import null
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -8,6 +9,7 @@ from backend.app.api.depend import get_current_user
 from backend.app.db.session import get_db
 from backend.app.services.payment import PaymentService
 from backend.app.schemas.borrow_schema import BorrowRead, BorrowWithUserRead
+from backend.app.core.serialization import RowSerializer
 
 
 router = APIRouter()
@@ -40,6 +42,9 @@ class PaymentHistoryItem(BaseModel):
     book_title: Optional[str] = None
 
 
+history_rows = RowSerializer(PaymentHistoryItem)
+
+
 @router.post("/pay/{borrow_id}")
 def pay_late_fee(
     borrow_id: int,
@@ -246,7 +251,10 @@ def get_payment_history(
     from backend.app.db import models
     
     query = (
-        db.query(models.Borrow, models.Book)
+        db.query(*history_rows.columns(
+            models.Borrow,
+            username=null(), full_name=null(), role=null(), book_title=models.Book.title,
+        ))
         .outerjoin(models.Book, models.Borrow.book_id == models.Book.id)
         .filter(
             models.Borrow.user_id == current_user.id,
@@ -258,24 +266,7 @@ def get_payment_history(
         query = query.filter(models.Borrow.payment_status == status_filter)
     
     query = query.order_by(models.Borrow.borrowed_at.desc())  # type: ignore
-    results = query.all()
-    
-    history = []
-    for borrow, book in results:
-        history.append({
-            "id": borrow.id,
-            "user_id": borrow.user_id,
-            "book_id": borrow.book_id,
-            "borrowed_at": borrow.borrowed_at,
-            "due_date": borrow.due_date,
-            "returned_at": borrow.returned_at,
-            "fee_applied": borrow.fee_applied,
-            "payment_status": borrow.payment_status,
-            "paid_at": borrow.paid_at,
-            "book_title": book.title if book else None
-        })
-    
-    return history
+    return history_rows.response(query.all())
 
 
 @router.get("/all-history", response_model=List[PaymentHistoryItem])
@@ -295,7 +286,11 @@ def get_all_payment_history(
     from backend.app.db import models
     
     query = (
-        db.query(models.Borrow, models.User, models.Book)
+        db.query(*history_rows.columns(
+            models.Borrow,
+            username=models.User.username, full_name=models.User.full_name, role=models.User.role,
+            book_title=models.Book.title,
+        ))
         .join(models.User, models.Borrow.user_id == models.User.id)
         .outerjoin(models.Book, models.Borrow.book_id == models.Book.id)
         .filter(
@@ -308,24 +303,4 @@ def get_all_payment_history(
         query = query.filter(models.Borrow.payment_status == status_filter)
     
     query = query.order_by(models.Borrow.borrowed_at.desc()).limit(limit)  # type: ignore
-    results = query.all()
-    
-    history = []
-    for borrow, user, book in results:
-        history.append({
-            "id": borrow.id,
-            "user_id": borrow.user_id,
-            "book_id": borrow.book_id,
-            "borrowed_at": borrow.borrowed_at,
-            "due_date": borrow.due_date,
-            "returned_at": borrow.returned_at,
-            "fee_applied": borrow.fee_applied,
-            "payment_status": borrow.payment_status,
-            "paid_at": borrow.paid_at,
-            "username": user.username,
-            "full_name": user.full_name,
-            "role": user.role,
-            "book_title": book.title if book else None
-        })
-    
-    return history
+    return history_rows.response(query.all())
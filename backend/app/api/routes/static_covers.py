@@ -0,0 +1,30 @@
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+
+from backend.app.core.config import settings
+from backend.app.core.static_files import cached_file_response
+from backend.app.services.cover_variants import VARIANT_FORMATS, VariantCache, VariantNotFound
+from backend.app.services.covers import CoverPipelineBusy
+
+router = APIRouter()
+
+
+# Registered ahead of the /static mount; any other /static/covers/... path falls through to it.
+@router.get("/covers/{sha256}/{width:int}x{height:int}.{fmt}", include_in_schema=False)
+async def cover_variant(sha256: str, width: int, height: int, fmt: str, request: Request):
+    """
+    A cover resized to fit `width` x `height` as WebP or JPEG, rendered from
+    the original on first request and then served from disk. Only the sizes
+    in COVER_VARIANT_SIZES exist.
+    """
+    try:
+        path, stat_result = await VariantCache.get_instance().get(sha256, width, height, fmt)
+    except VariantNotFound:
+        raise HTTPException(404, detail="Not Found")
+    except CoverPipelineBusy:
+        raise HTTPException(503, detail="Cover processing is busy, retry shortly", headers={"Retry-After": "1"})
+    # served like the rest of /static: immutable, or handed to nginx
+    return cached_file_response(path, stat_result, f"covers/{sha256}/{os.path.basename(path)}",
+                                request.scope, accel_prefix=settings.STATIC_ACCEL_PREFIX or None,
+                                media_type=VARIANT_FORMATS[fmt][1])
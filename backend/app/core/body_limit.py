@@ -0,0 +1,55 @@
+"""Request body size limits, enforced while the body arrives.
+
+Starlette parses a multipart form completely (spooling large files to
+disk) before the route runs, so a size check in the route only happens
+after the whole body has been received. ``BodySizeLimitMiddleware``
+refuses a body with 413 as soon as its ``Content-Length``, or the bytes
+received so far, exceed the limit configured for its path.
+"""
+import re
+from typing import Mapping
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# room for the multipart boundaries and part headers around an uploaded file
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware capping request bodies per path pattern (in bytes)."""
+
+    def __init__(self, app: ASGIApp, limits: Mapping[str, int]):
+        self.app = app
+        self.limits = [(re.compile(pattern), limit) for pattern, limit in limits.items()]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = next((n for pattern, n in self.limits if pattern.fullmatch(scope["path"])), None)
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            # refuse before reading any of the body
+            return await JSONResponse({"detail": _detail(limit)}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def capped() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # raised into whatever is reading the body; FastAPI passes HTTPExceptions through
+                    raise HTTPException(413, detail=_detail(limit))
+            return message
+
+        await self.app(scope, capped, send)
+
+
+def _detail(limit: int) -> str:
+    return f"Request body must be under {limit // 1024} KB"
@@ -35,6 +35,35 @@ class Settings(BaseModel):
     JWT_SECRET: str = os.getenv("JWT_SECRET", "CHANGE_ME_TO_SECURE_RANDOM")  # replace in prod
     JWT_ALGORITHM: str = "HS256"
 
+    # In-process catalogue caches
+    BOOK_CACHE_MAX_ENTRIES: int = int(os.getenv("BOOK_CACHE_MAX_ENTRIES", "5000"))
+    BOOK_CACHE_TTL_SECONDS: int = int(os.getenv("BOOK_CACHE_TTL_SECONDS", "300"))
+    FACET_CACHE_TTL_SECONDS: int = int(os.getenv("FACET_CACHE_TTL_SECONDS", "60"))
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "30"))
+    # how often the in-process search indexes check for writes made by other workers
+    TRIGRAM_INDEX_TTL_SECONDS: int = int(os.getenv("TRIGRAM_INDEX_TTL_SECONDS", "60"))
+    SUGGEST_INDEX_TTL_SECONDS: int = int(os.getenv("SUGGEST_INDEX_TTL_SECONDS", "60"))
+
+    # Static files (covers, thumbnails) and the cover processing pool
+    STATIC_DIR: str = os.getenv(
+        "STATIC_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "static"))
+    )
+    # when set (e.g. "/protected-static/"), /static answers with X-Accel-Redirect and nginx sends the file
+    STATIC_ACCEL_PREFIX: str = os.getenv("STATIC_ACCEL_PREFIX", "")
+    COVER_WORKERS: int = int(os.getenv("COVER_WORKERS", "2"))
+    COVER_QUEUE_LIMIT: int = int(os.getenv("COVER_QUEUE_LIMIT", "8"))
+    COVER_MAX_UPLOAD_MB: int = int(os.getenv("COVER_MAX_UPLOAD_MB", "3"))
+    # resized cover variants: allowed WxH boxes and the disk budget for rendered files
+    COVER_VARIANT_SIZES: str = os.getenv("COVER_VARIANT_SIZES", "80x112,160x224,240x336,480x672")
+    COVER_VARIANT_CACHE_MB: int = int(os.getenv("COVER_VARIANT_CACHE_MB", "256"))
+    # unreferenced covers younger than this are kept (their upload may still be committing)
+    COVER_GC_GRACE_SECONDS: int = int(os.getenv("COVER_GC_GRACE_SECONDS", "3600"))
+
+    # Stored responses for Idempotency-Key retries
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,188 @@
+"""``Idempotency-Key`` support for retried write requests.
+
+Mobile clients on flaky connections resend a POST when they never saw the
+response. With an ``Idempotency-Key`` header, the first request runs
+normally and its response is stored; a retry with the same key gets the
+stored response back without reaching the route, and a retry that arrives
+while the first is still running waits for it instead of running in
+parallel.
+
+Keys are scoped to the caller's credentials, method and path, so one user
+cannot replay another's response. Reusing a key with a different body is
+refused with 422. Responses with a 5xx status are not stored, so a retry
+after a server error runs again. The store is per process: behind several
+workers a retry may land on another one and run once more there.
+"""
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.app.core.config import settings
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# responses larger than this are passed through but not stored
+MAX_STORED_BODY_BYTES = 1024 * 1024
+
+# the write endpoints clients retry
+IDEMPOTENT_PATHS = (
+    r"/api/borrows/?",
+    r"/api/borrows/batch",
+    r"/api/borrows/return/[^/]+",
+    r"/api/payments/pay/[^/]+",
+)
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status: int
+    headers: list
+    body: bytes
+
+
+class IdempotencyStore:
+    """Bounded LRU/TTL store of responses by idempotency key."""
+
+    _instance = None
+
+    def __init__(self, max_entries: int = settings.IDEMPOTENCY_MAX_ENTRIES,
+                 ttl_seconds: int = settings.IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, StoredResponse)
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = IdempotencyStore()
+        return cls._instance
+
+    def get(self, key: tuple) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, response: StoredResponse):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that stores and replays responses for ``Idempotency-Key`` POSTs."""
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str] = IDEMPOTENT_PATHS,
+                 store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.paths = re.compile("|".join(f"(?:{p})" for p in paths))
+        self.store = store
+        # key -> Event set when the first request with that key has finished
+        self._in_flight = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not self.paths.fullmatch(scope["path"]):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        raw_key = headers.get(IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            return await self.app(scope, receive, send)
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            return await JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)(scope, receive, send)
+
+        store = self.store or IdempotencyStore.get_instance()
+        caller = hashlib.sha256(headers.get(b"authorization", b"")).hexdigest()
+        key = (caller, scope["method"], scope["path"], raw_key)
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(scope.get("query_string", b"") + b"\0" + body).hexdigest()
+
+        while True:
+            stored = store.get(key)
+            if stored is not None:
+                return await _replay(stored, fingerprint, scope, receive, send)
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            # a duplicate of a request still running: wait for it, then replay its response
+            await pending.wait()
+
+        done = self._in_flight[key] = asyncio.Event()
+        try:
+            start, chunks = {}, []
+            size = 0
+
+            async def capture(message: Message):
+                nonlocal size
+                if message["type"] == "http.response.start":
+                    start.update(message)
+                elif message["type"] == "http.response.body":
+                    size += len(message.get("body", b""))
+                    if size <= MAX_STORED_BODY_BYTES:
+                        chunks.append(message.get("body", b""))
+                await send(message)
+
+            await self.app(scope, _replay_body(body, receive), capture)
+            if start and start["status"] < 500 and size <= MAX_STORED_BODY_BYTES:
+                store.put(key, StoredResponse(fingerprint, start["status"], list(start.get("headers", [])),
+                                              b"".join(chunks)))
+        finally:
+            del self._in_flight[key]
+            done.set()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+def _replay_body(body: bytes, receive: Receive) -> Receive:
+    """Hand the buffered body to the app, then pass through to the server (for disconnects)."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replay
+
+
+async def _replay(stored: StoredResponse, fingerprint: str, scope: Scope, receive: Receive, send: Send):
+    if stored.fingerprint != fingerprint:
+        response = JSONResponse(
+            {"detail": "Idempotency-Key was already used with a different request body"}, status_code=422
+        )
+        return await response(scope, receive, send)
+    headers = [(k, v) for k, v in stored.headers if k.lower() != b"content-length"]
+    headers += [(b"content-length", str(len(stored.body)).encode()),
+                (REPLAYED_HEADER.lower().encode(), b"true")]
+    await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+    await send({"type": "http.response.body", "body": stored.body})
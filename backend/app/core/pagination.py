@@ -0,0 +1,32 @@
+"""Opaque keyset cursors for paginated list endpoints.
+
+A cursor carries the sort key of the last row on the previous page, so the
+next page is a plain range scan (``WHERE key > :last ORDER BY key LIMIT n``)
+and costs the same however deep the client pages.
+"""
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(kind: str, values: list) -> str:
+    raw = json.dumps([kind, *values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> list:
+    """Return the key values stored in ``cursor``.
+
+    Raises ValueError if the cursor is malformed or was issued for a
+    different ordering (e.g. a plain listing cursor reused for a search).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(data, list) or not data or data[0] != kind:
+        raise ValueError("Cursor does not match this query")
+    return data[1:]
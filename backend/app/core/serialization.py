@@ -0,0 +1,60 @@
+"""Fast JSON encoding for collection endpoints.
+
+Large list responses used to load full ORM entities, validate each one
+into a Pydantic model and then run FastAPI's generic encoder over the
+result. Instead, endpoints select just the columns a response needs and
+hand the rows to a ``RowSerializer``, which encodes the whole list in one
+pass with a serializer compiled once from the response model.
+"""
+from typing import Iterable, List, Mapping, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from typing_extensions import TypedDict
+
+
+class RowSerializer:
+    """Encode rows shaped like ``model`` to a JSON array without per-row validation.
+
+    Rows are SQLAlchemy ``Row`` objects (or plain mappings) whose keys are
+    the model's field names; label computed columns accordingly. The output
+    matches what ``response_model=List[model]`` would produce.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        row_type = TypedDict(
+            f"{model.__name__}Row",
+            {name: field.annotation for name, field in model.model_fields.items()},
+        )
+        self._adapter = TypeAdapter(List[row_type])
+
+    def columns(self, entity, **overrides) -> list:
+        """Select ``entity``'s columns named like the model fields.
+
+        Fields living elsewhere (joined tables, computed values) are passed
+        as keyword overrides and labelled with the field name.
+        """
+        return [
+            overrides[name].label(name) if name in overrides else getattr(entity, name)
+            for name in self.fields
+        ]
+
+    def dump(self, rows: Iterable) -> bytes:
+        return self._adapter.dump_json(
+            [row if isinstance(row, Mapping) else row._asdict() for row in rows]
+        )
+
+    def response(self, rows: Iterable, headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(content=self.dump(rows), media_type="application/json", headers=headers)
+
+    def page_response(self, rows: Iterable, headers: Optional[Mapping[str, str]] = None,
+                      **fields) -> Response:
+        """Encode ``{"items": [rows...], **fields}``, for paginated endpoints
+        that return totals or cursors alongside the rows."""
+        content = b'{"items":' + self.dump(rows)
+        for name, value in fields.items():
+            content += b"," + to_json(name) + b":" + to_json(value)
+        return Response(content=content + b"}", media_type="application/json", headers=headers)
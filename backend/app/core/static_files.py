@@ -0,0 +1,117 @@
+"""``/static`` serving tuned for browser and proxy caches.
+
+A plain ``StaticFiles`` mount answers every cover request with a short-lived
+validator, so each catalogue render revalidates its images through Python.
+``CachedStaticFiles`` adds:
+
+- an immutable mode for content-addressed covers
+  (``covers/<sha256>/...``, whose bytes never change under the same URL):
+  ``Cache-Control: public, max-age=31536000, immutable`` and a strong ETag
+  derived from the path, identical on every worker and host;
+- precompressed siblings for text assets: ``app.css.br`` / ``app.css.gz``
+  are sent with ``Content-Encoding`` to clients accepting it;
+- an ``X-Accel-Redirect`` mode (``STATIC_ACCEL_PREFIX``): the app resolves
+  the file and sets the headers, and nginx sends the bytes from an
+  ``internal`` location (applying ``gzip_static`` itself).
+"""
+import os
+import re
+import stat
+from datetime import datetime, timezone
+from mimetypes import guess_type
+from typing import Optional
+
+import anyio
+from fastapi import Request, Response
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from backend.app.core.http_cache import is_not_modified, make_etag, not_modified
+
+IMMUTABLE_MAX_AGE = 31536000  # one year
+IMMUTABLE_PATHS = re.compile(r"covers/[0-9a-f]{64}/[^/]+")
+TEXT_EXTENSIONS = {".css", ".js", ".mjs", ".json", ".map", ".svg", ".html", ".txt", ".xml"}
+# preferred first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def cached_file_response(full_path: str, stat_result: os.stat_result, path: str, scope: Scope,
+                         status_code: int = 200, encoding: Optional[str] = None,
+                         accel_prefix: Optional[str] = None, media_type: Optional[str] = None) -> Response:
+    """Respond with the file at ``full_path``, served as ``path`` (relative to ``/static``).
+
+    ``encoding`` is set when ``full_path`` is a precompressed sibling of
+    ``path``. With ``accel_prefix`` the body is left to the proxy.
+    """
+    headers = {}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if os.path.splitext(path)[1] in TEXT_EXTENSIONS:
+        headers["Vary"] = "Accept-Encoding"
+    if IMMUTABLE_PATHS.fullmatch(path):
+        headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        headers["ETag"] = make_etag("static", path, encoding)
+    else:
+        # may change in place (legacy covers, text assets): revalidate
+        headers["Cache-Control"] = "no-cache"
+    media_type = media_type or guess_type(path)[0] or "application/octet-stream"
+
+    if accel_prefix:
+        headers["X-Accel-Redirect"] = accel_prefix + path
+        response = Response(status_code=status_code, media_type=media_type, headers=headers)
+        if "ETag" not in headers:
+            # nginx validates conditional requests against the file itself
+            return response
+    else:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                media_type=media_type, headers=headers)
+
+    last_modified = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc)
+    if is_not_modified(Request(scope), response.headers["etag"], last_modified):
+        return not_modified({k: v for k, v in response.headers.items()
+                             if k in ("etag", "cache-control", "vary", "last-modified")})
+    return response
+
+
+class CachedStaticFiles(StaticFiles):
+    """``StaticFiles`` with immutable covers, precompressed siblings and X-Accel-Redirect."""
+
+    def __init__(self, *, directory: str, accel_prefix: Optional[str] = None, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.accel_prefix = accel_prefix
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        # behind nginx, its gzip_static picks the sibling instead
+        if (not self.accel_prefix and scope["method"] in ("GET", "HEAD")
+                and os.path.splitext(path)[1] in TEXT_EXTENSIONS):
+            accepted = _accepted_encodings(Headers(scope=scope))
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    return cached_file_response(full_path, stat_result, _url_path(path), scope,
+                                                encoding=encoding)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        path = _url_path(self.get_path(scope))
+        return cached_file_response(full_path, stat_result, path, scope, status_code,
+                                    accel_prefix=self.accel_prefix)
+
+
+def _url_path(path: str) -> str:
+    return path.replace(os.sep, "/")
+
+
+def _accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
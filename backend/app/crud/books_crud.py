@@ -1,6 +1,17 @@
+from sqlalchemy import String, cast, func, literal, or_, select, tuple_, union_all
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from backend.app.db import models
+from typing import List, Optional, Tuple
+from backend.app.core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
+from backend.app.db import models, search_index
+from backend.app.services.catalogue import LibraryCatalogue, book_event
+from backend.app.services.trigram_index import TrigramIndex
+
+FACET_FIELDS = ("category", "subcategory", "book_format", "publication_year", "shelf")
+EXPORT_COLUMNS = ("id", "title", "author", "isbn", "total_copies", "available_copies", "description",
+                  "category", "publisher", "publication_year", "book_format", "shelf", "subcategory",
+                  "cover_url")
+# fuzzy candidates fetched from the in-process index when SQL filters may discard some
+FUZZY_FILTER_CANDIDATES = 1000
 
 def create_book(db: Session, book_in) -> models.Book:
     b = models.Book(
@@ -32,32 +43,46 @@ def get_book_by_isbn(db: Session, isbn: str) -> Optional[models.Book]:
     return db.query(models.Book).filter(models.Book.isbn == isbn).first()
 
 
-def list_books(db: Session, skip: int = 0, limit: int = 100) -> List[models.Book]:
-    return db.query(models.Book).offset(skip).limit(limit).all()
+def get_books(db: Session, ids=(), isbns=(), columns=None) -> List[models.Book]:
+    """Fetch books by id and/or ISBN in a single ``IN`` query.
+
+    Pass ``columns`` to get rows of just those columns instead of entities.
+    """
+    conditions = []
+    if ids:
+        conditions.append(models.Book.id.in_(list(ids)))
+    if isbns:
+        conditions.append(models.Book.isbn.in_(list(isbns)))
+    if not conditions:
+        return []
+    qry = db.query(*columns) if columns is not None else db.query(models.Book)
+    return qry.filter(or_(*conditions)).all()
+
+
+def list_books(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+               columns=None) -> Tuple[List[models.Book], Optional[str]]:
+    """Return one page of books ordered by (title, id) and the cursor for the next page.
+
+    Pass ``columns`` to get rows of just those columns instead of entities.
+    """
+    return _paginate(db.query(models.Book), None, limit, cursor, columns)
 
 
 def search_books(db: Session, q: str):
-    q_like = f"%{q}%"
-    return db.query(models.Book).filter(
-        (models.Book.title.like(q_like)) |
-        (models.Book.author.like(q_like)) |
-        (models.Book.isbn.like(q_like)) |
-        (models.Book.category.like(q_like)) |
-        (models.Book.subcategory.like(q_like))
-    ).all()
+    qry, rank = search_index.match(db.query(models.Book), q)
+    if rank is not None:
+        qry = qry.order_by(rank, models.Book.id)
+    return qry.all()
 
 
-def search_books_with_filters(db: Session, q: Optional[str] = None, category: Optional[str] = None,
-                              subcategory: Optional[str] = None, book_format: Optional[str] = None,
-                              publication_year: Optional[int] = None, shelf: Optional[str] = None):
+def filter_books(db: Session, q: Optional[str] = None, category: Optional[str] = None,
+                 subcategory: Optional[str] = None, book_format: Optional[str] = None,
+                 publication_year: Optional[int] = None, shelf: Optional[str] = None):
+    """Build the catalogue search query; returns ``(query, rank)`` (rank is None without ``q``)."""
     qry = db.query(models.Book)
+    rank = None
     if q:
-        q_like = f"%{q}%"
-        qry = qry.filter(
-            (models.Book.title.like(q_like)) |
-            (models.Book.author.like(q_like)) |
-            (models.Book.isbn.like(q_like))
-        )
+        qry, rank = search_index.match(qry, q)
     if category:
         qry = qry.filter(models.Book.category == category)
     if subcategory:
@@ -68,7 +93,157 @@ def search_books_with_filters(db: Session, q: Optional[str] = None, category: Op
         qry = qry.filter(models.Book.publication_year == publication_year)
     if shelf:
         qry = qry.filter(models.Book.shelf == shelf)
-    return qry.all()
+    return qry, rank
+
+
+def search_books_with_filters(db: Session, q: Optional[str] = None, category: Optional[str] = None,
+                              subcategory: Optional[str] = None, book_format: Optional[str] = None,
+                              publication_year: Optional[int] = None, shelf: Optional[str] = None,
+                              limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                              columns=None) -> Tuple[List[models.Book], Optional[str]]:
+    """Return one page of matching books and the cursor for the next page.
+
+    Results are ordered by relevance when ``q`` is given, otherwise by (title, id).
+    Pass ``columns`` to get rows of just those columns instead of entities.
+    """
+    qry, rank = filter_books(db, q, category, subcategory, book_format, publication_year, shelf)
+    return _paginate(qry, rank, limit, cursor, columns)
+
+
+def fuzzy_search_books(db: Session, q: str, category: Optional[str] = None,
+                       subcategory: Optional[str] = None, book_format: Optional[str] = None,
+                       publication_year: Optional[int] = None, shelf: Optional[str] = None,
+                       limit: int = DEFAULT_PAGE_SIZE, columns=None) -> List[models.Book]:
+    """Return up to ``limit`` books whose title or author resembles ``q``, best first.
+
+    Tolerates typos and transliteration differences ("Dostoyevsky" finds
+    "Dostoevsky"). Uses ``pg_trgm`` when the database has it, otherwise the
+    in-process trigram index. Not paginated: only the top matches are useful.
+    Pass ``columns`` (including ``id``) to get rows instead of entities.
+    """
+    filters = (category, subcategory, book_format, publication_year, shelf)
+    qry, _ = filter_books(db, None, *filters)
+    if search_index.has_trigram(db.get_bind()):
+        qry, rank = search_index.fuzzy_match(qry, q)
+        if columns is not None:
+            qry = qry.with_entities(*columns)
+        return qry.order_by(rank, models.Book.id).limit(limit).all()
+
+    index = TrigramIndex.get_instance()
+    index.ensure_loaded(db)
+    wanted = max(limit, FUZZY_FILTER_CANDIDATES) if any(filters) else limit
+    ranked = [book_id for book_id, _ in index.search(q, limit=wanted)]
+    if not ranked:
+        return []
+    if columns is not None:
+        qry = qry.with_entities(*columns)
+    books = {b.id: b for b in qry.filter(models.Book.id.in_(ranked))}
+    return [books[book_id] for book_id in ranked if book_id in books][:limit]
+
+
+def iter_books_for_export(db: Session, q: Optional[str] = None, category: Optional[str] = None,
+                          subcategory: Optional[str] = None, book_format: Optional[str] = None,
+                          publication_year: Optional[int] = None, shelf: Optional[str] = None,
+                          chunk_size: int = 1000):
+    """Yield ``EXPORT_COLUMNS`` tuples for every matching book, in id order.
+
+    Only the projected columns are fetched, through a server-side cursor
+    ``chunk_size`` rows at a time, so memory stays flat for any catalogue size.
+    """
+    qry, _ = filter_books(db, q, category, subcategory, book_format, publication_year, shelf)
+    qry = (
+        qry.with_entities(*(getattr(models.Book, c) for c in EXPORT_COLUMNS))
+        .order_by(models.Book.id)
+        .execution_options(stream_results=True)
+        .yield_per(chunk_size)
+    )
+    for row in qry:
+        yield tuple(row)
+
+
+def _paginate(qry, rank, limit: int, cursor: Optional[str], columns=None):
+    """Keyset pagination over (title, id), or (rank, id) for full-text matches.
+
+    With ``columns`` the page holds rows of those columns (which must
+    include ``title`` and ``id``) instead of Book entities; ranked rows
+    then carry an extra ``search_rank`` column.
+    Raises ValueError for a malformed cursor.
+    """
+    if columns is not None:
+        qry = qry.with_entities(*columns)
+    if rank is None:
+        kind, keys = "title", (models.Book.title, models.Book.id)
+    else:
+        kind, keys = "rank", (rank, models.Book.id)
+        qry = qry.add_columns(rank.label("search_rank"))
+
+    if cursor:
+        last = decode_cursor(cursor, kind)
+        if len(last) != 2:
+            raise ValueError("Invalid cursor")
+        qry = qry.filter(tuple_(*keys) > tuple_(*last))
+
+    rows = qry.order_by(*keys).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    last_key = None
+    if rows:
+        last = rows[-1]
+        if rank is None:
+            last_key = [last.title, last.id]
+        else:
+            last_key = [last.search_rank, last.id if columns is not None else last[0].id]
+    if rank is not None and columns is None:
+        rows = [row[0] for row in rows]
+
+    next_cursor = encode_cursor(kind, last_key) if has_more else None
+    return rows, next_cursor
+
+
+def catalogue_version(db: Session, q: Optional[str] = None, category: Optional[str] = None,
+                      subcategory: Optional[str] = None, book_format: Optional[str] = None,
+                      publication_year: Optional[int] = None, shelf: Optional[str] = None):
+    """Return ``(count, max(updated_at), max(id))`` over the matching books.
+
+    Any insert, update or delete in the result set changes at least one of
+    the three, so this is enough to build an ETag without loading rows.
+    """
+    qry, _ = filter_books(db, q, category, subcategory, book_format, publication_year, shelf)
+    count, last_modified, max_id = qry.with_entities(
+        func.count(models.Book.id), func.max(models.Book.updated_at), func.max(models.Book.id)
+    ).one()
+    return count, last_modified, max_id
+
+
+def book_facets(db: Session, q: Optional[str] = None, category: Optional[str] = None,
+                subcategory: Optional[str] = None, book_format: Optional[str] = None,
+                publication_year: Optional[int] = None, shelf: Optional[str] = None) -> dict:
+    """Count matching books per value of every facet field in a single query.
+
+    Returns ``{field: [{"value": ..., "count": n}, ...]}``, most common first.
+    """
+    qry, _ = filter_books(db, q, category, subcategory, book_format, publication_year, shelf)
+    base = qry.with_entities(*(getattr(models.Book, f) for f in FACET_FIELDS)).cte("facet_base")
+    parts = [
+        select(
+            literal(field).label("facet"),
+            cast(base.c[field], String).label("value"),
+            func.count().label("count"),
+        )
+        .where(base.c[field].isnot(None))
+        .group_by(base.c[field])
+        for field in FACET_FIELDS
+    ]
+
+    facets = {field: [] for field in FACET_FIELDS}
+    for facet, value, count in db.execute(union_all(*parts)):
+        if facet == "publication_year":
+            value = int(value)
+        facets[facet].append({"value": value, "count": count})
+    for values in facets.values():
+        values.sort(key=lambda v: (-v["count"], str(v["value"])))
+    return facets
 
 
 def update_book(db: Session, book: models.Book, patch) -> models.Book:
@@ -83,6 +258,7 @@ def update_book(db: Session, book: models.Book, patch) -> models.Book:
     db.add(book)
     db.commit()
     db.refresh(book)
+    LibraryCatalogue.get_instance().notify("book_updated", book_event(book))
     return book
 
 
@@ -90,6 +266,8 @@ def delete_book(db: Session, isbn: str) -> bool:
     book = get_book_by_isbn(db, isbn)
     if not book:
         return False
+    event = book_event(book)
     db.delete(book)
     db.commit()
+    LibraryCatalogue.get_instance().notify("book_removed", event)
     return True
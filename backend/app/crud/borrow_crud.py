@@ -1,9 +1,30 @@
+from sqlalchemy import DateTime, case, func, insert, literal, select, tuple_, update
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional
 from backend.app.db import models
+from backend.app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from backend.app.db.expressions import whole_hours_between
 
 BORROW_HOURS_DEFAULT = 1
+# late fee: a flat charge plus a charge per started hour overdue (minimum one hour)
+LATE_FEE_BASE = 5
+LATE_FEE_PER_HOUR = 1
+
+
+def late_fee(due_date, at):
+    """SQL expression for the late fee of a loan due at ``due_date`` and returned ``at``."""
+    hours = whole_hours_between(due_date, at)
+    return case(
+        (at > due_date, LATE_FEE_BASE + LATE_FEE_PER_HOUR * case((hours < 1, 1), else_=hours)),
+        else_=0,
+    )
+
+
+def hours_overdue(due_date, at):
+    """SQL expression for whole hours past ``due_date`` at ``at``, counting a started first hour as one."""
+    hours = whole_hours_between(due_date, at)
+    return case((hours < 1, 1), else_=hours)
 
 
 def create_borrow(db: Session, user_id: int, book_id: int) -> models.Borrow:
@@ -16,23 +37,312 @@ def create_borrow(db: Session, user_id: int, book_id: int) -> models.Borrow:
     return borrow
 
 
+def claim_copy(db: Session, book_id: int):
+    """Take one available copy of a book inside the caller's transaction.
+
+    A single conditional ``UPDATE ... WHERE available_copies > 0``, so parallel
+    checkouts can never drive the count below zero. Returns the book's
+    ``(id, isbn, title, author, category)`` or None when no copy was free or
+    the book does not exist.
+    """
+    return db.execute(
+        update(models.Book)
+        .where(models.Book.id == book_id, models.Book.available_copies > 0)
+        .values(available_copies=models.Book.available_copies - 1)
+        .returning(models.Book.id, models.Book.isbn, models.Book.title,
+                   models.Book.author, models.Book.category)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+
+def claim_copies(db: Session, wanted: dict) -> list:
+    """Set-based ``claim_copy`` for ``{book_id: copies}``.
+
+    Each book gives up ``min(wanted, available)`` copies. The free counts are
+    read ``FOR UPDATE`` (SQLite's write lock serializes instead) and taken in
+    one conditional UPDATE that still never drives a count below zero.
+    Returns ``(id, isbn, title, author, category, copies)`` for the books that
+    gave up at least one copy, ``copies`` being how many.
+    """
+    if not wanted:
+        return []
+    free = dict(db.execute(
+        select(models.Book.id, models.Book.available_copies)
+        .where(models.Book.id.in_(list(wanted)), models.Book.available_copies > 0)
+        .with_for_update()
+    ).all())
+    granted = {book_id: min(n, free[book_id]) for book_id, n in wanted.items() if book_id in free}
+    if not granted:
+        return []
+    taken = case(granted, value=models.Book.id)
+    return db.execute(
+        update(models.Book)
+        .where(models.Book.id.in_(list(granted)), models.Book.available_copies >= taken)
+        .values(available_copies=models.Book.available_copies - taken)
+        .returning(models.Book.id, models.Book.isbn, models.Book.title,
+                   models.Book.author, models.Book.category, taken.label("copies"))
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def insert_borrows(db: Session, user_id: int, book_ids: list) -> list[models.Borrow]:
+    """Stage one borrow row per book id in a single multi-row INSERT; the caller commits."""
+    if not book_ids:
+        return []
+    due = datetime.utcnow() + timedelta(hours=BORROW_HOURS_DEFAULT)
+    return db.scalars(
+        insert(models.Borrow).returning(models.Borrow, sort_by_parameter_order=True),
+        [{"user_id": user_id, "book_id": book_id, "due_date": due} for book_id in book_ids],
+    ).all()
+
+
+def insert_borrow(db: Session, user_id: int, book_id: int) -> models.Borrow:
+    """Stage a borrow row with ``INSERT ... RETURNING``; the caller commits."""
+    due = datetime.utcnow() + timedelta(hours=BORROW_HOURS_DEFAULT)
+    return db.scalars(
+        insert(models.Borrow)
+        .values(user_id=user_id, book_id=book_id, due_date=due)
+        .returning(models.Borrow)
+    ).one()
+
+
+def mark_returned(db: Session, borrow_id: int, user_id: int,
+                  returned_at: Optional[datetime] = None) -> Optional[models.Borrow]:
+    """Mark an open borrow returned and charge any late fee, in one UPDATE.
+
+    Runs inside the caller's transaction. Returns the updated borrow, or None
+    if there is no open borrow with that id for that user.
+    """
+    at = literal(returned_at or datetime.utcnow(), DateTime())
+    overdue = models.Borrow.due_date < at
+    return db.scalars(
+        update(models.Borrow)
+        .where(
+            models.Borrow.id == borrow_id,
+            models.Borrow.user_id == user_id,
+            models.Borrow.returned_at.is_(None),
+        )
+        .values(
+            returned_at=at,
+            fee_applied=case((overdue, late_fee(models.Borrow.due_date, at)), else_=models.Borrow.fee_applied),
+            payment_status=case((overdue, "unpaid"), else_=models.Borrow.payment_status),
+        )
+        .returning(models.Borrow)
+    ).first()
+
+
+def restore_copy(db: Session, book_id: int):
+    """Put one copy of a book back on the shelf inside the caller's transaction.
+
+    Never raises ``available_copies`` above ``total_copies``. Returns the
+    book's ``(id, isbn, title, author, category)``, or None if nothing changed.
+    """
+    return db.execute(
+        update(models.Book)
+        .where(models.Book.id == book_id, models.Book.available_copies < models.Book.total_copies)
+        .values(available_copies=models.Book.available_copies + 1)
+        .returning(models.Book.id, models.Book.isbn, models.Book.title,
+                   models.Book.author, models.Book.category)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+
+def open_borrows_for_books(db: Session, wanted: dict, user_id: Optional[int] = None) -> list:
+    """Pick the open borrows a pile of returned books closes, in one SELECT.
+
+    ``wanted`` maps book id to the number of copies handed back; for each book
+    the oldest open borrows are chosen, at most that many. Returns
+    ``(id, book_id)`` rows. Pass ``user_id`` to only consider that user's loans.
+    """
+    if not wanted:
+        return []
+    conditions = [models.Borrow.book_id.in_(list(wanted)), models.Borrow.returned_at.is_(None)]
+    if user_id is not None:
+        conditions.append(models.Borrow.user_id == user_id)
+    ranked = (
+        select(
+            models.Borrow.id,
+            models.Borrow.book_id,
+            func.row_number().over(
+                partition_by=models.Borrow.book_id,
+                order_by=(models.Borrow.borrowed_at, models.Borrow.id),
+            ).label("n"),
+        )
+        .where(*conditions)
+        .subquery()
+    )
+    return db.execute(
+        select(ranked.c.id, ranked.c.book_id).where(ranked.c.n <= case(wanted, value=ranked.c.book_id))
+    ).all()
+
+
+def mark_returned_many(db: Session, borrow_ids: list, user_id: Optional[int] = None,
+                       returned_at: Optional[datetime] = None) -> list[models.Borrow]:
+    """Set-based ``mark_returned``: close every open borrow in ``borrow_ids`` in one UPDATE.
+
+    Runs inside the caller's transaction. Returns the borrows that changed, in
+    no particular order. Pass ``user_id`` to only touch that user's loans.
+    """
+    if not borrow_ids:
+        return []
+    at = literal(returned_at or datetime.utcnow(), DateTime())
+    overdue = models.Borrow.due_date < at
+    conditions = [models.Borrow.id.in_(list(borrow_ids)), models.Borrow.returned_at.is_(None)]
+    if user_id is not None:
+        conditions.append(models.Borrow.user_id == user_id)
+    return db.scalars(
+        update(models.Borrow)
+        .where(*conditions)
+        .values(
+            returned_at=at,
+            fee_applied=case((overdue, late_fee(models.Borrow.due_date, at)), else_=models.Borrow.fee_applied),
+            payment_status=case((overdue, "unpaid"), else_=models.Borrow.payment_status),
+        )
+        .returning(models.Borrow)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def restore_copies(db: Session, returned: dict) -> list:
+    """Set-based ``restore_copy`` for ``{book_id: copies}`` in one UPDATE.
+
+    Stock is capped at ``total_copies``. Returns ``(id, isbn, title, author,
+    category)`` for the books that changed.
+    """
+    if not returned:
+        return []
+    restored = models.Book.available_copies + case(returned, value=models.Book.id)
+    return db.execute(
+        update(models.Book)
+        .where(models.Book.id.in_(list(returned)), models.Book.available_copies < models.Book.total_copies)
+        .values(available_copies=case(
+            (restored > models.Book.total_copies, models.Book.total_copies), else_=restored
+        ))
+        .returning(models.Book.id, models.Book.isbn, models.Book.title,
+                   models.Book.author, models.Book.category)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _overdue_cursor(values: list, sort: str):
+    """Parse an overdue cursor into ``(at, last_key)``; ValueError unless well-formed."""
+    # [instant the first page was computed at, due_date, id], with the fee before due_date for sort=fee
+    types = (str, int, str, int) if sort == "fee" else (str, str, int)
+    if len(values) != len(types) or not all(
+        isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types)
+    ):
+        raise ValueError("Invalid cursor")
+    at, *key = values
+    key[-2] = datetime.fromisoformat(key[-2])
+    if sort == "fee":
+        key[0] = -key[0]
+    return datetime.fromisoformat(at), key
+
+
+def list_overdue_borrows(db: Session, now: Optional[datetime] = None, sort: str = "hours",
+                         descending: bool = True, role: Optional[str] = None,
+                         category: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                         cursor: Optional[str] = None):
+    """Return one page of open overdue borrows with fees computed in SQL.
+
+    Rows carry every Borrow column plus the borrower's ``username``,
+    ``full_name`` and ``role``, and the computed ``hours_overdue`` and
+    ``current_fee``.
+
+    ``sort="hours"`` orders by ``(due_date, id)``, a plain range on the
+    ``(returned_at, due_date)`` index. ``sort="fee"`` orders by the fee
+    expression, ties broken by how long ago the loan fell due. The cursor
+    also carries the instant the first page was computed at, so fees, hours
+    and totals do not shift while a client pages. The totals over all
+    matching rows come from window functions in the same query.
+
+    Returns ``(rows, next_cursor, total, total_fee)``. Raises ValueError for
+    an unknown sort or a malformed cursor.
+    """
+    if sort not in ("hours", "fee"):
+        raise ValueError("sort must be 'hours' or 'fee'")
+    kind = f"overdue-{sort}"
+    last = None
+    if cursor:
+        now, last = _overdue_cursor(decode_cursor(cursor, kind), sort)
+    now = now or datetime.utcnow()
+    at = literal(now, DateTime())
+    hours = hours_overdue(models.Borrow.due_date, at)
+    fee = late_fee(models.Borrow.due_date, at)
+    matching = (
+        select(
+            *models.Borrow.__table__.columns,
+            models.User.username, models.User.full_name, models.User.role,
+            hours.label("hours_overdue"), fee.label("current_fee"),
+            func.count().over().label("total"),
+            func.coalesce(func.sum(fee).over(), 0).label("total_fee"),
+        )
+        .join(models.User, models.User.id == models.Borrow.user_id)
+        .where(models.Borrow.returned_at.is_(None), models.Borrow.due_date < at)
+    )
+    if role:
+        matching = matching.where(models.User.role == role)
+    if category:
+        matching = matching.join(models.Book, models.Book.id == models.Borrow.book_id).where(
+            models.Book.category == category
+        )
+    # the totals are windowed before the cursor is applied, so every page reports the same totals
+    page = matching.subquery("overdue")
+    # ascending keys list the most overdue (highest fee) first
+    keys = (page.c.due_date, page.c.id)
+    if sort == "fee":
+        keys = (-page.c.current_fee, *keys)
+    qry = select(page)
+    if last is not None:
+        qry = qry.where(tuple_(*keys) > tuple_(*last) if descending else tuple_(*keys) < tuple_(*last))
+    qry = qry.order_by(*(keys if descending else (k.desc() for k in keys))).limit(limit + 1)
+
+    rows = db.execute(qry).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    total, total_fee = (rows[0].total, rows[0].total_fee) if rows else (0, 0)
+    if not rows and cursor:
+        # past the last page: still report the totals
+        total, total_fee = db.execute(select(page.c.total, page.c.total_fee).limit(1)).first() or (0, 0)
+    next_cursor = None
+    if has_more:
+        key = [rows[-1].due_date.isoformat(), rows[-1].id]
+        if sort == "fee":
+            key.insert(0, rows[-1].current_fee)
+        next_cursor = encode_cursor(kind, [now.isoformat(), *key])
+    return rows, next_cursor, total, total_fee
+
+
 def get_borrow(db: Session, borrow_id: int) -> models.Borrow | None:
     """Retrieve a borrow record by ID."""
     return db.query(models.Borrow).filter(models.Borrow.id == borrow_id).first()
 
 
-def list_user_borrows(db: Session, user_id: int, include_returned: bool = False) -> list[models.Borrow]:
+def list_user_borrows(db: Session, user_id: int, include_returned: bool = False,
+                      columns=None) -> list[models.Borrow]:
     """List borrow records for a given user.
 
     By default this returns only active borrows (not yet returned). Set
-    `include_returned=True` to include returned records as well.
+    `include_returned=True` to include returned records as well. Pass
+    `columns` to get rows of just those columns instead of entities.
     """
-    q = db.query(models.Borrow).filter(models.Borrow.user_id == user_id)
+    q = db.query(*columns) if columns is not None else db.query(models.Borrow)
+    q = q.filter(models.Borrow.user_id == user_id)
     if not include_returned:
         q = q.filter(models.Borrow.returned_at.is_(None))
     return q.all()
 
 
+def user_borrows_version(db: Session, user_id: int, include_returned: bool = False):
+    """Return ``(count, max(updated_at))`` over the rows `list_user_borrows` would return."""
+    q = db.query(func.count(models.Borrow.id), func.max(models.Borrow.updated_at)).filter(
+        models.Borrow.user_id == user_id
+    )
+    if not include_returned:
+        q = q.filter(models.Borrow.returned_at.is_(None))
+    return q.one()
+
+
 def set_returned(db: Session, borrow: models.Borrow) -> models.Borrow:
     """
     Mark a borrow record as returned.
@@ -61,12 +371,42 @@ def return_borrow_by_id(db: Session, borrow_id: int, user_id: int) -> models.Bor
     return set_returned(db, borrow)
 
 
+# columns of the borrow history export, joined from borrows, users and books
+BORROW_EXPORT_COLUMNS = ("id", "borrowed_at", "due_date", "returned_at", "fee_applied", "payment_status",
+                         "paid_at", "user_id", "username", "full_name", "role", "book_id", "isbn",
+                         "title", "author", "category")
+
+
+def _filter_all_borrows(query, start_date: Optional[datetime], end_date: Optional[datetime],
+                        category: Optional[str], include_returned: bool, book_joined: bool = False):
+    """Apply the `list_all_borrows` filters. Pass ``book_joined`` if books is already in the query."""
+    # Apply date filters
+    if start_date:
+        query = query.filter(models.Borrow.borrowed_at >= start_date)
+    if end_date:
+        # Include the entire end_date day by adding 1 day
+        end_of_day = end_date + timedelta(days=1)
+        query = query.filter(models.Borrow.borrowed_at < end_of_day)
+
+    # Filter by category if provided
+    if category:
+        if not book_joined:
+            query = query.join(models.Book, models.Book.id == models.Borrow.book_id)
+        query = query.filter(models.Book.category == category)
+
+    # Filter returned status
+    if not include_returned:
+        query = query.filter(models.Borrow.returned_at.is_(None))
+    return query
+
+
 def list_all_borrows(
     db: Session,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     category: Optional[str] = None,
-    include_returned: bool = True
+    include_returned: bool = True,
+    columns=None
 ) -> list[models.Borrow]:
     """
     List all borrow records with optional filtering by date range and book category.
@@ -77,26 +417,46 @@ def list_all_borrows(
         end_date: Filter borrows up to this date
         category: Filter by book category
         include_returned: Whether to include returned books
+        columns: Columns to select instead of whole Borrow entities
     
     Returns:
-        List of borrow records matching the filters
+        List of borrow records (or rows of `columns`) matching the filters
     """
-    query = db.query(models.Borrow)
-    
-    # Apply date filters
-    if start_date:
-        query = query.filter(models.Borrow.borrowed_at >= start_date)
-    if end_date:
-        # Include the entire end_date day by adding 1 day
-        end_of_day = end_date + timedelta(days=1)
-        query = query.filter(models.Borrow.borrowed_at < end_of_day)
-    
-    # Filter by category if provided
-    if category:
-        query = query.join(models.Book).filter(models.Book.category == category)
-    
-    # Filter returned status
-    if not include_returned:
-        query = query.filter(models.Borrow.returned_at.is_(None))
-    
+    query = db.query(*columns) if columns is not None else db.query(models.Borrow)
+    query = _filter_all_borrows(query, start_date, end_date, category, include_returned)
     return query.order_by(models.Borrow.borrowed_at.desc()).all()
+
+
+def iter_borrows_for_export(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[str] = None,
+    include_returned: bool = True,
+    chunk_size: int = 1000
+):
+    """Yield ``BORROW_EXPORT_COLUMNS`` tuples for the borrows `list_all_borrows` would return.
+
+    Borrower and book fields are joined into the projection, and rows come
+    through a server-side cursor ``chunk_size`` at a time, newest first, so
+    memory stays flat however long the history is.
+    """
+    columns = {
+        "username": models.User.username, "full_name": models.User.full_name, "role": models.User.role,
+        "isbn": models.Book.isbn, "title": models.Book.title, "author": models.Book.author,
+        "category": models.Book.category,
+    }
+    query = (
+        db.query(*(columns.get(c, getattr(models.Borrow, c, None)) for c in BORROW_EXPORT_COLUMNS))
+        .select_from(models.Borrow)
+        .outerjoin(models.User, models.User.id == models.Borrow.user_id)
+        .outerjoin(models.Book, models.Book.id == models.Borrow.book_id)
+    )
+    query = _filter_all_borrows(query, start_date, end_date, category, include_returned, book_joined=True)
+    query = (
+        query.order_by(models.Borrow.borrowed_at.desc(), models.Borrow.id.desc())
+        .execution_options(stream_results=True)
+        .yield_per(chunk_size)
+    )
+    for row in query:
+        yield tuple(row)
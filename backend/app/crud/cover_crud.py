@@ -0,0 +1,44 @@
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Optional
+from backend.app.db import models
+
+
+def get_cover_file(db: Session, sha256: str) -> Optional[models.CoverFile]:
+    return db.get(models.CoverFile, sha256)
+
+
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def add_reference(db: Session, sha256: str, fmt: str, size_bytes: int) -> models.CoverFile:
+    """Count one more book using the cover, registering it on first use. The caller commits.
+
+    A single upsert, so two requests registering the same new cover at once
+    both count instead of one failing on the primary key.
+    """
+    stmt = _UPSERT_INSERTS[db.get_bind().dialect.name](models.CoverFile).values(
+        sha256=sha256, format=fmt, size_bytes=size_bytes, ref_count=1
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.CoverFile.sha256],
+            set_={"ref_count": models.CoverFile.ref_count + 1},
+        )
+    )
+    return db.get(models.CoverFile, sha256, populate_existing=True)
+
+
+def drop_reference(db: Session, sha256: str):
+    """Count one book fewer using the cover (never below zero). The caller commits."""
+    db.execute(
+        update(models.CoverFile)
+        .where(models.CoverFile.sha256 == sha256, models.CoverFile.ref_count > 0)
+        .values(ref_count=models.CoverFile.ref_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def list_cover_files(db: Session) -> list[models.CoverFile]:
+    return db.query(models.CoverFile).all()
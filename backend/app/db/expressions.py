@@ -0,0 +1,38 @@
+"""Portable SQL expressions for date arithmetic.
+
+SQLite and PostgreSQL have no common way to subtract timestamps, so these
+compile differently per dialect. Timestamps are naive UTC throughout.
+"""
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class whole_hours_between(FunctionElement):
+    """Whole hours from ``start`` to ``end``, truncated (``int(seconds / 3600)``).
+
+    On SQLite the difference is rounded to whole seconds first: julianday
+    arithmetic is floating point, so exactly three hours can come out as
+    2.9999999.
+    """
+
+    type = Integer()
+    name = "whole_hours_between"
+    inherit_cache = True
+
+
+@compiles(whole_hours_between, "sqlite")
+def _hours_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    # round to whole seconds first; integer division then truncates toward zero
+    return "(CAST(ROUND((julianday(%s) - julianday(%s)) * 86400) AS INTEGER) / 3600)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw)
+    )
+
+
+@compiles(whole_hours_between, "postgresql")
+def _hours_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "CAST(TRUNC(EXTRACT(EPOCH FROM (%s - %s)) / 3600) AS INTEGER)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw)
+    )
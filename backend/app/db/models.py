@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from backend.app.db.base import Base
@@ -19,6 +19,9 @@ class Book(Base):
     shelf = Column(String, nullable=True)
     subcategory = Column(String, nullable=True)
     cover_url = Column(String, nullable=True)
+    # row version for ETags / Last-Modified; indexed so max(updated_at) is a single lookup
+    updated_at = Column(DateTime, index=True, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
 
 
 class User(Base):
@@ -27,7 +30,8 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=True)
     hashed_password = Column(String, nullable=False)
-    role = Column(String, default="student")
+    # role lookups: librarian fan-out in OverdueChecker, student/faculty filters in payments
+    role = Column(String, default="student", index=True)
     is_active = Column(Boolean, default=True)
 
 class Borrow(Base):
@@ -41,10 +45,25 @@ class Borrow(Base):
     fee_applied = Column(Integer, default=0)
     payment_status = Column(String, default="unpaid")  # unpaid, paid
     paid_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
 
     user = relationship("User")
     book = relationship("Book")
 
+    __table_args__ = (
+        # a user's open loans (list_user_borrows, the borrow-limit count)
+        Index("ix_borrows_user_id_returned_at", "user_id", "returned_at"),
+        # open loans past due (overdue list, OverdueChecker)
+        Index("ix_borrows_returned_at_due_date", "returned_at", "due_date"),
+        # date-range reports ordered by borrowed_at (list_all_borrows)
+        Index("ix_borrows_borrowed_at", "borrowed_at"),
+        # a book's open loans (bulk return by book id)
+        Index("ix_borrows_book_id_returned_at", "book_id", "returned_at"),
+        # fee queries (payment summaries and unpaid lists)
+        Index("ix_borrows_payment_status_fee_applied", "payment_status", "fee_applied"),
+    )
+
 class Reservation(Base):
     __tablename__ = "reservations"
     id = Column(Integer, primary_key=True, index=True)
@@ -55,3 +74,19 @@ class Reservation(Base):
 
     user = relationship("User")
     book = relationship("Book")
+
+    __table_args__ = (
+        # a book's waiting list in queue order (list_reservations_for_book, notify_available_many)
+        Index("ix_reservations_book_id_notified_created_at", "book_id", "notified", "created_at"),
+        Index("ix_reservations_user_id", "user_id"),
+    )
+
+
+class CoverFile(Base):
+    """A content-addressed cover under static/covers/<sha256>/, with the number of books using it."""
+    __tablename__ = "cover_files"
+    sha256 = Column(String(64), primary_key=True)
+    format = Column(String, nullable=False)  # jpeg / png
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
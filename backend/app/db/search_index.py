@@ -0,0 +1,224 @@
+"""Full-text search index over the ``books`` table.
+
+SQLite gets an external-content FTS5 table (``books_fts``) kept in sync by
+triggers; PostgreSQL gets a generated ``tsvector`` column with a GIN index.
+When neither is present (e.g. SQLite compiled without FTS5) searches fall
+back to the old ``LIKE`` scan so the API keeps working.
+
+Typo-tolerant (fuzzy) matching uses ``pg_trgm`` on PostgreSQL when the
+extension can be created; otherwise the in-process
+``services.trigram_index.TrigramIndex`` serves those queries.
+"""
+import re
+import weakref
+from typing import Optional, Tuple
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, cast, func, literal, literal_column, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from backend.app.db import models
+
+FTS_TABLE = "books_fts"
+SEARCH_COLUMNS = ("title", "author", "isbn", "category", "subcategory")
+# bm25() column weights, same order as SEARCH_COLUMNS
+SQLITE_WEIGHTS = (10.0, 8.0, 4.0, 2.0, 2.0)
+
+SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, author, isbn, category, subcategory,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, author, isbn, category, subcategory)
+        VALUES (new.id, new.title, new.author, new.isbn, new.category, new.subcategory);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, isbn, category, subcategory)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.category, old.subcategory);
+    END
+    """,
+    # only re-index when a searchable column changes, not on every copy count update
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_au
+    AFTER UPDATE OF title, author, isbn, category, subcategory ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, isbn, category, subcategory)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.category, old.subcategory);
+        INSERT INTO {FTS_TABLE}(rowid, title, author, isbn, category, subcategory)
+        VALUES (new.id, new.title, new.author, new.isbn, new.category, new.subcategory);
+    END
+    """,
+]
+
+POSTGRES_DDL = [
+    # a generated column backfills existing rows and stays in sync on every write
+    """
+    ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(author, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(isbn, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(subcategory, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING GIN (search_vector)",
+]
+
+TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_books_author_trgm ON books USING GIN (author gin_trgm_ops)",
+]
+
+# engine -> whether the index exists on it
+_installed = weakref.WeakKeyDictionary()
+# engine -> whether pg_trgm and its indexes exist on it
+_trigram_installed = weakref.WeakKeyDictionary()
+
+_fts = Table(FTS_TABLE, MetaData(), Column("rowid", Integer))
+_search_vector = literal_column("books.search_vector")
+
+
+def install(engine: Engine) -> bool:
+    """Create the index (if missing) and backfill it. Returns False if unsupported."""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE},
+                ).first()
+                for stmt in SQLITE_DDL:
+                    conn.execute(text(stmt))
+                if not exists:
+                    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            elif dialect == "postgresql":
+                for stmt in POSTGRES_DDL:
+                    conn.execute(text(stmt))
+            else:
+                _installed[engine] = False
+                return False
+    except Exception as e:
+        print(f"[SearchIndex] Full-text index unavailable, falling back to LIKE: {e}")
+        _installed[engine] = False
+        return False
+    _installed[engine] = True
+    if dialect == "postgresql":
+        install_trigram(engine)
+    return True
+
+
+def install_trigram(engine: Engine) -> bool:
+    """Enable ``pg_trgm`` fuzzy matching on PostgreSQL. Returns False if unsupported.
+
+    Runs in its own transaction: creating the extension needs privileges the
+    application role may lack, and that must not undo the full-text setup.
+    """
+    if engine.dialect.name != "postgresql":
+        _trigram_installed[engine] = False
+        return False
+    try:
+        with engine.begin() as conn:
+            for stmt in TRIGRAM_DDL:
+                conn.execute(text(stmt))
+    except Exception as e:
+        print(f"[SearchIndex] pg_trgm unavailable, using in-process trigram index: {e}")
+        _trigram_installed[engine] = False
+        return False
+    _trigram_installed[engine] = True
+    return True
+
+
+def rebuild(engine: Engine) -> None:
+    """Re-populate the SQLite FTS table from ``books`` (PostgreSQL needs nothing)."""
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def is_available(engine: Engine) -> bool:
+    if engine not in _installed:
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite":
+                found = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE},
+                ).first()
+            elif engine.dialect.name == "postgresql":
+                found = conn.execute(
+                    text(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'books' AND column_name = 'search_vector'"
+                    )
+                ).first()
+            else:
+                found = None
+        _installed[engine] = found is not None
+    return _installed[engine]
+
+
+def has_trigram(engine: Engine) -> bool:
+    """Whether the database itself can answer fuzzy (trigram) queries."""
+    if engine not in _trigram_installed:
+        found = None
+        if engine.dialect.name == "postgresql":
+            with engine.connect() as conn:
+                found = conn.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).first()
+        _trigram_installed[engine] = found is not None
+    return _trigram_installed[engine]
+
+
+def tokenize(q: str) -> list[str]:
+    """Split user input into lower-case word tokens (punctuation and ``_`` dropped)."""
+    return re.findall(r"[^\W_]+", q.lower())
+
+
+def match(qry: Query, q: str) -> Tuple[Query, Optional[object]]:
+    """Restrict a ``Book`` query to rows matching ``q``.
+
+    Every token is matched as a prefix, so partially typed words still hit.
+    Returns the filtered query and a rank expression (lower is more relevant),
+    or ``None`` as rank when only the ``LIKE`` fallback is available.
+    """
+    engine = qry.session.get_bind()
+    tokens = tokenize(q)
+    if not tokens or not is_available(engine):
+        q_like = f"%{q}%"
+        return qry.filter(or_(*(getattr(models.Book, c).like(q_like) for c in SEARCH_COLUMNS))), None
+
+    if engine.dialect.name == "sqlite":
+        fts_query = " ".join(f'"{t}"*' for t in tokens)
+        rank = func.bm25(literal_column(FTS_TABLE), *SQLITE_WEIGHTS)
+        qry = qry.join(_fts, _fts.c.rowid == models.Book.id).filter(
+            literal_column(FTS_TABLE).op("MATCH")(fts_query)
+        )
+        return qry, rank
+
+    ts_query = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in tokens))
+    qry = qry.filter(_search_vector.op("@@")(ts_query))
+    # ts_rank_cd is float4; as float8 it compares exactly with the rank a cursor carries back
+    return qry, cast(-func.ts_rank_cd(_search_vector, ts_query), Float(53))
+
+
+def fuzzy_match(qry: Query, q: str) -> Tuple[Query, object]:
+    """Restrict a ``Book`` query to titles/authors similar to ``q`` (PostgreSQL ``pg_trgm``).
+
+    Uses word similarity so a misspelled surname still matches a full
+    author name. Returns the filtered query and a rank (lower is better).
+    Callers must check ``has_trigram`` first.
+    """
+    term = literal(q)
+    qry = qry.filter(or_(term.op("<%")(models.Book.title), term.op("<%")(models.Book.author)))
+    rank = -func.greatest(func.word_similarity(term, models.Book.title),
+                          func.word_similarity(term, models.Book.author))
+    return qry, rank
@@ -1,8 +1,13 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
+def normalize_isbn(v: str) -> str:
+    """Strip the spaces and dashes people type into ISBNs."""
+    return v.replace(" ", "").replace("-", "").strip()
+
+
 class BookCreate(BaseModel):
     title: str
     author: str
@@ -23,8 +28,7 @@ class BookCreate(BaseModel):
         if not v:
             return v
 
-        # Normalize: remove spaces and dashes
-        cleaned = v.replace(" ", "").replace("-", "").strip()
+        cleaned = normalize_isbn(v)
 
         if not cleaned.isdigit():
             raise ValueError("ISBN must contain only digits (after removing dashes/spaces)")
@@ -62,6 +66,12 @@ class BookRead(BaseModel):
         from_attributes = True
 
 
+class BookPage(BaseModel):
+    items: List[BookRead]
+    # pass back as ``cursor`` for the next page; None on the last one
+    next_cursor: Optional[str] = None
+
+
 class BookUpdate(BaseModel):
     title: Optional[str] = None
     author: Optional[str] = None
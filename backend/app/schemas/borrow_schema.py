@@ -1,10 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class BorrowRequest(BaseModel):
     book_id: int
 
+class BorrowBatchRequest(BaseModel):
+    book_ids: List[int] = Field(..., min_length=1, max_length=50)
+    # circulation desk: librarians check out on behalf of a patron
+    user_id: Optional[int] = None
+
 class BorrowRead(BaseModel):
     id: int
     user_id: int
@@ -36,3 +41,55 @@ class BorrowWithUserRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OverdueBorrowRead(BorrowWithUserRead):
+    hours_overdue: int
+    current_fee: int
+
+
+class OverduePage(BaseModel):
+    items: List[OverdueBorrowRead]
+    # over every matching overdue borrow, not just this page
+    total: int
+    total_fee: int
+    next_cursor: Optional[str] = None
+
+
+class BorrowBatchItem(BaseModel):
+    book_id: int
+    ok: bool
+    borrow: Optional[BorrowRead] = None
+    error: Optional[str] = None
+
+
+class BorrowBatchResult(BaseModel):
+    borrowed: int
+    failed: int
+    items: List[BorrowBatchItem]
+
+
+class BorrowReturnBatchRequest(BaseModel):
+    borrow_ids: List[int] = Field(default_factory=list, max_length=500)
+    # book-drop returns: the copy is known but not the loan it closes
+    book_ids: List[int] = Field(default_factory=list, max_length=500)
+
+    @model_validator(mode="after")
+    def _not_empty(self):
+        if not self.borrow_ids and not self.book_ids:
+            raise ValueError("borrow_ids or book_ids is required")
+        return self
+
+
+class BorrowReturnBatchItem(BaseModel):
+    borrow_id: Optional[int] = None
+    book_id: Optional[int] = None
+    ok: bool
+    borrow: Optional[BorrowRead] = None
+    error: Optional[str] = None
+
+
+class BorrowReturnBatchResult(BaseModel):
+    returned: int
+    failed: int
+    items: List[BorrowReturnBatchItem]
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from backend.app.core.config import settings
+from backend.app.services.catalogue import LibraryCatalogue
+
+
+class CachedBook(NamedTuple):
+    payload: dict
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+
+class BookCache:
+    """Bounded LRU/TTL cache of serialized ``BookRead`` payloads, keyed by id and ISBN.
+
+    Registers itself as a LibraryCatalogue observer and evicts the affected
+    book on every book_added / book_updated / book_removed /
+    availability_changed event. The TTL
+    only bounds staleness across worker processes, which do not share events.
+    """
+
+    _instance = None
+
+    def __init__(self, max_entries: int = settings.BOOK_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = settings.BOOK_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # book id -> (expires_at, CachedBook)
+        self._ids_by_isbn = {}
+        # bumped on every eviction; put() drops payloads read before a concurrent write
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = BookCache()
+            LibraryCatalogue.get_instance().register(cls._instance)
+        return cls._instance
+
+    def get(self, book_id: int) -> Optional[CachedBook]:
+        with self._lock:
+            entry = self._entries.get(book_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(book_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(book_id)
+            self.hits += 1
+            return entry[1]
+
+    def get_by_isbn(self, isbn: str) -> Optional[CachedBook]:
+        with self._lock:
+            book_id = self._ids_by_isbn.get(isbn)
+        if book_id is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(book_id)
+
+    def put(self, entry: CachedBook, version: Optional[int] = None):
+        """Store an entry. Pass the ``version`` read before loading it from the DB
+        so a result that raced a catalogue write is discarded."""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            payload = entry.payload
+            book_id = payload["id"]
+            self._drop(book_id)
+            self._entries[book_id] = (time.monotonic() + self.ttl_seconds, entry)
+            self._ids_by_isbn[payload["isbn"]] = book_id
+            while len(self._entries) > self.max_entries:
+                oldest, _ = next(iter(self._entries.items()))
+                self._drop(oldest)
+
+    def evict(self, book_id: Optional[int] = None, isbn: Optional[str] = None):
+        with self._lock:
+            self.version += 1
+            if book_id is None and isbn is not None:
+                book_id = self._ids_by_isbn.get(isbn)
+            if book_id is not None and book_id in self._entries:
+                self._drop(book_id)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._ids_by_isbn.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, book_id: int):
+        entry = self._entries.pop(book_id, None)
+        if entry is not None:
+            self._ids_by_isbn.pop(entry[1].payload["isbn"], None)
+
+    # observer interface
+    def update(self, event_type: str, payload: dict):
+        if event_type in ("book_added", "book_updated", "book_removed", "availability_changed"):
+            self.evict(payload.get("id"), payload.get("isbn"))
@@ -1,75 +1,204 @@
 from backend.app.db import models
 from backend.app.crud import borrow_crud as crud_borrow, books_crud as crud_book
-from backend.app.db.session import SessionLocal
+from backend.app.services.catalogue import LibraryCatalogue, book_event
+from backend.app.services.reservation import notify_reservations
+from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
-from datetime import datetime
+from typing import List, Optional
+from collections import Counter
 
 class BorrowService:
     def __init__(self, db: Session):
         self.db = db
 
     def borrow(self, user, book_id: int):
-        book = crud_book.get_book(self.db, book_id)
-        if not book:
-            raise ValueError("book not found")
-        if int(book.available_copies) <= 0:  # type: ignore
-            raise ValueError("no copies available")
+        """Check out one copy of a book in a single transaction.
+
+        The copy is claimed with a conditional UPDATE, so concurrent checkouts
+        cannot oversell, and the borrow row comes back from INSERT ... RETURNING,
+        so nothing has to be re-read after the commit.
+        """
         # check user's active borrows
-        active = self.db.query(models.Borrow).filter(models.Borrow.user_id == user.id, models.Borrow.returned_at.is_(None)).count()
-        if hasattr(user, "max_borrow_limit") and active >= user.max_borrow_limit():
-            raise ValueError("borrow limit reached")
-        # decrement
-        book.available_copies -= 1  # type: ignore
-        self.db.add(book)
+        if hasattr(user, "max_borrow_limit"):
+            active = self.db.query(models.Borrow).filter(models.Borrow.user_id == user.id, models.Borrow.returned_at.is_(None)).count()
+            if active >= user.max_borrow_limit():
+                raise ValueError("borrow limit reached")
+        book = crud_borrow.claim_copy(self.db, book_id)
+        if book is None:
+            self.db.rollback()
+            # only the failure path pays for telling the two cases apart
+            if crud_book.get_book(self.db, book_id) is None:
+                raise ValueError("book not found")
+            raise ValueError("no copies available")
+        borrow = crud_borrow.insert_borrow(self.db, user.id, book_id)
+        # detach so commit does not expire the RETURNING values
+        self.db.expunge(borrow)
         self.db.commit()
-        borrow = crud_borrow.create_borrow(self.db, user.id, book_id)
+        LibraryCatalogue.get_instance().notify("availability_changed", book_event(book))
         return borrow
 
-    def return_book(self, borrow_id: int, user_id: int):
-    # Use the same session as the service
-        borrow = crud_borrow.get_borrow(self.db, borrow_id)
-        if not borrow:
-            raise ValueError("Borrow record not found")
+    def borrow_many(self, user, book_ids: List[int]) -> List[dict]:
+        """Check out several books for one user in a single transaction.
 
-        if borrow.user_id != user_id:  # type: ignore
-            raise ValueError("You cannot return another user's borrow")
+        Copies are claimed with one set-based UPDATE, as many of each book as
+        are free, and the borrow rows come from one multi-row INSERT. The
+        borrow limit is then applied to the items that could actually be
+        claimed, in order; copies claimed past it are given back in the same
+        transaction, so missing or unavailable books do not use up the
+        patron's room.
+        Returns one ``{"book_id", "borrow", "error"}`` dict per requested id,
+        in order; items that could not be lent have ``borrow`` None.
+        """
+        results = [{"book_id": book_id, "borrow": None, "error": None} for book_id in book_ids]
+        claimed = crud_borrow.claim_copies(self.db, Counter(book_ids))
+        # the first copies asked of a book get the ones it could give
+        remaining = {book.id: book.copies for book in claimed}
+        lendable, refused = [], []
+        for item in results:
+            if remaining.get(item["book_id"], 0) > 0:
+                remaining[item["book_id"]] -= 1
+                lendable.append(item)
+            else:
+                refused.append(item)
 
-        if borrow.returned_at:  # type: ignore
-            raise ValueError("Already returned")
+        lent = lendable
+        if hasattr(user, "max_borrow_limit"):
+            active = self.db.query(models.Borrow).filter(models.Borrow.user_id == user.id, models.Borrow.returned_at.is_(None)).count()
+            room = max(user.max_borrow_limit() - active, 0)
+            lent, over = lendable[:room], lendable[room:]
+            for item in over:
+                item["error"] = "borrow limit reached"
+            crud_borrow.restore_copies(self.db, Counter(item["book_id"] for item in over))
+
+        borrows = crud_borrow.insert_borrows(self.db, user.id, [item["book_id"] for item in lent])
+        for item, borrow in zip(lent, borrows):
+            # detach so commit does not expire the RETURNING values
+            self.db.expunge(borrow)
+            item["borrow"] = borrow
+        self.db.commit()
 
-        # CORRECT: pass both db and borrow object
-        borrow = crud_borrow.set_returned(self.db, borrow)
+        if refused:
+            known = {
+                book_id for (book_id,) in
+                self.db.query(models.Book.id).filter(models.Book.id.in_({i["book_id"] for i in refused}))
+            }
+            for item in refused:
+                item["error"] = "no copies available" if item["book_id"] in known else "book not found"
 
-        # Update book copies
-        book = self.db.query(models.Book).filter(models.Book.id == borrow.book_id).first()
+        lent_ids = {item["book_id"] for item in lent}
+        catalogue = LibraryCatalogue.get_instance()
+        for book in claimed:
+            if book.id in lent_ids:
+                catalogue.notify("availability_changed", book_event(book))
+        return results
+
+    def return_book(self, borrow_id: int, user_id: int, background_tasks: Optional[BackgroundTasks] = None):
+        """Return a borrow in a single transaction.
+
+        Marking it returned, charging the late fee and restoring the copy are
+        two UPDATEs and one commit. Reservation holders are notified after the
+        commit: in ``background_tasks`` when given, so the response does not
+        wait on the queue, otherwise inline.
+        """
+        borrow = crud_borrow.mark_returned(self.db, borrow_id, user_id)
+        if borrow is None:
+            self.db.rollback()
+            existing = crud_borrow.get_borrow(self.db, borrow_id)
+            if not existing:
+                raise ValueError("Borrow record not found")
+            if existing.user_id != user_id:  # type: ignore
+                raise ValueError("You cannot return another user's borrow")
+            raise ValueError("Already returned")
+
+        book = crud_borrow.restore_copy(self.db, borrow.book_id)
+        # detach so commit does not expire the RETURNING values
+        self.db.expunge(borrow)
+        self.db.commit()
         if book is not None:
-            if book.available_copies < book.total_copies:  # type: ignore
-                book.available_copies += 1  # type: ignore
-                self.db.commit()
-            # Notify reservation queue that a copy became available
-            try:
-                from backend.app.services.reservation import ReservationService
-                svc = ReservationService(self.db)
-                svc.notify_available(book.id)  # type: ignore
-            except Exception:
-                # don't let notification errors block return
-                pass
-
-        # Calculate late fee
-        fee = 0
-        if borrow.returned_at and borrow.due_date and borrow.returned_at > borrow.due_date:  # type: ignore
-            time_diff = borrow.returned_at - borrow.due_date  # type: ignore
-            hours_overdue = int(time_diff.total_seconds() / 3600)
-            if hours_overdue < 1 and time_diff.total_seconds() > 0:
-                hours_overdue = 1
-            # Initial fee of £5 + £1 for each hour overdue
-            fee = 5 + (hours_overdue * 1)
-            borrow.fee_applied = fee  # type: ignore
-            borrow.payment_status = "unpaid"  # type: ignore
-            self.db.commit()
+            LibraryCatalogue.get_instance().notify("availability_changed", book_event(book))
 
+        # Notify reservation queue that a copy became available
+        if background_tasks is not None:
+            background_tasks.add_task(notify_reservations, [borrow.book_id])
+        else:
+            notify_reservations([borrow.book_id])
         return borrow
 
+    def return_many(self, borrow_ids: List[int] = (), book_ids: List[int] = (),
+                    user_id: Optional[int] = None,
+                    background_tasks: Optional[BackgroundTasks] = None) -> List[dict]:
+        """Return a pile of loans in a single transaction.
+
+        ``borrow_ids`` name loans directly; each of ``book_ids`` closes the
+        oldest open loan of that book, so a copy handed back without its slip
+        still checks in. Loans are closed and fees charged with one UPDATE per
+        kind of id, copies are restored with one UPDATE, and reservation holders
+        are notified once per affected book after the commit. Pass ``user_id``
+        to only touch that user's loans.
+
+        Returns one ``{"borrow_id", "book_id", "borrow", "error"}`` dict per
+        requested id, borrow ids first; failed items have ``borrow`` None.
+        """
+        by_borrow = [{"borrow_id": i, "book_id": None, "borrow": None, "error": None} for i in borrow_ids]
+        by_book = [{"borrow_id": None, "book_id": i, "borrow": None, "error": None} for i in book_ids]
+
+        closed = {b.id: b for b in crud_borrow.mark_returned_many(self.db, set(borrow_ids), user_id)}
+        seen = set()
+        for item in by_borrow:
+            borrow = closed.get(item["borrow_id"])
+            if borrow is not None and borrow.id not in seen:
+                seen.add(borrow.id)
+                item["borrow"], item["book_id"] = borrow, borrow.book_id
+
+        picked = crud_borrow.open_borrows_for_books(self.db, Counter(book_ids), user_id)
+        by_book_closed = {b.id: b for b in crud_borrow.mark_returned_many(self.db, [row.id for row in picked], user_id)}
+        pending = {}  # book id -> borrows still to hand out, oldest first
+        for row in sorted(picked, key=lambda r: r.id):
+            if row.id in by_book_closed:
+                pending.setdefault(row.book_id, []).append(by_book_closed[row.id])
+        for item in by_book:
+            if pending.get(item["book_id"]):
+                borrow = pending[item["book_id"]].pop(0)
+                item["borrow"], item["borrow_id"] = borrow, borrow.id
+            else:
+                item["error"] = "no open borrow for this book"
+
+        returned = list(closed.values()) + list(by_book_closed.values())
+        books = crud_borrow.restore_copies(self.db, Counter(b.book_id for b in returned))
+        for borrow in returned:
+            # detach so commit does not expire the RETURNING values
+            self.db.expunge(borrow)
+        self.db.commit()
+
+        failed = [item for item in by_borrow if item["borrow"] is None]
+        if failed:
+            existing = dict(
+                self.db.query(models.Borrow.id, models.Borrow.user_id)
+                .filter(models.Borrow.id.in_({item["borrow_id"] for item in failed}))
+                .all()
+            )
+            for item in failed:
+                if item["borrow_id"] not in existing:
+                    item["error"] = "Borrow record not found"
+                elif item["borrow_id"] in seen:
+                    item["error"] = "duplicate borrow id"
+                elif user_id is not None and existing[item["borrow_id"]] != user_id:
+                    item["error"] = "You cannot return another user's borrow"
+                else:
+                    item["error"] = "Already returned"
+
+        catalogue = LibraryCatalogue.get_instance()
+        for book in books:
+            catalogue.notify("availability_changed", book_event(book))
+
+        affected = sorted({b.book_id for b in returned})
+        if affected:
+            if background_tasks is not None:
+                background_tasks.add_task(notify_reservations, affected)
+            else:
+                notify_reservations(affected)
+        return by_borrow + by_book
+
 
 
 # Decorator example
@@ -81,7 +210,14 @@ class FeeDecorator:
     def borrow(self, user, book_id: int):
         return self.service.borrow(user, book_id)
 
-    def return_book(self, borrow_id: int, user_id: int):
-        borrow = self.service.return_book(borrow_id, user_id)
+    def borrow_many(self, user, book_ids: List[int]) -> List[dict]:
+        return self.service.borrow_many(user, book_ids)
+
+    def return_many(self, borrow_ids: List[int] = (), book_ids: List[int] = (), user_id: Optional[int] = None,
+                    background_tasks: Optional[BackgroundTasks] = None):
+        return self.service.return_many(borrow_ids, book_ids, user_id, background_tasks)
+
+    def return_book(self, borrow_id: int, user_id: int, background_tasks: Optional[BackgroundTasks] = None):
+        borrow = self.service.return_book(borrow_id, user_id, background_tasks)
         # fee already calculated inside service; this decorator could add reservation fees etc.
         return borrow
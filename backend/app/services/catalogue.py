@@ -1,8 +1,18 @@
 from typing import List, Any
-from backend.app.db import models
+from backend.app.db import models, search_index
 from backend.app.db.session import SessionLocal
 from sqlalchemy.orm import Session
 
+def book_event(book) -> dict:
+    """Payload sent to observers for book_added / book_updated / book_removed.
+
+    Checkouts and returns send availability_changed instead of book_updated,
+    so observers that only depend on catalogue metadata can ignore them.
+    """
+    return {"id": book.id, "isbn": book.isbn, "title": book.title, "author": book.author,
+            "category": book.category}
+
+
 # Singleton Catalogue
 class LibraryCatalogue:
     _instance = None
@@ -35,9 +45,31 @@ class LibraryCatalogue:
             except Exception:
                 pass
 
+    def notify_many(self, events: list):
+        """Send a batch of ``(event_type, payload)`` events, e.g. from a bulk import.
+
+        Observers with an ``update_many`` method take the whole batch in one
+        call; the others get one ``update`` per event.
+        """
+        for obs in list(self._observers):
+            if hasattr(obs, "update_many"):
+                try:
+                    obs.update_many(events)
+                except Exception:
+                    pass
+                continue
+            for event_type, payload in events:
+                try:
+                    obs.update(event_type, payload)
+                except Exception:
+                    pass
+
     # catalog operations
     def search(self, q: str):
-        return self.db.query(models.Book).filter((models.Book.title.like(f"%{q}%")) | (models.Book.author.like(f"%{q}%"))).all()
+        qry, rank = search_index.match(self.db.query(models.Book), q)
+        if rank is not None:
+            qry = qry.order_by(rank, models.Book.id)
+        return qry.all()
 
     def get_book(self, book_id: int):
         return self.db.query(models.Book).filter(models.Book.id == book_id).first()
@@ -66,7 +98,7 @@ class LibraryCatalogue:
                 existing.cover_url = book_in.cover_url
             self.db.add(existing)
             self.db.commit()
-            self.notify("book_updated", {"isbn": existing.isbn})
+            self.notify("book_updated", book_event(existing))
             return existing
         b = models.Book(
             title=book_in.title,
@@ -86,14 +118,24 @@ class LibraryCatalogue:
         self.db.add(b)
         self.db.commit()
         self.db.refresh(b)
-        self.notify("book_added", {"isbn": b.isbn})
+        self.notify("book_added", book_event(b))
         return b
 
+    def update_book(self, book_id: int, patch):
+        from backend.app.crud import books_crud
+
+        book = self.get_book(book_id)
+        if not book:
+            return None
+        # books_crud.update_book notifies observers
+        return books_crud.update_book(self.db, book, patch)
+
     def remove_by_isbn(self, isbn: str) -> bool:
         book = self.db.query(models.Book).filter(models.Book.isbn == isbn).first()
         if not book:
             return False
+        event = book_event(book)
         self.db.delete(book)
         self.db.commit()
-        self.notify("book_removed", {"isbn": isbn})
+        self.notify("book_removed", event)
         return True
@@ -0,0 +1,177 @@
+import csv
+import json
+import time
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from backend.app.db import models
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services.catalogue import LibraryCatalogue, book_event
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+# metadata fields merged into an existing book, same as LibraryCatalogue.add_book
+MERGE_FIELDS = ("category", "description", "publisher", "publication_year",
+                "book_format", "shelf", "subcategory", "cover_url")
+
+
+class CatalogueImporter:
+    """Bulk-load books from a CSV or NDJSON stream.
+
+    Rows are validated with ``BookCreate`` and upserted on ISBN in batched
+    transactions. An ISBN that already exists gets its copy counts increased
+    and its metadata refreshed, exactly like ``LibraryCatalogue.add_book``.
+    Invalid rows are reported and skipped; they never abort the import.
+    """
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE,
+                 progress: Optional[Callable[[dict], None]] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.copies_added = 0
+        self.batches = 0
+        self.error_count = 0
+        self.errors = []
+        self._started = None
+
+    # ------------------------------------------------------------------ parsing
+
+    @staticmethod
+    def parse(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+        """Yield ``(row_number, dict_or_error_message)`` for each input record."""
+        if fmt == "csv":
+            reader = csv.DictReader(lines)
+            for row in reader:
+                # blank cells mean "not provided", not an empty string
+                yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, "")}
+        elif fmt == "ndjson":
+            for n, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield n, f"invalid JSON: {e}"
+                    continue
+                if not isinstance(row, dict):
+                    yield n, "expected a JSON object"
+                    continue
+                yield n, row
+        else:
+            raise ValueError("format must be 'csv' or 'ndjson'")
+
+    # ------------------------------------------------------------------ import
+
+    def run(self, lines: Iterable[str], fmt: str) -> dict:
+        self._started = time.perf_counter()
+        batch = []
+        for n, row in self.parse(lines, fmt):
+            self.rows += 1
+            if isinstance(row, str):
+                self._error(n, None, row)
+                continue
+            try:
+                book_in = BookCreate.model_validate(row)
+            except ValidationError as e:
+                msg = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+                self._error(n, row.get("isbn"), msg)
+                continue
+            batch.append((n, book_in))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.report()
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "copies_added": self.copies_added,
+            "errors": self.error_count,
+            "batches": self.batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed else None,
+            "error_details": self.errors,
+        }
+
+    def _error(self, row_number: int, isbn, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "isbn": isbn, "error": message})
+
+    def _flush(self, batch):
+        try:
+            counts, events = self._upsert(batch)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            # isolate the offending rows so the rest of the batch still lands
+            counts, events = (0, 0, 0), []
+            for n, book_in in batch:
+                try:
+                    c, e = self._upsert([(n, book_in)])
+                    self.db.commit()
+                except Exception as exc:
+                    self.db.rollback()
+                    self._error(n, book_in.isbn, f"database error: {exc.__class__.__name__}")
+                    continue
+                counts = tuple(a + b for a, b in zip(counts, c))
+                events += e
+        created, updated, copies = counts
+        self.created += created
+        self.updated += updated
+        self.copies_added += copies
+        self.batches += 1
+
+        LibraryCatalogue.get_instance().notify_many(events)
+        if self.progress:
+            self.progress(self.report())
+
+    def _upsert(self, batch):
+        """Stage one batch in the session. Returns ((created, updated, copies), events)."""
+        merged = {}
+        for _, book_in in batch:
+            prev = merged.get(book_in.isbn)
+            if prev is None:
+                merged[book_in.isbn] = book_in.model_dump()
+                continue
+            # later rows for the same ISBN add copies and override metadata
+            prev["total_copies"] += book_in.total_copies
+            for field in MERGE_FIELDS:
+                value = getattr(book_in, field)
+                if value:
+                    prev[field] = value
+
+        existing = {
+            b.isbn: b
+            for b in self.db.query(models.Book).filter(models.Book.isbn.in_(list(merged)))
+        }
+        created = []
+        copies = 0
+        for isbn, data in merged.items():
+            copies += data["total_copies"]
+            book = existing.get(isbn)
+            if book is not None:
+                book.total_copies += data["total_copies"]
+                book.available_copies += data["total_copies"]
+                for field in MERGE_FIELDS:
+                    if data.get(field):
+                        setattr(book, field, data[field])
+            else:
+                created.append(models.Book(available_copies=data["total_copies"], **data))
+        self.db.add_all(created)
+        self.db.flush()
+
+        events = [("book_updated", book_event(b)) for b in existing.values()]
+        events += [("book_added", book_event(b)) for b in created]
+        return (len(created), len(existing), copies), events
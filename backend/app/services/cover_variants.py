@@ -0,0 +1,226 @@
+"""Resized cover variants, rendered on first request and cached on disk.
+
+``/static/covers/<sha256>/<w>x<h>.<webp|jpg>`` is rendered from the stored
+original the first time it is asked for and written next to it, so later
+requests (and nginx) serve a plain file. Only sizes in
+``COVER_VARIANT_SIZES`` are rendered. Concurrent requests for the same
+missing variant share one render. The variants together are kept under
+``COVER_VARIANT_CACHE_MB`` by deleting the least recently served ones; an
+evicted variant is simply rendered again when next requested.
+"""
+import asyncio
+import glob
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional
+
+import anyio
+from PIL import Image
+
+from backend.app.core.config import settings
+from backend.app.services import covers
+from backend.app.services.covers import CoverPipeline
+
+VARIANT_FORMATS = {"webp": ("WEBP", "image/webp"), "jpg": ("JPEG", "image/jpeg")}
+VARIANT_QUALITY = 80
+# a variant served this recently is kept even over budget, so it is not deleted mid-response
+EVICTION_GRACE_SECONDS = 60
+_VARIANT_NAME = re.compile(r"(\d+)x(\d+)\.(webp|jpg)")
+
+
+class VariantNotFound(Exception):
+    """The size is not allowed, or there is no stored original to render from."""
+
+
+def allowed_sizes() -> set:
+    sizes = set()
+    for item in settings.COVER_VARIANT_SIZES.split(","):
+        w, _, h = item.strip().partition("x")
+        if w.isdigit() and h.isdigit():
+            sizes.add((int(w), int(h)))
+    return sizes
+
+
+def variant_name(width: int, height: int, fmt: str) -> str:
+    return f"{width}x{height}.{fmt}"
+
+
+def find_original(sha256: str) -> Optional[str]:
+    found = glob.glob(os.path.join(covers.cover_dir(sha256), "original.*"))
+    return found[0] if found else None
+
+
+def render_variant(original: str, width: int, height: int, fmt: str) -> tuple:
+    """Fit the original inside ``width`` x ``height`` (never upscaling) and encode it.
+
+    Returns ``(bytes, timings)`` for ``CoverPipeline.submit``.
+    """
+    started = time.perf_counter()
+    with Image.open(original) as img:
+        if img.format == "JPEG":
+            img.draft("RGB", (width, height))
+        factor = min(img.width // (2 * width), img.height // (2 * height))
+        img = img.reduce(factor) if factor >= 2 else img.copy()
+    img.thumbnail((width, height))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    out = BytesIO()
+    img.save(out, VARIANT_FORMATS[fmt][0], quality=VARIANT_QUALITY)
+    return out.getvalue(), {"render": time.perf_counter() - started}
+
+
+class VariantCache:
+    """Disk LRU of rendered variants, with single-flight rendering.
+
+    Filesystem work runs in worker threads, never on the event loop. A
+    variant served in the last ``grace_seconds`` is not evicted, so a file
+    cannot disappear between being resolved and being sent.
+    """
+
+    _instance = None
+
+    def __init__(self, max_bytes: int = settings.COVER_VARIANT_CACHE_MB * 1024 * 1024,
+                 grace_seconds: float = EVICTION_GRACE_SECONDS):
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self._lock = threading.Lock()
+        # path -> [size, last served (monotonic)], least recently served first; scanned from disk on first use
+        self._files = None
+        self._bytes = 0
+        self._rendering = {}  # path -> Future of the render in progress
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = VariantCache()
+        return cls._instance
+
+    def _scan(self):
+        """Index the variants already on disk, oldest access first."""
+        found = []
+        root = os.path.join(settings.STATIC_DIR, "covers")
+        for path in glob.glob(os.path.join(root, "*", "*x*.*")):
+            if _VARIANT_NAME.fullmatch(os.path.basename(path)):
+                stat = os.stat(path)
+                found.append((stat.st_atime, path, stat.st_size))
+        # never served by this process: all immediately evictable
+        self._files = OrderedDict((path, [size, 0.0]) for _, path, size in sorted(found))
+        self._bytes = sum(size for size, _ in self._files.values())
+
+    def _touch(self, path: str) -> Optional[os.stat_result]:
+        """Mark a variant as just served; None if it is not on disk. Blocking."""
+        with self._lock:
+            if self._files is None:
+                self._scan()
+            try:
+                stat_result = os.stat(path)
+            except FileNotFoundError:
+                if path in self._files:
+                    # removed behind our back, e.g. with its cover by garbage collection
+                    self._bytes -= self._files.pop(path)[0]
+                return None
+            if path in self._files:
+                self._files.move_to_end(path)
+            else:
+                # rendered by another worker process
+                self._files[path] = [stat_result.st_size, 0.0]
+                self._bytes += stat_result.st_size
+            self._files[path][1] = time.monotonic()
+            self.hits += 1
+            return stat_result
+
+    def _add(self, path: str, size: int):
+        """Index a freshly rendered variant and evict old ones over the budget. Blocking."""
+        with self._lock:
+            if self._files is None:
+                self._scan()
+            if path in self._files:
+                self._bytes -= self._files.pop(path)[0]
+            now = time.monotonic()
+            self._files[path] = [size, now]
+            self._bytes += size
+            # files are only removed while holding the lock, so _touch never revives one being deleted
+            while self._bytes > self.max_bytes:
+                old = next(iter(self._files))
+                old_size, served = self._files[old]
+                if old == path or served > now - self.grace_seconds:
+                    # everything left is newer: over budget until those age
+                    break
+                del self._files[old]
+                self._bytes -= old_size
+                self.evictions += 1
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+
+    async def get(self, sha256: str, width: int, height: int, fmt: str) -> tuple:
+        """Return ``(path, stat_result)`` of the variant, rendering it first if needed.
+
+        Raises VariantNotFound for sizes outside the allow-list or covers
+        without an original, and CoverPipelineBusy when the pool is full.
+        """
+        if fmt not in VARIANT_FORMATS or (width, height) not in allowed_sizes() \
+                or not covers.is_content_hash(sha256):
+            raise VariantNotFound()
+        path = os.path.join(covers.cover_dir(sha256), variant_name(width, height, fmt))
+        while True:
+            stat_result = await anyio.to_thread.run_sync(self._touch, path)
+            if stat_result is not None:
+                return path, stat_result
+            pending = self._rendering.get(path)
+            if pending is None:
+                return path, await self._render(sha256, path, width, height, fmt)
+            # someone is already rendering this variant: wait for theirs, then serve it
+            await asyncio.shield(pending)
+
+    async def _render(self, sha256: str, path: str, width: int, height: int, fmt: str) -> os.stat_result:
+        pending = self._rendering[path] = asyncio.get_running_loop().create_future()
+        try:
+            original = await anyio.to_thread.run_sync(find_original, sha256)
+            if original is None:
+                raise VariantNotFound()
+            pipeline = CoverPipeline.get_instance()
+            data = await pipeline.submit(render_variant, original, width, height, fmt)
+            await pipeline.write(path, data)
+            stat_result = await anyio.Path(path).stat()
+            await anyio.to_thread.run_sync(self._add, path, stat_result.st_size)
+            with self._lock:
+                self.renders += 1
+            pending.set_result(path)
+            return stat_result
+        except Exception as e:
+            pending.set_exception(e)
+            # waiters re-raise it; mark it retrieved so an unwaited failure is not logged
+            pending.exception()
+            raise
+        finally:
+            if not pending.done():
+                pending.cancel()
+            del self._rendering[path]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files or ()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "renders": self.renders,
+                "evictions": self.evictions,
+                "rendering": len(self._rendering),
+            }
+
+    def clear(self):
+        """Forget the in-memory index (files stay on disk) and reset the counters."""
+        with self._lock:
+            self._files = None
+            self._bytes = 0
+            self.hits = self.renders = self.evictions = 0
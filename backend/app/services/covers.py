@@ -0,0 +1,331 @@
+"""Cover image processing and storage.
+
+Decoding, verifying, downscaling and re-encoding an upload is CPU work that
+used to run inline in the async upload handler, stalling every other request
+on the worker. ``CoverPipeline`` runs it on a small thread pool (Pillow
+releases the GIL while decoding, resizing and encoding) and admits only a
+bounded number of jobs: beyond the pool size plus ``COVER_QUEUE_LIMIT``
+waiting jobs, uploads are refused with ``CoverPipelineBusy`` rather than
+queueing without limit.
+
+Covers are stored by content: ``static/covers/<sha256>/original.<ext>`` and
+``thumb.jpg`` next to it. Re-uploading the same bytes, or using one cover
+for several editions, reuses the existing files without re-encoding.
+``cover_files`` counts the books using each cover, and ``collect_orphans``
+removes the ones nobody uses any more.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from typing import NamedTuple, Optional
+from uuid import uuid4
+
+import anyio
+from PIL import Image
+
+from backend.app.core.config import settings
+from backend.app.crud import cover_crud
+from backend.app.db import models
+
+THUMBNAIL_SIZE = (300, 300)
+THUMBNAIL_QUALITY = 85
+STAGES = ("decode", "resize", "encode", "render", "write")
+ORIGINAL_EXT = {"jpeg": "jpg", "png": "png"}
+THUMBNAIL_NAME = "thumb.jpg"
+COVER_URL_PREFIX = "/static/covers/"
+_HASH = re.compile(r"[0-9a-f]{64}")
+_MAGIC = ((b"\xff\xd8\xff", "jpeg"), (b"\x89PNG\r\n\x1a\n", "png"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class CoverPipelineBusy(Exception):
+    """Raised when the pool and its waiting queue are full."""
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class ProcessedCover(NamedTuple):
+    format: str  # "jpeg" or "png"
+    width: int
+    height: int
+    thumbnail: bytes  # JPEG
+
+
+def _timed(timings: dict, stage: str, started: float) -> float:
+    now = time.perf_counter()
+    timings[stage] = now - started
+    return now
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """"jpeg" or "png" from a file's leading bytes, or None for anything else."""
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+async def read_upload(file, max_bytes: int) -> bytes:
+    """Read an ``UploadFile`` in chunks, stopping as soon as it is too big.
+
+    Raises UploadTooLarge past ``max_bytes`` and InvalidImage when the first
+    bytes are not a JPEG or PNG signature, before reading the rest.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge()
+    chunks, size = [], 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not chunks and sniff_format(chunk) is None:
+            raise InvalidImage("Only JPEG and PNG images are allowed")
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge()
+        chunks.append(chunk)
+    if not chunks:
+        raise InvalidImage("Invalid image file")
+    return b"".join(chunks)
+
+
+def process_cover(content: bytes) -> tuple:
+    """Validate an upload and render its thumbnail. Returns ``(ProcessedCover, timings)``.
+
+    The image is opened once, with only the decoder its signature names,
+    and the same decoded image is checked and thumbnailed. Raises
+    InvalidImage if the bytes are not a JPEG or PNG Pillow can read.
+    """
+    timings = {}
+    started = time.perf_counter()
+    fmt = sniff_format(content[:8])
+    if fmt is None:
+        raise InvalidImage("Only JPEG and PNG images are allowed")
+    try:
+        img = Image.open(BytesIO(content), formats=(fmt.upper(),))
+        width, height = img.size
+        if fmt == "jpeg":
+            # let libjpeg decode at 1/2, 1/4 or 1/8 scale, still at least the thumbnail size
+            img.draft("RGB", THUMBNAIL_SIZE)
+        # decodes the whole image, failing on truncated or corrupt data
+        img.load()
+    except Exception:
+        raise InvalidImage("Invalid image file")
+    started = _timed(timings, "decode", started)
+
+    # cheap integer box reduction down to about twice the target, then a proper resample
+    factor = min(img.width // (2 * THUMBNAIL_SIZE[0]), img.height // (2 * THUMBNAIL_SIZE[1]))
+    if factor >= 2:
+        img = img.reduce(factor)
+    img.thumbnail(THUMBNAIL_SIZE)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    started = _timed(timings, "resize", started)
+
+    out = BytesIO()
+    img.save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    _timed(timings, "encode", started)
+    return ProcessedCover(fmt, width, height, out.getvalue()), timings
+
+
+async def write_file(path: str, data: bytes):
+    """Write ``data`` to ``path`` without blocking the event loop.
+
+    The bytes go to a temporary sibling that is renamed into place, so a
+    reader never sees a half-written file.
+    """
+    tmp = f"{path}.{uuid4().hex}.tmp"
+    await anyio.Path(tmp).write_bytes(data)
+    await anyio.Path(tmp).rename(path)
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def is_content_hash(value: str) -> bool:
+    return bool(_HASH.fullmatch(value))
+
+
+def cover_dir(sha256: str) -> str:
+    return os.path.join(settings.STATIC_DIR, "covers", sha256)
+
+
+def thumbnail_url(sha256: str) -> str:
+    return f"{COVER_URL_PREFIX}{sha256}/{THUMBNAIL_NAME}"
+
+
+def cover_hash_of(url: Optional[str]) -> Optional[str]:
+    """The content hash in a ``/static/covers/<sha256>/...`` URL, or None for other URLs."""
+    if not url or not url.startswith(COVER_URL_PREFIX):
+        return None
+    candidate = url[len(COVER_URL_PREFIX):].split("/", 1)[0]
+    return candidate if _HASH.fullmatch(candidate) else None
+
+
+def is_stored(sha256: str) -> bool:
+    return os.path.exists(os.path.join(cover_dir(sha256), THUMBNAIL_NAME))
+
+
+def collect_orphans(db, grace_seconds: int = settings.COVER_GC_GRACE_SECONDS) -> dict:
+    """Delete content-addressed covers no book uses any more.
+
+    Reference counts are first reconciled with ``books.cover_url``, which
+    can also change through book edits, imports and deletes. Covers (and
+    hash directories with no ``cover_files`` row, left by failed uploads)
+    are only removed once older than ``grace_seconds``, so an upload that has
+    written its files but not yet committed is never collected. Legacy
+    ``<uuid>.<ext>`` files are left alone.
+    """
+    urls = db.query(models.Book.cover_url).filter(models.Book.cover_url.like(COVER_URL_PREFIX + "%"))
+    refs = Counter(cover_hash_of(url) for (url,) in urls)
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=grace_seconds)
+
+    removed, freed = [], 0
+    known = set()
+    for cover in cover_crud.list_cover_files(db):
+        known.add(cover.sha256)
+        cover.ref_count = refs.get(cover.sha256, 0)
+        created = cover.created_at.replace(tzinfo=None) if cover.created_at else None
+        if cover.ref_count == 0 and created is not None and created < cutoff:
+            freed += _remove_dir(cover.sha256)
+            removed.append(cover.sha256)
+            db.delete(cover)
+    db.commit()
+
+    root = os.path.join(settings.STATIC_DIR, "covers")
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if (_HASH.fullmatch(name) and name not in known and not refs.get(name)
+                    and os.path.getmtime(path) < time.time() - grace_seconds):
+                freed += _remove_dir(name)
+                removed.append(name)
+    return {"removed": len(removed), "bytes_freed": freed, "referenced": len([h for h in refs if h])}
+
+
+def _remove_dir(sha256: str) -> int:
+    path = cover_dir(sha256)
+    size = 0
+    for entry in os.scandir(path) if os.path.isdir(path) else ():
+        if entry.is_file():
+            size += entry.stat().st_size
+    shutil.rmtree(path, ignore_errors=True)
+    return size
+
+
+class CoverPipeline:
+    """Bounded thread pool for cover processing, with queue and latency metrics."""
+
+    _instance = None
+
+    def __init__(self, workers: int = settings.COVER_WORKERS, queue_limit: int = settings.COVER_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="covers")
+        self._lock = threading.Lock()
+        self.in_flight = 0  # admitted jobs, running or waiting for a worker
+        self.running = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._stages = {stage: [0, 0.0, 0.0] for stage in STAGES + ("queue",)}  # count, total, max
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CoverPipeline()
+        return cls._instance
+
+    def _record(self, stage: str, seconds: float):
+        with self._lock:
+            stat = self._stages[stage]
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    def _run(self, fn, args: tuple, admitted: float):
+        with self._lock:
+            self.running += 1
+        self._record("queue", time.perf_counter() - admitted)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def process(self, content: bytes) -> ProcessedCover:
+        """Run ``process_cover`` on the pool.
+
+        Raises CoverPipelineBusy when ``workers + queue_limit`` jobs are
+        already admitted, and InvalidImage for unreadable uploads.
+        """
+        return await self.submit(process_cover, content)
+
+    async def submit(self, fn, *args):
+        """Run ``fn(*args)`` on the pool under the same admission control.
+
+        ``fn`` returns ``(result, timings)``, where ``timings`` maps stage
+        names to seconds; the timings are recorded and the result returned.
+        """
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise CoverPipelineBusy()
+            self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, timings = await loop.run_in_executor(self._executor, self._run, fn, args, time.perf_counter())
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        for stage, seconds in timings.items():
+            self._record(stage, seconds)
+        with self._lock:
+            self.completed += 1
+        return result
+
+    async def write(self, path: str, data: bytes):
+        """Write an output file asynchronously and record the write latency."""
+        started = time.perf_counter()
+        await write_file(path, data)
+        self._record("write", time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "queue_depth": self.in_flight - self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "stages_ms": {
+                    stage: {
+                        "count": count,
+                        "avg": round(total / count * 1000, 2) if count else 0.0,
+                        "max": round(peak * 1000, 2),
+                    }
+                    for stage, (count, total, peak) in self._stages.items()
+                },
+            }
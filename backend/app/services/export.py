@@ -0,0 +1,80 @@
+"""Constant-memory CSV / NDJSON export helpers.
+
+Rows are pulled from a server-side cursor a chunk at a time, encoded and
+handed to a ``StreamingResponse``; nothing holds more than one chunk.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, Sequence
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_CHUNK_ROWS = 1000
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(rows: Iterable[Sequence], columns: Sequence[str], fmt: str) -> Iterator[bytes]:
+    """Encode rows (tuples in ``columns`` order) as CSV with a header, or NDJSON."""
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    pending = 0
+    for row in rows:
+        if writer:
+            writer.writerow([_csv_value(v) for v in row])
+        else:
+            buf.write(json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False))
+            buf.write("\n")
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def export_response(rows: Iterable[Sequence], columns: Sequence[str], fmt: str,
+                    filename: str, gzip: bool = False) -> StreamingResponse:
+    """Stream ``rows`` as a downloadable ``filename.<fmt>[.gz]`` attachment."""
+    body = encode_rows(rows, columns, fmt)
+    filename = f"{filename}.{fmt}"
+    media_type = MEDIA_TYPES[fmt]
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
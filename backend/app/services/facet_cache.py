@@ -0,0 +1,64 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.crud import books_crud
+from backend.app.services.catalogue import LibraryCatalogue
+
+
+class FacetCache:
+    """Facet counts for the unfiltered catalogue, recomputed only after a catalogue change.
+
+    Registers itself as a LibraryCatalogue observer; any book_added /
+    book_updated / book_removed event drops the cached counts. The TTL covers
+    writes made by other worker processes, whose events we never see.
+    """
+
+    _instance = None
+
+    def __init__(self, ttl_seconds: int = settings.FACET_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._facets = None
+        self._computed_at = None
+        self._expires_at = 0.0
+        # bumped on every invalidation so a computation that raced a write is not stored
+        self._version = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = FacetCache()
+            LibraryCatalogue.get_instance().register(cls._instance)
+        return cls._instance
+
+    def get(self, db: Session) -> dict:
+        return self.snapshot(db)[0]
+
+    def snapshot(self, db: Session) -> tuple:
+        """``(facets, computed_at)``: the cached counts and when they were computed (naive UTC)."""
+        with self._lock:
+            if self._facets is not None and self._expires_at > time.monotonic():
+                return self._facets, self._computed_at
+            version = self._version
+        facets = books_crud.book_facets(db)
+        computed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        with self._lock:
+            if version == self._version:
+                self._facets = facets
+                self._computed_at = computed_at
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return facets, computed_at
+
+    def invalidate(self):
+        with self._lock:
+            self._facets = None
+            self._version += 1
+
+    # observer interface
+    def update(self, event_type: str, payload: dict):
+        if event_type in ("book_added", "book_updated", "book_removed"):
+            self.invalidate()
@@ -1,7 +1,8 @@
+from sqlalchemy import update
+
 from backend.app.crud import reservation_crud
+from backend.app.db.session import SessionLocal
 from backend.app.services.notification import NotificationManager
-from backend.app.crud import user_crud
-from backend.app.crud import books_crud
 
 
 class ReservationService:
@@ -25,20 +26,66 @@ class ReservationService:
         return reservation
 
     def notify_available(self, book_id: int):
-        reservations = reservation_crud.list_reservations_for_book(self.db, book_id)
-        # fetch book title for context
-        book = books_crud.get_book(self.db, book_id)
-        book_title = getattr(book, "title", None)
-        for res in reservations:
-            user = user_crud.get_user(self.db, res.user_id)
-            username = getattr(user, "username", None)
-            full_name = getattr(user, "full_name", None)
-            NotificationManager.get_instance().push({
+        return self.notify_available_many([book_id])
+
+    def notify_available_many(self, book_ids) -> int:
+        """Notify everyone waiting on any of ``book_ids``; returns how many were notified.
+
+        Pending reservations are claimed with one UPDATE ... RETURNING, so two
+        concurrent returns of the same book never notify anyone twice, and
+        the names and titles for the messages come from a single joined query.
+        """
+        from backend.app.db import models
+        claimed = self.db.execute(
+            update(models.Reservation)
+            .where(models.Reservation.book_id.in_(list(book_ids)), models.Reservation.notified == 0)
+            .values(notified=1)
+            .returning(models.Reservation.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        if not claimed:
+            self.db.rollback()
+            return 0
+        rows = (
+            self.db.query(
+                models.Reservation.user_id,
+                models.Reservation.book_id,
+                models.User.username,
+                models.User.full_name,
+                models.Book.title,
+            )
+            .outerjoin(models.User, models.User.id == models.Reservation.user_id)
+            .outerjoin(models.Book, models.Book.id == models.Reservation.book_id)
+            .filter(models.Reservation.id.in_(claimed))
+            .order_by(models.Reservation.created_at, models.Reservation.id)
+            .all()
+        )
+        self.db.commit()
+
+        manager = NotificationManager.get_instance()
+        for row in rows:
+            manager.push({
                 "type": "book_available",
-                "user_id": res.user_id,
-                "username": username,
-                "full_name": full_name,
-                "book_id": book_id,
-                "book_title": book_title,
+                "user_id": row.user_id,
+                "username": row.username,
+                "full_name": row.full_name,
+                "book_id": row.book_id,
+                "book_title": row.title,
             })
-            reservation_crud.mark_reservation_notified(self.db, res.id)
+        return len(rows)
+
+
+def notify_reservations(book_ids):
+    """Notify reservation holders for ``book_ids`` using a session of its own.
+
+    Meant to run after the returning transaction has committed, typically
+    as a background task, so errors are logged rather than raised.
+    """
+    db = SessionLocal()
+    try:
+        ReservationService(db).notify_available_many(book_ids)
+    except Exception as e:
+        db.rollback()
+        print(f"[Reservations] Failed to notify reservations for books {list(book_ids)}: {e}")
+    finally:
+        db.close()
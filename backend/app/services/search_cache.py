@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from backend.app.core.config import settings
+from backend.app.services.catalogue import LibraryCatalogue
+
+
+class CachedSearch(NamedTuple):
+    ids: List[int]
+    next_cursor: Optional[str] = None
+
+
+class SearchCache:
+    """Bounded LRU/TTL cache of catalogue search result pages.
+
+    Keyed on the normalized search parameters, it stores the page's book ids
+    and next cursor; the books themselves are re-read by primary key on a
+    hit, so copy counts are always current. Catalogue write events clear it,
+    since one new or changed book can move into or out of any result set;
+    availability changes do not affect membership and are ignored. The
+    short TTL bounds staleness across worker processes, which do not share
+    events.
+    """
+
+    _instance = None
+
+    def __init__(self, max_entries: int = settings.SEARCH_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = settings.SEARCH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, CachedSearch)
+        # bumped on every invalidation; put() drops results computed before a concurrent write
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = SearchCache()
+            LibraryCatalogue.get_instance().register(cls._instance)
+        return cls._instance
+
+    @staticmethod
+    def key(q: Optional[str] = None, category: Optional[str] = None, subcategory: Optional[str] = None,
+            book_format: Optional[str] = None, publication_year: Optional[int] = None,
+            shelf: Optional[str] = None, fuzzy: bool = False, limit: int = 0,
+            cursor: Optional[str] = None) -> tuple:
+        """Normalize search parameters so equivalent requests share an entry.
+
+        Matching on ``q`` ignores case and spacing; the filters are exact
+        matches, so only blank values are normalized (to None).
+        """
+        q = " ".join(q.lower().split()) if q else None
+        return (q or None, category or None, subcategory or None, book_format or None,
+                publication_year or None, shelf or None, bool(fuzzy), limit, cursor or None)
+
+    def get(self, key: tuple) -> Optional[CachedSearch]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, entry: CachedSearch, version: Optional[int] = None):
+        """Store a page. Pass the ``version`` read before running the search
+        so a result that raced a catalogue write is discarded."""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    # observer interface
+    def update(self, event_type: str, payload: dict):
+        if event_type in ("book_added", "book_updated", "book_removed"):
+            self.invalidate()
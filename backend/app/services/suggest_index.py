@@ -0,0 +1,221 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.db import models
+from backend.app.services.catalogue import LibraryCatalogue
+from backend.app.services.trigram_index import catalogue_stamp, words
+
+SUGGEST_FIELDS = ("title", "author", "category")
+# index entries inspected per lookup; bounds latency for one-letter prefixes
+MAX_SCAN = 500
+
+
+def _entries(field: str, value: str) -> List[tuple]:
+    """One ``(key, field, value, leading)`` entry per word-start suffix of ``value``.
+
+    Indexing every suffix lets "pun" complete "Crime and Punishment";
+    ``leading`` marks the entry that starts at the first word.
+    """
+    parts = words(value)
+    return [(" ".join(parts[i:]), field, value, i == 0) for i in range(len(parts))]
+
+
+class SuggestIndex:
+    """In-memory prefix index for search-as-you-type completions.
+
+    A sorted list of ``(key, field, value, leading)`` entries is searched with
+    ``bisect``, so a lookup never touches the database. Each distinct title,
+    author and category is indexed once with a count of the books carrying
+    it; catalogue events adjust the counts and add or drop entries. At most
+    every ``ttl_seconds`` the books table is checked and the index rebuilt
+    if it changed, which picks up writes made by other worker processes.
+    """
+
+    _instance = None
+
+    def __init__(self, ttl_seconds: int = settings.SUGGEST_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stamp = None        # catalogue_stamp the index was built from
+        self._checked_at = 0.0    # monotonic time of the last staleness check
+        self._version = 0         # bumped by every event applied to the index
+        self._entries = []          # sorted (key, field, value, leading)
+        self._counts = Counter()    # (field, value) -> number of books
+        self._terms_by_book = {}    # book id -> ((field, value), ...)
+        # left by update_many for the next lookup to merge in with one sort
+        self._pending = []          # new entries, unsorted
+        self._dropped = set()       # terms whose entries are still in _entries
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = SuggestIndex()
+            LibraryCatalogue.get_instance().register(cls._instance)
+        return cls._instance
+
+    # ------------------------------------------------------------------ maintenance
+
+    def load(self, db: Session):
+        """(Re)build the index from the books table.
+
+        The new index is built aside and swapped in, so lookups keep using
+        the current one meanwhile.
+        """
+        stamp = catalogue_stamp(db)
+        with self._lock:
+            version = self._version
+        counts, terms_by_book = Counter(), {}
+        rows = db.query(
+            models.Book.id, *(getattr(models.Book, f) for f in SUGGEST_FIELDS)
+        ).yield_per(5000)
+        for book_id, *values in rows:
+            terms = self._terms(dict(zip(SUGGEST_FIELDS, values)))
+            terms_by_book[book_id] = terms
+            counts.update(terms)
+        # one sort instead of an insort per entry
+        entries = sorted(entry for field, value in counts for entry in _entries(field, value))
+        with self._lock:
+            self._entries, self._counts, self._terms_by_book = entries, counts, terms_by_book
+            self._pending, self._dropped = [], set()
+            self._stamp = stamp
+            self._loaded = True
+            # an event applied to the old index during the build may be missing: check on next use
+            self._checked_at = time.monotonic() if version == self._version else 0.0
+
+    def ensure_loaded(self, db: Session):
+        """Load on first use; later, once the last check is ``ttl_seconds`` old,
+        rebuild if the books table changed since the index was built."""
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded and self._checked_at + self.ttl_seconds > now:
+                return
+            # one caller checks; the others keep using the current index meanwhile
+            self._checked_at = now
+            loaded, stamp = self._loaded, self._stamp
+        if not loaded or catalogue_stamp(db) != stamp:
+            self.load(db)
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._stamp = None
+            self._checked_at = 0.0
+            self._entries = []
+            self._pending, self._dropped = [], set()
+            self._counts.clear()
+            self._terms_by_book.clear()
+
+    @staticmethod
+    def _terms(book: dict) -> tuple:
+        return tuple((f, book[f].strip()) for f in SUGGEST_FIELDS if book.get(f) and book[f].strip())
+
+    def _add_terms(self, terms, defer: bool):
+        for term in terms:
+            self._counts[term] += 1
+            if self._counts[term] == 1:
+                if defer:
+                    self._pending.extend(_entries(*term))
+                    continue
+                for entry in _entries(*term):
+                    insort(self._entries, entry)
+
+    def _remove_terms(self, terms, defer: bool):
+        for term in terms:
+            self._counts[term] -= 1
+            if self._counts[term] <= 0:
+                del self._counts[term]
+                if defer:
+                    self._dropped.add(term)
+                    continue
+                for entry in _entries(*term):
+                    i = bisect_left(self._entries, entry)
+                    if i < len(self._entries) and self._entries[i] == entry:
+                        del self._entries[i]
+
+    def _apply(self, event_type: str, payload: dict, defer: bool):
+        book_id = payload["id"]
+        if event_type == "book_removed":
+            self._remove_terms(self._terms_by_book.pop(book_id, ()), defer)
+        elif event_type in ("book_added", "book_updated") and "title" in payload:
+            terms = self._terms(payload)
+            old = self._terms_by_book.get(book_id, ())
+            if old == terms:
+                return
+            self._remove_terms(old, defer)
+            self._add_terms(terms, defer)
+            self._terms_by_book[book_id] = terms
+
+    def _merge_pending(self):
+        """Fold the changes left by ``update_many`` into the sorted entries."""
+        if not (self._pending or self._dropped):
+            return
+        entries = self._entries
+        if self._dropped:
+            entries = [e for e in entries if (e[1], e[2]) not in self._dropped]
+        # a term added and dropped again since the last merge has no count left
+        added = {e for e in self._pending if (e[1], e[2]) in self._counts}
+        # two sorted runs: Timsort merges them in linear time
+        entries.extend(sorted(added))
+        entries.sort()
+        self._entries, self._pending, self._dropped = entries, [], set()
+
+    # observer interface
+    def update(self, event_type: str, payload: dict):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._version += 1
+            # in-place edits need the entries sorted; keep deferring until the next lookup merges
+            self._apply(event_type, payload, defer=bool(self._pending or self._dropped))
+
+    def update_many(self, events: list):
+        """Apply a batch of events (a bulk import) without touching the sorted entries.
+
+        A sorted insert per new entry is O(n), which made imports quadratic.
+        The changes are merged in with one sort on the next lookup instead,
+        however many batches arrive before it.
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            self._version += 1
+            for event_type, payload in events:
+                self._apply(event_type, payload, defer=True)
+
+    # ------------------------------------------------------------------ query
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Top ``limit`` completions for ``prefix``.
+
+        Values whose first word matches come before mid-value matches, then
+        the most common values first.
+        """
+        needle = " ".join(words(prefix))
+        if not needle:
+            return []
+        found = {}
+        with self._lock:
+            self._merge_pending()
+            i = bisect_left(self._entries, (needle,))
+            end = min(len(self._entries), i + MAX_SCAN)
+            while i < end:
+                key, field, value, leading = self._entries[i]
+                if not key.startswith(needle):
+                    break
+                found[(field, value)] = found.get((field, value), False) or leading
+                i += 1
+            ranked = sorted(
+                found.items(),
+                key=lambda item: (not item[1], -self._counts[item[0]], item[0][1].lower(), item[0][0]),
+            )
+            return [
+                {"type": field, "value": value, "count": self._counts[(field, value)]}
+                for (field, value), _ in ranked[:limit]
+            ]
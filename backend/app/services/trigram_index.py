@@ -0,0 +1,202 @@
+import threading
+import time
+import unicodedata
+import re
+from collections import defaultdict
+from typing import List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.db import models
+from backend.app.services.catalogue import LibraryCatalogue
+
+SIMILARITY_THRESHOLD = 0.3
+# vocabulary words considered per query word; keeps scoring cost independent of catalogue size
+MAX_WORD_CANDIDATES = 50
+
+
+def normalize(text: str) -> str:
+    """Lower-case and strip accents so "Dostoïevski" and "dostoievski" compare equal."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def words(text: str) -> List[str]:
+    return re.findall(r"[^\W_]+", normalize(text))
+
+
+def catalogue_stamp(db: Session) -> tuple:
+    """``(count, max(updated_at), max(id))`` of the books table; changes on any write to it."""
+    return tuple(db.query(
+        func.count(models.Book.id), func.max(models.Book.updated_at), func.max(models.Book.id)
+    ).one())
+
+
+def trigrams(word: str) -> frozenset:
+    """pg_trgm style trigrams: the word padded with two leading and one trailing space."""
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """In-process trigram index over book titles and authors for typo-tolerant search.
+
+    Used where the database has no trigram support (SQLite). Trigrams index
+    the distinct *words* of the catalogue rather than books, so matching a
+    misspelled word only touches the vocabulary, which grows far slower than
+    the number of titles. Kept in sync through LibraryCatalogue events; at
+    most every ``ttl_seconds`` it also checks the books table and rebuilds if
+    it changed, which picks up writes made by other worker processes.
+    """
+
+    _instance = None
+
+    def __init__(self, ttl_seconds: int = settings.TRIGRAM_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stamp = None        # catalogue_stamp the index was built from
+        self._checked_at = 0.0    # monotonic time of the last staleness check
+        self._version = 0         # bumped by every event applied to the index
+        self._word_trigrams = {}                  # word -> trigram set
+        self._words_by_trigram = defaultdict(set)  # trigram -> words
+        self._books_by_word = defaultdict(set)     # word -> book ids
+        self._words_by_book = {}                   # book id -> words
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = TrigramIndex()
+            LibraryCatalogue.get_instance().register(cls._instance)
+        return cls._instance
+
+    # ------------------------------------------------------------------ maintenance
+
+    def load(self, db: Session):
+        """(Re)build the index from the books table.
+
+        The new index is built aside and swapped in, so searches keep using
+        the current one meanwhile.
+        """
+        stamp = catalogue_stamp(db)
+        with self._lock:
+            version = self._version
+        fresh = TrigramIndex(self.ttl_seconds)
+        rows = db.query(models.Book.id, models.Book.title, models.Book.author).yield_per(5000)
+        for book_id, title, author in rows:
+            fresh._add(book_id, title, author)
+        with self._lock:
+            self._word_trigrams = fresh._word_trigrams
+            self._words_by_trigram = fresh._words_by_trigram
+            self._books_by_word = fresh._books_by_word
+            self._words_by_book = fresh._words_by_book
+            self._stamp = stamp
+            self._loaded = True
+            # an event applied to the old index during the build may be missing: check on next use
+            self._checked_at = time.monotonic() if version == self._version else 0.0
+
+    def ensure_loaded(self, db: Session):
+        """Load on first use; later, once the last check is ``ttl_seconds`` old,
+        rebuild if the books table changed since the index was built."""
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded and self._checked_at + self.ttl_seconds > now:
+                return
+            # one caller checks; the others keep using the current index meanwhile
+            self._checked_at = now
+            loaded, stamp = self._loaded, self._stamp
+        if not loaded or catalogue_stamp(db) != stamp:
+            self.load(db)
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._stamp = None
+            self._checked_at = 0.0
+            self._word_trigrams.clear()
+            self._words_by_trigram.clear()
+            self._books_by_word.clear()
+            self._words_by_book.clear()
+
+    def _add(self, book_id: int, title: str, author: str):
+        book_words = frozenset(words(title) + words(author))
+        self._words_by_book[book_id] = book_words
+        for word in book_words:
+            if word not in self._word_trigrams:
+                grams = trigrams(word)
+                self._word_trigrams[word] = grams
+                for gram in grams:
+                    self._words_by_trigram[gram].add(word)
+            self._books_by_word[word].add(book_id)
+
+    def _remove(self, book_id: int):
+        for word in self._words_by_book.pop(book_id, ()):
+            books = self._books_by_word[word]
+            books.discard(book_id)
+            if not books:
+                # last book using this word: drop it from the vocabulary
+                del self._books_by_word[word]
+                for gram in self._word_trigrams.pop(word):
+                    self._words_by_trigram[gram].discard(word)
+                    if not self._words_by_trigram[gram]:
+                        del self._words_by_trigram[gram]
+
+    # observer interface
+    def update(self, event_type: str, payload: dict):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._version += 1
+            if event_type == "book_removed":
+                self._remove(payload["id"])
+            elif event_type in ("book_added", "book_updated") and "title" in payload:
+                new_words = frozenset(words(payload["title"]) + words(payload.get("author")))
+                if self._words_by_book.get(payload["id"]) == new_words:
+                    return
+                self._remove(payload["id"])
+                self._add(payload["id"], payload["title"], payload.get("author"))
+
+    # ------------------------------------------------------------------ query
+
+    def _similar_words(self, word: str) -> List[Tuple[str, float]]:
+        grams = trigrams(word)
+        counts = defaultdict(int)
+        for gram in grams:
+            for candidate in self._words_by_trigram.get(gram, ()):
+                counts[candidate] += 1
+        # counting shared trigrams through the postings gives Jaccard similarity directly
+        scored = []
+        for candidate, common in counts.items():
+            other = self._word_trigrams[candidate]
+            sim = common / (len(grams) + len(other) - common)
+            if sim >= SIMILARITY_THRESHOLD:
+                scored.append((candidate, sim))
+        scored.sort(key=lambda c: -c[1])
+        return scored[:MAX_WORD_CANDIDATES]
+
+    def search(self, q: str, limit: int = 100) -> List[Tuple[int, float]]:
+        """Return ``(book_id, score)`` pairs, best first.
+
+        A book's score is the mean, over the query words, of the best
+        similarity between that query word and any word of its title or author.
+        """
+        query_words = words(q)
+        if not query_words:
+            return []
+        with self._lock:
+            scores = defaultdict(float)
+            for word in query_words:
+                best = {}
+                for candidate, sim in self._similar_words(word):
+                    for book_id in self._books_by_word.get(candidate, ()):
+                        if sim > best.get(book_id, 0.0):
+                            best[book_id] = sim
+                for book_id, sim in best.items():
+                    scores[book_id] += sim
+
+        n = len(query_words)
+        ranked = [(book_id, total / n) for book_id, total in scores.items() if total / n >= SIMILARITY_THRESHOLD]
+        ranked.sort(key=lambda r: (-r[1], r[0]))
+        return ranked[:limit]
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from backend.app.core.config import settings
+from backend.app.core.security import create_access_token
+from backend.app.crud import user_crud
+from backend.app.db.base import Base
+from backend.app.db import models  # noqa: F401  (registers the tables)
+from backend.app.db import search_index
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.db.session import SessionLocal, engine as app_engine
+from backend.app.services.catalogue import LibraryCatalogue
+from backend.app.services.facet_cache import FacetCache
+from backend.app.services.book_cache import BookCache
+from backend.app.services.trigram_index import TrigramIndex
+from backend.app.services.suggest_index import SuggestIndex
+from backend.app.services.search_cache import SearchCache
+from backend.app.services.notification import NotificationManager
+from backend.app.core.idempotency import IdempotencyStore
+from backend.app.services.cover_variants import VariantCache
+
+
+@pytest.fixture(autouse=True)
+def db():
+    """Point the app at a fresh in-memory database for every test (keeps ./library.db untouched)."""
+    test_engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=test_engine)
+    search_index.install(test_engine)
+    SessionLocal.configure(bind=test_engine)
+
+    catalogue = LibraryCatalogue.get_instance()
+    catalogue.db = SessionLocal()
+    FacetCache.get_instance().invalidate()
+    BookCache.get_instance().clear()
+    TrigramIndex.get_instance().clear()
+    SuggestIndex.get_instance().clear()
+    SearchCache.get_instance().clear()
+    # a fresh manager, so notifications pushed by earlier tests do not leak in
+    NotificationManager._instance = None
+    IdempotencyStore.get_instance().clear()
+    VariantCache.get_instance().clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        catalogue.db.close()
+        SessionLocal.configure(bind=app_engine)
+        test_engine.dispose()
+
+
+@pytest.fixture
+def librarian_headers(db):
+    user_crud.create_user(db, "librarian1", "secret123", role="librarian")
+    token = create_access_token(subject="librarian1", role="librarian")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def add_book(db):
+    """Add a book through the catalogue, so observers see it: ``add_book(title, isbn, author="A", **fields)``."""
+    def add(title, isbn, author="A", **fields):
+        return LibraryCatalogue.get_instance().add_book(BookCreate(title=title, author=author, isbn=isbn, **fields))
+    return add
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    """Serve and store static files (covers, variants) under a temporary directory."""
+    monkeypatch.setattr(settings, "STATIC_DIR", str(tmp_path))
+    return tmp_path
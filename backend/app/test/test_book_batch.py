@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.services.book_cache import BookCache
+
+client = TestClient(app)
+
+
+def test_batch_lookup_by_ids_and_isbns(add_book):
+    a, b, c = add_book("Alpha", "5001"), add_book("Beta", "5002"), add_book("Gamma", "5003")
+    client.get(f"/api/books/{a.id}")  # warm the cache for one of them
+
+    r = client.get("/api/books/batch", params={"ids": f"{a.id},{b.id},999999"})
+    assert r.status_code == 200
+    assert {k: v["title"] for k, v in r.json().items()} == {str(a.id): "Alpha", str(b.id): "Beta"}
+    assert BookCache.get_instance().stats()["hits"] == 1
+
+    r = client.get("/api/books/batch", params=[("isbns", "5003"), ("isbns", "5002"), ("ids", str(a.id))])
+    assert set(r.json()) == {str(a.id), str(b.id), str(c.id)}
+
+    assert client.get("/api/books/batch").json() == {}
+
+
+def test_batch_lookup_normalizes_isbns(add_book):
+    book = add_book("Delta", "978-0-306-40615-7")
+    assert book.isbn == "9780306406157"
+
+    r = client.get("/api/books/batch", params={"isbns": "978-0-306-40615-7"})
+    assert set(r.json()) == {str(book.id)}
+    # the cached path matches too
+    r = client.get("/api/books/batch", params=[("isbns", "978 0306 406157")])
+    assert set(r.json()) == {str(book.id)}
+
+
+def test_batch_lookup_validates_input():
+    assert client.get("/api/books/batch", params={"ids": "1,x"}).status_code == 400
+    too_many = ",".join(str(i) for i in range(501))
+    assert client.get("/api/books/batch", params={"ids": too_many}).status_code == 400
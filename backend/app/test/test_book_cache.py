@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.crud import books_crud, user_crud
+from backend.app.schemas.book_schema import BookCreate, BookUpdate
+from backend.app.services.book_cache import BookCache, CachedBook
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def test_book_detail_is_served_from_cache_until_changed(db):
+    book = LibraryCatalogue.get_instance().add_book(
+        BookCreate(title="Dune", author="Frank Herbert", isbn="4001", total_copies=2)
+    )
+    cache = BookCache.get_instance()
+
+    assert client.get(f"/api/books/{book.id}").json()["title"] == "Dune"
+    assert client.get(f"/api/books/{book.id}").json()["title"] == "Dune"
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+    assert cache.get_by_isbn("4001").payload["id"] == book.id
+
+    books_crud.update_book(db, books_crud.get_book(db, book.id), BookUpdate(title="Dune Messiah"))
+    assert client.get(f"/api/books/{book.id}").json()["title"] == "Dune Messiah"
+
+    user = user_crud.create_user(db, "reader", "secret123")
+    BorrowService(db).borrow(user, book.id)
+    assert client.get(f"/api/books/{book.id}").json()["available_copies"] == 1
+
+    books_crud.delete_book(db, "4001")
+    assert client.get(f"/api/books/{book.id}").status_code == 404
+    assert cache.get_by_isbn("4001") is None
+
+
+def test_cache_is_bounded_and_discards_stale_puts():
+    cache = BookCache(max_entries=2, ttl_seconds=60)
+    for i in range(3):
+        cache.put(CachedBook({"id": i, "isbn": str(i)}))
+    assert cache.get(0) is None and cache.get(2) is not None
+
+    version = cache.version
+    cache.evict(book_id=1)
+    cache.put(CachedBook({"id": 1, "isbn": "1", "title": "stale"}), version)
+    assert cache.get(1) is None
@@ -0,0 +1,183 @@
+import asyncio
+import os
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.app.core.config import settings
+from backend.app.crud import books_crud, cover_crud
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services import covers
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def _image(fmt="PNG", size=(1200, 800), mode="RGBA"):
+    buf = BytesIO()
+    Image.new(mode, size, "teal").save(buf, fmt)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pipeline = covers.CoverPipeline(workers=1, queue_limit=0)
+    monkeypatch.setattr(covers.CoverPipeline, "_instance", pipeline)
+    return pipeline
+
+
+def test_upload_renders_thumbnail_off_the_event_loop(db, librarian_headers, static_dir, pipeline):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9911"))
+    r = client.post(f"/api/books/{book.id}/cover", headers=librarian_headers,
+                    files={"file": ("dune.png", _image(), "image/png")})
+    assert r.status_code == 200
+    thumb = static_dir / r.json()["cover_url"].removeprefix("/static/")
+    with Image.open(thumb) as img:
+        assert (img.format, img.size) == ("JPEG", (300, 200))
+    assert len(os.listdir(static_dir / "covers")) == 1
+
+    stats = client.get("/api/books/covers/stats", headers=librarian_headers).json()
+    assert (stats["completed"], stats["in_flight"], stats["queue_depth"]) == (1, 0, 0)
+    assert stats["stages_ms"]["decode"]["count"] == 1 and stats["stages_ms"]["write"]["count"] == 2
+
+
+def test_invalid_and_busy_uploads_are_refused(db, librarian_headers, static_dir, pipeline):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9912"))
+    url = f"/api/books/{book.id}/cover"
+    r = client.post(url, headers=librarian_headers, files={"file": ("fake.jpg", b"not an image", "image/jpeg")})
+    assert r.status_code == 400
+    r = client.post(url, headers=librarian_headers, files={"file": ("x.png", _image("GIF", mode="P"), "image/png")})
+    assert r.json()["detail"] == "Only JPEG and PNG images are allowed"
+
+    pipeline.in_flight = 1  # the only worker is taken and no queueing is allowed
+    r = client.post(url, headers=librarian_headers, files={"file": ("dune.png", _image(), "image/png")})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert pipeline.stats()["rejected"] == 1
+    assert not (static_dir / "covers").exists()
+
+
+def test_large_jpeg_is_decoded_at_reduced_scale():
+    cover, timings = covers.process_cover(_image("JPEG", (4000, 3000), "RGB"))
+    assert (cover.format, cover.width, cover.height) == ("jpeg", 4000, 3000)
+    with Image.open(BytesIO(cover.thumbnail)) as img:
+        assert img.size == (300, 225)
+    assert set(timings) == {"decode", "resize", "encode"}
+
+
+def test_identical_covers_are_stored_once_and_collected_when_unused(db, librarian_headers, static_dir, pipeline):
+    catalogue = LibraryCatalogue.get_instance()
+    first = catalogue.add_book(BookCreate(title="Dune", author="F", isbn="9913"))
+    second = catalogue.add_book(BookCreate(title="Dune (2nd ed.)", author="F", isbn="9914"))
+    art, other = _image(), _image(size=(640, 480))
+
+    r1 = client.post(f"/api/books/{first.id}/cover", headers=librarian_headers, files={"file": ("a.png", art, "image/png")})
+    r2 = client.post(f"/api/books/{second.id}/cover", headers=librarian_headers, files={"file": ("b.png", art, "image/png")})
+    assert (r1.json()["reused"], r2.json()["reused"]) == (False, True)
+    assert r1.json()["cover_url"] == r2.json()["cover_url"]
+    sha = r1.json()["sha256"]
+    assert sorted(os.listdir(static_dir / "covers" / sha)) == ["original.png", "thumb.jpg"]
+    assert pipeline.stats()["completed"] == 1
+    assert db.get(models.CoverFile, sha).ref_count == 2
+
+    # moving both books to another cover leaves the first one unreferenced
+    for book in (first, second):
+        client.post(f"/api/books/{book.id}/cover", headers=librarian_headers, files={"file": ("c.png", other, "image/png")})
+    db.expire_all()
+    assert db.get(models.CoverFile, sha).ref_count == 0
+
+    # young orphans survive the grace period; old ones are removed
+    assert client.post("/api/books/covers/gc", headers=librarian_headers).json()["removed"] == 0
+    db.get(models.CoverFile, sha).created_at = datetime(2000, 1, 1)
+    db.commit()
+    result = client.post("/api/books/covers/gc", headers=librarian_headers).json()
+    assert (result["removed"], result["referenced"]) == (1, 1)
+    assert os.listdir(static_dir / "covers") != [] and not (static_dir / "covers" / sha).exists()
+
+
+def test_references_from_concurrent_uploads_all_count(db):
+    sha = "cd" * 32
+    other = SessionLocal()
+    try:
+        assert cover_crud.add_reference(other, sha, "png", 10).ref_count == 1
+        other.commit()
+    finally:
+        other.close()
+    # registered by another request meanwhile: counted, not inserted again
+    cover = cover_crud.add_reference(db, sha, "jpeg", 20)
+    db.commit()
+    assert (cover.ref_count, cover.format, cover.size_bytes) == (2, "png", 10)
+
+
+def test_unknown_book_writes_nothing(db, librarian_headers, static_dir, pipeline):
+    r = client.post("/api/books/424242/cover", headers=librarian_headers,
+                    files={"file": ("dune.png", _image(), "image/png")})
+    assert r.status_code == 404
+    assert not (static_dir / "covers").exists() and pipeline.stats()["completed"] == 0
+
+
+def test_oversized_uploads_are_refused_while_arriving(db, librarian_headers, static_dir, pipeline):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9915"))
+    url = f"/api/books/{book.id}/cover"
+    huge = b"\xff\xd8\xff" + b"\0" * (settings.COVER_MAX_UPLOAD_MB * 1024 * 1024 + 64 * 1024)
+
+    # refused from Content-Length alone
+    r = client.post(url, headers=librarian_headers, files={"file": ("big.jpg", huge, "image/jpeg")})
+    assert r.status_code == 413
+
+    # without a Content-Length, refused once the received bytes pass the cap
+    boundary = "cap"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.jpg\"\r\n"
+            "Content-Type: image/jpeg\r\n\r\n").encode()
+    chunks = [head] + [huge[i:i + 65536] for i in range(0, len(huge), 65536)] + [f"\r\n--{boundary}--\r\n".encode()]
+    r = client.post(url, headers={**librarian_headers, "Content-Type": f"multipart/form-data; boundary={boundary}"},
+                    content=iter(chunks))
+    assert r.status_code == 413 and r.json()["detail"].startswith("Request body must be under")
+    assert not (static_dir / "covers").exists() and pipeline.stats()["completed"] == 0
+
+
+def test_read_upload_stops_at_the_cap():
+    async def read(content, max_bytes):
+        return await covers.read_upload(UploadFile(BytesIO(content)), max_bytes)
+
+    png = _image(size=(300, 300))
+    assert asyncio.run(read(png, len(png))) == png
+    with pytest.raises(covers.UploadTooLarge):
+        asyncio.run(read(png, len(png) - 1))
+    with pytest.raises(covers.InvalidImage):
+        asyncio.run(read(b"GIF89a" + png, len(png) * 2))
+
+
+def test_upload_runs_database_and_disk_calls_off_the_event_loop(db, librarian_headers, static_dir, pipeline,
+                                                               monkeypatch):
+    calls = []
+
+    def spy(module, name):
+        fn = getattr(module, name)
+
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                calls.append((name, "event loop"))
+            except RuntimeError:
+                calls.append((name, "thread"))
+            return fn(*args, **kwargs)
+        monkeypatch.setattr(module, name, wrapper)
+
+    for module, name in ((books_crud, "get_book"), (cover_crud, "get_cover_file"),
+                         (cover_crud, "add_reference"), (covers, "is_stored")):
+        spy(module, name)
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9915"))
+    art = _image()
+    for _ in range(2):  # render, then reuse
+        r = client.post(f"/api/books/{book.id}/cover", headers=librarian_headers,
+                        files={"file": ("a.png", art, "image/png")})
+        assert r.status_code == 200
+    assert {name for name, _ in calls} == {"get_book", "get_cover_file", "add_reference", "is_stored"}
+    assert {where for _, where in calls} == {"thread"}
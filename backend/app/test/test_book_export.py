@@ -0,0 +1,45 @@
+import csv
+import gzip
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services import export
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def _seed():
+    catalogue = LibraryCatalogue.get_instance()
+    catalogue.add_book(BookCreate(title="Dune", author="Frank Herbert", isbn="7001", category="Fiction"))
+    catalogue.add_book(BookCreate(title="Cosmos", author="Carl Sagan", isbn="7002", category="Science"))
+    catalogue.add_book(BookCreate(title='Say "Hi", World', author="X", isbn="7003", category="Fiction"))
+
+
+def test_export_ndjson_with_filters(librarian_headers):
+    _seed()
+    r = client.get("/api/books/export", params={"category": "Fiction"}, headers=librarian_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["isbn"] for row in rows] == ["7001", "7003"]
+    assert rows[0]["title"] == "Dune" and rows[0]["available_copies"] == 1
+
+
+def test_export_gzipped_csv_in_chunks(librarian_headers, monkeypatch):
+    _seed()
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 1)
+    r = client.get("/api/books/export", params={"format": "csv", "gzip": "true"}, headers=librarian_headers)
+    assert r.status_code == 200
+    assert 'filename="books.csv.gz"' in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(r.content).decode())))
+    assert [row["title"] for row in rows] == ["Dune", "Cosmos", 'Say "Hi", World']
+    assert rows[0]["subcategory"] == ""
+
+
+def test_export_requires_librarian():
+    assert client.get("/api/books/export").status_code in (401, 403)
@@ -0,0 +1,48 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.crud import books_crud
+from backend.app.schemas.book_schema import BookUpdate
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def _counts(facets, field):
+    return {f["value"]: f["count"] for f in facets[field]}
+
+
+def test_facet_counts_for_catalogue_and_search(add_book):
+    add_book("Dune", "1", category="Fiction", book_format="Paperback", publication_year=1965)
+    add_book("Emma", "2", category="Fiction", book_format="Hardcover", publication_year=1815)
+    add_book("Cosmos", "3", category="Science", book_format="Paperback", shelf="S1")
+
+    facets = client.get("/api/books/facets").json()
+    assert _counts(facets, "category") == {"Fiction": 2, "Science": 1}
+    assert _counts(facets, "book_format") == {"Paperback": 2, "Hardcover": 1}
+    assert _counts(facets, "publication_year") == {1965: 1, 1815: 1}
+    assert _counts(facets, "shelf") == {"S1": 1}
+    assert facets["subcategory"] == []
+
+    facets = client.get("/api/books/facets", params={"q": "dune"}).json()
+    assert _counts(facets, "category") == {"Fiction": 1}
+
+    assert client.get("/api/books/categories").json() == ["Fiction", "Science"]
+
+
+def test_cached_facets_follow_catalogue_writes(db, add_book):
+    catalogue = LibraryCatalogue.get_instance()
+    book = add_book("Dune", "1", category="Fiction")
+    assert _counts(client.get("/api/books/facets").json(), "category") == {"Fiction": 1}
+
+    add_book("Cosmos", "2", category="Science")
+    assert _counts(client.get("/api/books/facets").json(), "category") == {"Fiction": 1, "Science": 1}
+
+    catalogue.update_book(book.id, BookUpdate(category="Classics"))
+    assert _counts(client.get("/api/books/facets").json(), "category") == {"Classics": 1, "Science": 1}
+
+    books_crud.delete_book(db, "2")
+    assert _counts(client.get("/api/books/facets").json(), "category") == {"Classics": 1}
+
+    catalogue.remove_by_isbn("1")
+    assert client.get("/api/books/categories").json() == []
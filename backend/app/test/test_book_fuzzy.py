@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.schemas.book_schema import BookUpdate
+from backend.app.crud import books_crud
+from backend.app.db import models
+from backend.app.services.trigram_index import TrigramIndex
+
+client = TestClient(app)
+
+
+def test_fuzzy_search_tolerates_misspellings(add_book):
+    add_book("Crime and Punishment", "1001", author="Fyodor Dostoevsky", category="Fiction")
+    add_book("The Brothers Karamazov", "1002", author="Fyodor Dostoevsky", category="Classics")
+    add_book("War and Peace", "1003", author="Leo Tolstoy", category="Fiction")
+
+    # the exact-token search misses the transliteration ...
+    assert client.get("/api/books/", params={"q": "Dostoyevsky"}).json()["items"] == []
+
+    # ... the fuzzy one finds it
+    r = client.get("/api/books/", params={"q": "Dostoyevsky", "fuzzy": True})
+    assert r.status_code == 200
+    assert {b["isbn"] for b in r.json()["items"]} == {"1001", "1002"}
+    assert r.json()["next_cursor"] is None
+
+    r = client.get("/api/books/", params={"q": "crme punishmnet", "fuzzy": True})
+    assert [b["isbn"] for b in r.json()["items"]][0] == "1001"
+
+    r = client.get("/api/books/", params={"q": "Dostoyevsky", "fuzzy": True, "category": "Classics"})
+    assert [b["isbn"] for b in r.json()["items"]] == ["1002"]
+
+    r = client.get("/api/books/", params={"q": "Dostoyevsky", "fuzzy": True, "limit": 1})
+    assert len(r.json()["items"]) == 1
+
+
+def test_fuzzy_index_follows_catalogue_events(db, add_book):
+    book = add_book("Old Title", "2001", author="Author")
+    assert [b.isbn for b in books_crud.fuzzy_search_books(db, "olde titel")] == ["2001"]
+
+    books_crud.update_book(db, books_crud.get_book(db, book.id), BookUpdate(title="Moby Dick"))
+    assert books_crud.fuzzy_search_books(db, "olde titel") == []
+    assert [b.isbn for b in books_crud.fuzzy_search_books(db, "moby dik")] == ["2001"]
+
+    add_book("Moby Dick Annotated", "2002", author="Herman Melville")
+    assert {b.isbn for b in books_crud.fuzzy_search_books(db, "moby dik")} == {"2001", "2002"}
+
+    books_crud.delete_book(db, "2001")
+    assert [b.isbn for b in books_crud.fuzzy_search_books(db, "moby dik")] == ["2002"]
+
+
+def test_fuzzy_index_reloads_writes_from_other_workers(db, monkeypatch, add_book):
+    add_book("Old Title", "2101", author="Author")
+    index = TrigramIndex.get_instance()
+    assert [b.isbn for b in books_crud.fuzzy_search_books(db, "olde titel")] == ["2101"]
+
+    # another worker's write: committed to the table, but no event reaches this process
+    db.add(models.Book(title="Moby Dick", author="Herman Melville", isbn="2102"))
+    db.query(models.Book).filter(models.Book.isbn == "2101").delete()
+    db.commit()
+    assert books_crud.fuzzy_search_books(db, "moby dik") == []  # checked again only after the TTL
+
+    monkeypatch.setattr(index, "ttl_seconds", 0)
+    assert [b.isbn for b in books_crud.fuzzy_search_books(db, "moby dik")] == ["2102"]
+    assert books_crud.fuzzy_search_books(db, "olde titel") == []
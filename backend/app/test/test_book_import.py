@@ -0,0 +1,60 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.crud import books_crud
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services.catalogue import LibraryCatalogue
+from backend.app.services.catalogue_import import CatalogueImporter
+
+client = TestClient(app)
+
+CSV = """title,author,isbn,total_copies,category,publication_year
+Dune,Frank Herbert,978-0441013593,2,Fiction,1965
+Emma,Jane Austen,5002,1,,
+Bad Row,Nobody,not-an-isbn,1,,
+Dune,Frank Herbert,9780441013593,3,Classics,
+Existing,Someone,5003,4,,
+"""
+
+
+def test_csv_import_upserts_on_isbn_and_reports_bad_rows(db):
+    LibraryCatalogue.get_instance().add_book(BookCreate(title="Existing", author="Someone", isbn="5003"))
+
+    report = CatalogueImporter(db, batch_size=2).run(CSV.splitlines(keepends=True), "csv")
+
+    assert report["rows"] == 5
+    assert report["errors"] == 1
+    assert report["error_details"][0]["row"] == 4
+    assert "isbn" in report["error_details"][0]["error"]
+    # the two Dune rows land in different batches: one create, then a merge
+    assert (report["created"], report["updated"]) == (2, 2)
+
+    dune = books_crud.get_book_by_isbn(db, "9780441013593")
+    assert (dune.total_copies, dune.available_copies, dune.category) == (5, 5, "Classics")
+    assert dune.publication_year == 1965
+    assert books_crud.get_book_by_isbn(db, "5003").total_copies == 5
+
+
+def test_ndjson_import_endpoint(librarian_headers):
+    rows = [
+        {"title": "Cosmos", "author": "Carl Sagan", "isbn": "6001"},
+        {"title": "Cosmos", "author": "Carl Sagan", "isbn": "6001", "total_copies": 2},
+        "not an object",
+    ]
+    body = "\n".join(json.dumps(r) for r in rows) + "\n{broken\n"
+    r = client.post(
+        "/api/books/import",
+        files={"file": ("books.ndjson", body.encode(), "application/x-ndjson")},
+        headers=librarian_headers,
+    )
+    assert r.status_code == 200
+    report = r.json()
+    assert (report["rows"], report["created"], report["errors"]) == (4, 1, 2)
+    assert report["copies_added"] == 3
+
+    assert [b["isbn"] for b in client.get("/api/books/", params={"q": "cosmos"}).json()["items"]] == ["6001"]
+    assert client.post(
+        "/api/books/import", files={"file": ("books.txt", b"", "text/plain")}, headers=librarian_headers
+    ).status_code == 400
@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.schemas.book_schema import BookUpdate
+from backend.app.crud import books_crud
+
+client = TestClient(app)
+
+
+def test_search_matches_prefixes_and_ranks_by_relevance(add_book):
+    add_book("Crime and Punishment", "1001", author="Fyodor Dostoevsky", category="Fiction")
+    add_book("Notes on Dostoevsky", "1002", author="Someone Else", category="Criticism")
+    add_book("Russian Novels", "1003", author="Various", category="Fiction", subcategory="Dostoevsky studies")
+    add_book("Clean Code", "1004", author="Robert Martin", category="Software")
+
+    r = client.get("/api/books/", params={"q": "dostoev"})
+    assert r.status_code == 200
+    titles = [b["title"] for b in r.json()["items"]]
+    assert set(titles) == {"Crime and Punishment", "Notes on Dostoevsky", "Russian Novels"}
+    # title/author hits outrank a subcategory-only hit
+    assert titles[-1] == "Russian Novels"
+
+    r = client.get("/api/books/", params={"q": "clean cod"})
+    assert [b["isbn"] for b in r.json()["items"]] == ["1004"]
+
+
+def test_index_follows_updates_and_deletes(db, add_book):
+    book = add_book("Old Title", "2001", author="Author")
+    books_crud.update_book(db, books_crud.get_book(db, book.id), BookUpdate(title="Brand New Title"))
+
+    assert books_crud.search_books(db, "old") == []
+    assert [b.isbn for b in books_crud.search_books(db, "brand")] == ["2001"]
+
+    books_crud.delete_book(db, "2001")
+    assert books_crud.search_books(db, "brand") == []
@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.schemas.book_schema import BookUpdate
+from backend.app.services.catalogue import LibraryCatalogue
+from backend.app.crud import books_crud
+from backend.app.db import models
+from backend.app.services.suggest_index import SuggestIndex
+
+client = TestClient(app)
+
+
+def _suggest(prefix, **params):
+    r = client.get("/api/books/suggest", params={"prefix": prefix, **params})
+    assert r.status_code == 200
+    return [(s["type"], s["value"]) for s in r.json()]
+
+
+def test_suggest_completes_titles_authors_and_categories(add_book):
+    add_book("Crime and Punishment", "1001", author="Fyodor Dostoevsky", category="Fiction")
+    add_book("The Brothers Karamazov", "1002", author="Fyodor Dostoevsky", category="Fiction")
+    add_book("Fiction Writing Basics", "1003", author="Jane Doe", category="Reference")
+
+    # leading matches first, then by number of books
+    assert _suggest("fi") == [("category", "Fiction"), ("title", "Fiction Writing Basics")]
+    # completes from the start of any word
+    assert _suggest("pun") == [("title", "Crime and Punishment")]
+    assert _suggest("dost") == [("author", "Fyodor Dostoevsky")]
+    assert client.get("/api/books/suggest", params={"prefix": "dost"}).json()[0]["count"] == 2
+    assert _suggest("fyodor dos") == [("author", "Fyodor Dostoevsky")]
+    assert len(_suggest("f", limit=1)) == 1
+    assert _suggest("zzz") == []
+
+
+def test_suggest_follows_catalogue_events(db, add_book):
+    book = add_book("Old Title", "2001", author="Author", category="Misc")
+    assert _suggest("old") == [("title", "Old Title")]
+
+    books_crud.update_book(db, books_crud.get_book(db, book.id), BookUpdate(title="Moby Dick"))
+    assert _suggest("old") == []
+    assert _suggest("mob") == [("title", "Moby Dick")]
+
+    books_crud.delete_book(db, "2001")
+    assert _suggest("mob") == []
+    assert _suggest("mis") == []
+
+
+def test_suggest_reloads_writes_from_other_workers(db, monkeypatch, add_book):
+    add_book("Moby Dick", "1101", author="Herman Melville")
+    assert _suggest("mob") == [("title", "Moby Dick")]
+
+    # another worker's rename: committed to the table, but no event reaches this process
+    db.query(models.Book).filter(models.Book.isbn == "1101").update({"title": "Mobile Homes"})
+    db.commit()
+    assert _suggest("mob") == [("title", "Moby Dick")]  # checked again only after the TTL
+
+    monkeypatch.setattr(SuggestIndex.get_instance(), "ttl_seconds", 0)
+    assert _suggest("mob") == [("title", "Mobile Homes")]
+
+
+def test_batched_events_match_a_fresh_build(db, add_book):
+    kept = add_book("Old Title", "2101", author="Author", category="Misc")
+    gone = add_book("Gone Girl", "2102", author="Gillian Flynn")
+    assert _suggest("old") == [("title", "Old Title")]
+    index = SuggestIndex.get_instance()
+
+    def event(book_id, title, author, category=None):
+        return {"id": book_id, "isbn": str(book_id), "title": title, "author": author, "category": category}
+
+    LibraryCatalogue.get_instance().notify_many([
+        ("book_added", event(9001, "Moby Dick", "Herman Melville")),
+        ("book_updated", event(kept.id, "Old Man and the Sea", "Author", "Misc")),
+        ("book_removed", {"id": gone.id, "isbn": "2102"}),
+        ("book_added", event(9002, "Temporary", "Nobody")),
+        ("book_removed", {"id": 9002, "isbn": "9002"}),
+        ("book_added", event(9003, "Gone Girl", "Gillian Flynn")),
+    ])
+    assert _suggest("mob") == [("title", "Moby Dick")]
+    assert _suggest("old") == [("title", "Old Man and the Sea")]
+    assert _suggest("tem") == []
+
+    batched = list(index._entries)
+    assert batched == sorted(set(batched))
+    for book_id, title, author in ((9001, "Moby Dick", "Herman Melville"), (9003, "Gone Girl", "Gillian Flynn")):
+        db.add(models.Book(id=book_id, title=title, author=author, isbn=str(book_id)))
+    db.delete(books_crud.get_book(db, gone.id))
+    books_crud.get_book(db, kept.id).title = "Old Man and the Sea"
+    db.commit()
+    index.load(db)
+    assert index._entries == batched
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.security import create_access_token
+from backend.app.crud import user_crud
+from backend.app.db import models
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.notification import NotificationManager
+
+client = TestClient(app)
+
+
+def test_batch_checkout_reports_each_item(db, librarian_headers, add_book):
+    patron = user_crud.create_user(db, "patron", "secret123")
+    dune, emma, gone = add_book("Dune", "9301", total_copies=2), add_book("Emma", "9302"), add_book("Gone", "9303")
+    db.query(models.Book).filter(models.Book.id == gone.id).update({"available_copies": 0})
+    db.commit()
+
+    r = client.post("/api/borrows/batch", headers=librarian_headers,
+                    json={"user_id": patron.id, "book_ids": [dune.id, emma.id, gone.id, 424242, dune.id]})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["borrowed"], body["failed"]) == (3, 2)
+    assert [(i["book_id"], i["ok"], i["error"]) for i in body["items"]] == [
+        (dune.id, True, None), (emma.id, True, None), (gone.id, False, "no copies available"),
+        (424242, False, "book not found"), (dune.id, True, None),
+    ]
+    assert {i["borrow"]["user_id"] for i in body["items"] if i["ok"]} == {patron.id}
+
+    db.expire_all()
+    assert db.get(models.Book, dune.id).available_copies == 0
+    assert db.query(models.Borrow).filter(models.Borrow.user_id == patron.id).count() == 3
+    pushes = [n for n in NotificationManager.get_instance().get_notifications_for_user(patron.id)
+              if n.get("book_ids")]
+    assert [n["book_ids"] for n in pushes] == [[dune.id, emma.id, dune.id]]
+
+
+def test_only_librarians_lend_for_someone_else(db, add_book):
+    student = user_crud.create_user(db, "student", "secret123")
+    other = user_crud.create_user(db, "other", "secret123")
+    book = add_book("Dune", "9304")
+    headers = {"Authorization": f"Bearer {create_access_token(subject='student', role='student')}"}
+
+    r = client.post("/api/borrows/batch", headers=headers, json={"user_id": other.id, "book_ids": [book.id]})
+    assert r.status_code == 403
+    r = client.post("/api/borrows/batch", headers=headers, json={"book_ids": [book.id]})
+    assert r.json()["items"][0]["borrow"]["user_id"] == student.id
+
+
+def test_limit_room_goes_to_items_that_can_be_lent(db, add_book):
+    patron = user_crud.create_user(db, "patron", "secret123")
+    gone, dune, emma = add_book("Gone", "9305"), add_book("Dune", "9306"), add_book("Emma", "9307")
+    db.query(models.Book).filter(models.Book.id == gone.id).update({"available_copies": 0})
+    db.commit()
+    # room for one more loan
+    user = SimpleNamespace(id=patron.id, max_borrow_limit=lambda: 1)
+
+    results = BorrowService(db).borrow_many(user, [gone.id, 424242, dune.id, emma.id])
+    assert [(r["book_id"], r["borrow"] is not None, r["error"]) for r in results] == [
+        (gone.id, False, "no copies available"), (424242, False, "book not found"),
+        (dune.id, True, None), (emma.id, False, "borrow limit reached"),
+    ]
+    db.expire_all()
+    # the copy claimed past the limit was given back
+    assert (db.get(models.Book, dune.id).available_copies, db.get(models.Book, emma.id).available_copies) == (0, 1)
+
+
+def test_free_copies_are_lent_when_more_are_asked(db, add_book):
+    patron = user_crud.create_user(db, "patron", "secret123")
+    dune, emma = add_book("Dune", "9308", total_copies=2), add_book("Emma", "9309", total_copies=3)
+    db.query(models.Book).filter(models.Book.id == dune.id).update({"available_copies": 1})
+    db.commit()
+
+    results = BorrowService(db).borrow_many(patron, [dune.id, emma.id, dune.id, emma.id])
+    assert [(r["book_id"], r["borrow"] is not None, r["error"]) for r in results] == [
+        (dune.id, True, None), (emma.id, True, None),
+        (dune.id, False, "no copies available"), (emma.id, True, None),
+    ]
+    db.expire_all()
+    assert (db.get(models.Book, dune.id).available_copies, db.get(models.Book, emma.id).available_copies) == (0, 1)
@@ -0,0 +1,65 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.security import create_access_token
+from backend.app.crud import user_crud
+from backend.app.db import models
+from backend.app.services import export
+
+client = TestClient(app)
+
+
+def _seed(db):
+    reader = user_crud.create_user(db, "reader", "secret123")
+    dune = models.Book(title="Dune", author="Frank Herbert", isbn="9801", category="Fiction")
+    cosmos = models.Book(title="Cosmos", author="Carl Sagan", isbn="9802", category="Science")
+    db.add_all([dune, cosmos])
+    db.flush()
+    now = datetime(2026, 3, 10, 12, 0)
+    db.add_all([
+        models.Borrow(user_id=reader.id, book_id=dune.id, borrowed_at=now - timedelta(days=40),
+                      due_date=now - timedelta(days=39), returned_at=now - timedelta(days=38), fee_applied=29),
+        models.Borrow(user_id=reader.id, book_id=cosmos.id, borrowed_at=now - timedelta(days=2),
+                      due_date=now - timedelta(days=1)),
+        models.Borrow(user_id=reader.id, book_id=dune.id, borrowed_at=now, due_date=now + timedelta(hours=1)),
+    ])
+    db.commit()
+
+
+def test_export_ndjson_joins_user_and_book(db, librarian_headers):
+    _seed(db)
+    r = client.get("/api/borrows/export", params={"start_date": "2026-03-01"}, headers=librarian_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [(row["title"], row["username"]) for row in rows] == [("Dune", "reader"), ("Cosmos", "reader")]
+    assert rows[0]["borrowed_at"] == "2026-03-10T12:00:00" and rows[0]["returned_at"] is None
+
+    r = client.get("/api/borrows/export", params={"category": "Fiction", "include_returned": "false"},
+                   headers=librarian_headers)
+    assert [json.loads(line)["isbn"] for line in r.text.splitlines()] == ["9801"]
+
+
+def test_export_gzipped_csv_in_chunks(db, librarian_headers, monkeypatch):
+    _seed(db)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 1)
+    r = client.get("/api/borrows/export", params={"format": "csv", "gzip": "true", "category": "Fiction"},
+                   headers=librarian_headers)
+    assert 'filename="borrows.csv.gz"' in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(r.content).decode())))
+    assert [(row["author"], row["fee_applied"], row["returned_at"]) for row in rows] == [
+        ("Frank Herbert", "0", ""), ("Frank Herbert", "29", "2026-01-31T12:00:00"),
+    ]
+
+
+def test_export_is_for_librarians(db, librarian_headers):
+    user_crud.create_user(db, "reader", "secret123")
+    headers = {"Authorization": f"Bearer {create_access_token(subject='reader', role='student')}"}
+    assert client.get("/api/borrows/export", headers=headers).status_code == 403
+    assert client.get("/api/borrows/export?start_date=March", headers=librarian_headers).status_code == 400
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.crud import user_crud
+from backend.app.db import models
+from backend.app.db.base import Base
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.catalogue import LibraryCatalogue
+
+
+def test_checkout_claims_a_copy_and_returns_a_loaded_borrow(db):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9101"))
+    user = user_crud.create_user(db, "reader", "secret123")
+
+    borrow = BorrowService(db).borrow(user, book.id)
+    assert (borrow.book_id, borrow.user_id, borrow.returned_at, borrow.fee_applied) == (book.id, user.id, None, 0)
+    assert borrow.due_date > borrow.borrowed_at.replace(tzinfo=None)
+    db.expire_all()
+    assert db.get(models.Book, book.id).available_copies == 0
+
+    with pytest.raises(ValueError, match="no copies available"):
+        BorrowService(db).borrow(user, book.id)
+    with pytest.raises(ValueError, match="book not found"):
+        BorrowService(db).borrow(user, 424242)
+    assert db.query(models.Borrow).count() == 1
+
+
+def test_parallel_checkouts_never_oversell(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'checkout.db'}",
+                           connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as setup:
+        setup.add(models.Book(id=1, title="Hot", author="A", isbn="9102", total_copies=5, available_copies=5))
+        setup.add_all(models.User(username=f"u{i}", hashed_password="x") for i in range(20))
+        setup.commit()
+
+    results = []
+
+    def checkout(n):
+        with Session() as session:
+            user = session.query(models.User).filter(models.User.username == f"u{n}").one()
+            try:
+                BorrowService(session).borrow(user, 1)
+                results.append("ok")
+            except ValueError:
+                results.append("refused")
+
+    threads = [threading.Thread(target=checkout, args=(n,)) for n in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with Session() as check:
+        assert results.count("ok") == 5 and results.count("refused") == 15
+        assert check.query(models.Borrow).count() == 5
+        assert check.get(models.Book, 1).available_copies == 0
+    engine.dispose()
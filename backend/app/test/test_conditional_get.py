@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.security import create_access_token
+from backend.app.crud import books_crud, user_crud
+from backend.app.schemas.book_schema import BookCreate, BookUpdate
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def _revalidate(path, response, **kwargs):
+    return client.get(path, headers={"If-None-Match": response.headers["etag"], **kwargs.pop("headers", {})}, **kwargs)
+
+
+def test_book_endpoints_answer_304_until_the_data_changes(db):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="8001", category="SF"))
+
+    for path in ("/api/books/", f"/api/books/{book.id}", "/api/books/categories"):
+        first = client.get(path)
+        assert first.status_code == 200 and "last-modified" in first.headers
+        again = _revalidate(path, first)
+        assert again.status_code == 304 and again.content == b""
+        assert again.headers["etag"] == first.headers["etag"]
+
+    first = client.get("/api/books/", params={"q": "dune"})
+    assert _revalidate("/api/books/", first, params={"q": "dune", "limit": 5}).status_code == 200
+
+    detail = client.get(f"/api/books/{book.id}")
+    books_crud.update_book(db, books_crud.get_book(db, book.id), BookUpdate(category="Classics"))
+    changed = _revalidate(f"/api/books/{book.id}", detail)
+    assert changed.status_code == 200 and changed.json()["category"] == "Classics"
+
+
+def test_categories_revalidate_without_an_aggregate_across_checkouts(db, monkeypatch):
+    catalogue = LibraryCatalogue.get_instance()
+    book = catalogue.add_book(BookCreate(title="Dune", author="F", isbn="8003", category="SF"))
+    first = client.get("/api/books/categories")
+    assert first.json() == ["SF"]
+
+    BorrowService(db).borrow(user_crud.create_user(db, "reader", "secret123"), book.id)
+    facet_queries = []
+    monkeypatch.setattr(books_crud, "book_facets", lambda *a, **kw: facet_queries.append(a))
+    assert _revalidate("/api/books/categories", first).status_code == 304
+    assert facet_queries == []
+
+    monkeypatch.undo()
+    catalogue.add_book(BookCreate(title="Emma", author="J", isbn="8004", category="Classics"))
+    changed = _revalidate("/api/books/categories", first)
+    assert changed.status_code == 200 and changed.json() == ["Classics", "SF"]
+
+
+def test_my_borrows_etag_tracks_the_users_loans(db):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="8002"))
+    user = user_crud.create_user(db, "reader", "secret123")
+    headers = {"Authorization": f"Bearer {create_access_token(subject='reader', role='student')}"}
+
+    first = client.get("/api/borrows/me", headers=headers)
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert _revalidate("/api/borrows/me", first, headers=headers).status_code == 304
+
+    BorrowService(db).borrow(user, book.id)
+    changed = _revalidate("/api/borrows/me", first, headers=headers)
+    assert changed.status_code == 200 and len(changed.json()) == 1
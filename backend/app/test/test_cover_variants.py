@@ -0,0 +1,103 @@
+import asyncio
+import os
+from io import BytesIO
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.app.core.config import settings
+from backend.app.services import covers, cover_variants
+
+client = TestClient(app)
+
+
+def _store_original(size=(1200, 1680), shade="teal"):
+    buf = BytesIO()
+    Image.new("RGB", size, shade).save(buf, "JPEG")
+    sha = covers.content_hash(buf.getvalue())
+    os.makedirs(covers.cover_dir(sha))
+    with open(os.path.join(covers.cover_dir(sha), "original.jpg"), "wb") as f:
+        f.write(buf.getvalue())
+    return sha
+
+
+@pytest.fixture(autouse=True)
+def variant_settings(monkeypatch):
+    monkeypatch.setattr(settings, "COVER_VARIANT_SIZES", "80x112,160x224")
+    monkeypatch.setattr(covers.CoverPipeline, "_instance", covers.CoverPipeline(workers=2, queue_limit=8))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = cover_variants.VariantCache()
+    monkeypatch.setattr(cover_variants.VariantCache, "_instance", cache)
+    return cache
+
+
+def test_variant_is_rendered_once_then_served_from_disk(static_dir, cache):
+    sha = _store_original()
+    r = client.get(f"/static/covers/{sha}/160x224.webp")
+    assert r.status_code == 200 and r.headers["content-type"] == "image/webp"
+    assert r.headers["cache-control"] == "public, max-age=31536000, immutable"
+    with Image.open(BytesIO(r.content)) as img:
+        assert (img.format, img.size) == ("WEBP", (160, 224))
+    assert (static_dir / "covers" / sha / "160x224.webp").exists()
+
+    r = client.get(f"/static/covers/{sha}/160x224.webp")
+    assert r.status_code == 200
+    r = client.get(f"/static/covers/{sha}/80x112.jpg")
+    assert r.headers["content-type"] == "image/jpeg"
+    assert (cache.renders, cache.hits) == (2, 1)
+
+
+def test_only_allowed_sizes_of_stored_covers_exist(static_dir, cache):
+    sha = _store_original()
+    assert client.get(f"/static/covers/{sha}/100x100.webp").status_code == 404
+    assert client.get(f"/static/covers/{sha}/160x224.gif").status_code == 404
+    assert client.get(f"/static/covers/{'0' * 64}/160x224.webp").status_code == 404
+    assert client.get("/static/covers/not-a-hash/160x224.webp").status_code == 404
+    assert cache.renders == 0 and not cache.stats()["rendering"]
+
+
+def test_concurrent_requests_share_one_render(static_dir, cache):
+    sha = _store_original()
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get(f"/static/covers/{sha}/80x112.webp") for _ in range(6)))
+
+    responses = asyncio.run(burst())
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.content for r in responses}) == 1
+    assert cache.renders == 1
+
+
+def test_least_recently_served_variants_are_evicted(static_dir, cache):
+    shas = [_store_original(shade=shade) for shade in ("red", "green", "blue")]
+    first = client.get(f"/static/covers/{shas[0]}/80x112.jpg")
+    cache.max_bytes = len(first.content) * 2 + 10
+    cache.grace_seconds = 0
+    client.get(f"/static/covers/{shas[1]}/80x112.jpg")
+    client.get(f"/static/covers/{shas[0]}/80x112.jpg")  # now the most recently served
+    client.get(f"/static/covers/{shas[2]}/80x112.jpg")
+
+    assert cache.evictions == 1
+    assert (static_dir / "covers" / shas[0] / "80x112.jpg").exists()
+    assert not (static_dir / "covers" / shas[1] / "80x112.jpg").exists()
+    assert client.get(f"/static/covers/{shas[1]}/80x112.jpg").status_code == 200
+    assert cache.renders == 4
+
+
+def test_recently_served_variants_are_not_evicted_mid_response(static_dir, cache):
+    shas = [_store_original(shade=shade) for shade in ("red", "green")]
+    cache.max_bytes = 1  # every render is over budget
+    for sha in shas:
+        r = client.get(f"/static/covers/{sha}/80x112.jpg")
+        assert r.status_code == 200 and r.content
+    # both were served within the grace period, so neither was deleted under a reader
+    assert cache.evictions == 0
+    assert all((static_dir / "covers" / sha / "80x112.jpg").exists() for sha in shas)
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.crud import books_crud, user_crud
+from backend.app.db import models
+from backend.app.schemas.book_schema import BookCreate, BookRead
+from backend.app.schemas.borrow_schema import BorrowRead
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def test_book_list_matches_response_model_output(db):
+    LibraryCatalogue.get_instance().add_book(
+        BookCreate(title="Dune", author="Frank Herbert", isbn="7001", publication_year=1965, category="SF")
+    )
+    LibraryCatalogue.get_instance().add_book(BookCreate(title="Emma", author="Jane Austen", isbn="7002"))
+    expected = [
+        BookRead.model_validate(books_crud.get_book_by_isbn(db, isbn)).model_dump(mode="json")
+        for isbn in ("7001", "7002")
+    ]
+
+    r = client.get("/api/books/")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    assert r.json() == {"items": expected, "next_cursor": None}
+    assert client.get("/api/books/", params={"q": "dune"}).json()["items"] == expected[:1]
+
+
+def test_borrow_lists_match_response_model_output(db, librarian_headers):
+    user = user_crud.create_user(db, "reader", "secret123")
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="7003"))
+    now = datetime.utcnow()
+    borrow = models.Borrow(user_id=user.id, book_id=book.id, borrowed_at=now - timedelta(hours=5),
+                           due_date=now - timedelta(hours=3), fee_applied=0)
+    db.add(borrow)
+    db.commit()
+
+    r = client.get("/api/borrows/all", headers=librarian_headers)
+    assert r.json() == [BorrowRead.model_validate(borrow).model_dump(mode="json")]
+
+    [overdue] = client.get("/api/borrows/overdue").json()["items"]
+    assert (overdue["username"], overdue["hours_overdue"], overdue["current_fee"]) == ("reader", 3, 8)
+
+    borrow.fee_applied = 8
+    db.commit()
+    [item] = client.get("/api/payments/all-history", headers=librarian_headers).json()
+    assert (item["book_title"], item["username"], item["fee_applied"]) == ("Dune", "reader", 8.0)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.security import create_access_token
+from backend.app.crud import user_crud
+from backend.app.db import models
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.catalogue import LibraryCatalogue
+
+client = TestClient(app)
+
+
+def _reader(db, name="reader"):
+    user_crud.create_user(db, name, "secret123")
+    return {"Authorization": f"Bearer {create_access_token(subject=name, role='student')}"}
+
+
+def test_retried_checkout_is_replayed_not_rerun(db):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9901", total_copies=3))
+    headers = {**_reader(db), "Idempotency-Key": "k-1"}
+
+    first = client.post("/api/borrows/", json={"book_id": book.id}, headers=headers)
+    retry = client.post("/api/borrows/", json={"book_id": book.id}, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json() and retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert db.query(models.Borrow).count() == 1
+
+    # a fresh key borrows again; a reused key with another body is refused
+    assert client.post("/api/borrows/", json={"book_id": book.id},
+                       headers={**headers, "Idempotency-Key": "k-2"}).status_code == 200
+    assert client.post("/api/borrows/", json={"book_id": 424242}, headers=headers).status_code == 422
+    assert db.query(models.Borrow).count() == 2
+
+
+def test_keys_are_scoped_per_caller_and_errors_replay(db):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9902"))
+    alice, bob = _reader(db, "alice"), _reader(db, "bob")
+
+    assert client.post("/api/borrows/", json={"book_id": book.id},
+                       headers={**alice, "Idempotency-Key": "same"}).status_code == 200
+    r = client.post("/api/borrows/", json={"book_id": book.id}, headers={**bob, "Idempotency-Key": "same"})
+    assert r.status_code == 400 and "Idempotent-Replayed" not in r.headers
+    # the 400 is the final answer for that key, so the retry gets it back
+    r = client.post("/api/borrows/", json={"book_id": book.id}, headers={**bob, "Idempotency-Key": "same"})
+    assert r.status_code == 400 and r.headers["Idempotent-Replayed"] == "true"
+
+
+def test_concurrent_duplicates_run_once(db, monkeypatch):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9903", total_copies=5))
+    headers = {**_reader(db), "Idempotency-Key": "burst"}
+    calls = []
+    original = BorrowService.borrow
+
+    def slow_borrow(self, user, book_id):
+        calls.append(book_id)
+        time.sleep(0.2)  # the duplicates arrive while this one is still running
+        return original(self, user, book_id)
+
+    monkeypatch.setattr(BorrowService, "borrow", slow_borrow)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.post("/api/borrows/", json={"book_id": book.id}, headers=headers) for _ in range(4)
+            ))
+
+    responses = asyncio.run(burst())
+    assert len(calls) == 1
+    assert sorted(r.headers.get("Idempotent-Replayed", "") for r in responses) == ["", "true", "true", "true"]
+    assert len({r.json()["id"] for r in responses}) == 1
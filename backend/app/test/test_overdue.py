@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.pagination import encode_cursor
+from backend.app.crud import borrow_crud, user_crud
+from backend.app.db import models
+
+client = TestClient(app)
+
+
+def _overdue(db, user, book, hours):
+    now = datetime.utcnow()
+    borrow = models.Borrow(user_id=user.id, book_id=book.id, borrowed_at=now - timedelta(days=3),
+                           due_date=now - timedelta(hours=hours))
+    db.add(borrow)
+    db.commit()
+    return borrow
+
+
+def _seed(db):
+    student = user_crud.create_user(db, "student", "secret123", role="student")
+    faculty = user_crud.create_user(db, "faculty", "secret123", role="faculty")
+    fiction = models.Book(title="Dune", author="F", isbn="9701", category="Fiction", total_copies=9, available_copies=9)
+    science = models.Book(title="Cosmos", author="S", isbn="9702", category="Science", total_copies=9, available_copies=9)
+    db.add_all([fiction, science])
+    db.commit()
+    loans = {
+        "s10": _overdue(db, student, fiction, 10.5),
+        "s2": _overdue(db, student, science, 2.5),
+        "f30": _overdue(db, faculty, science, 30.5),
+        "f0": _overdue(db, faculty, fiction, 0.25),
+    }
+    _overdue(db, student, fiction, -4)  # not due yet
+    returned = _overdue(db, faculty, fiction, 50)
+    returned.returned_at = datetime.utcnow()
+    db.commit()
+    return loans
+
+
+def test_overdue_fees_are_computed_and_sorted_in_sql(db):
+    loans = _seed(db)
+
+    body = client.get("/api/borrows/overdue").json()
+    assert [(i["id"], i["hours_overdue"], i["current_fee"]) for i in body["items"]] == [
+        (loans["f30"].id, 30, 35), (loans["s10"].id, 10, 15), (loans["s2"].id, 2, 7), (loans["f0"].id, 1, 6),
+    ]
+    assert (body["total"], body["total_fee"], body["next_cursor"]) == (4, 63, None)
+    assert body["items"][0]["username"] == "faculty"
+
+    body = client.get("/api/borrows/overdue?sort=fee&order=asc").json()
+    assert [i["current_fee"] for i in body["items"]] == [6, 7, 15, 35]
+
+
+def test_overdue_filters_and_cursor_pages_keep_the_totals(db):
+    loans = _seed(db)
+
+    body = client.get("/api/borrows/overdue?role=student").json()
+    assert [i["id"] for i in body["items"]] == [loans["s10"].id, loans["s2"].id]
+    assert (body["total"], body["total_fee"]) == (2, 22)
+    body = client.get("/api/borrows/overdue?category=Science").json()
+    assert [i["id"] for i in body["items"]] == [loans["f30"].id, loans["s2"].id]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/borrows/overdue", params=params).json()
+        assert (body["total"], body["total_fee"]) == (4, 63)
+        seen += [i["id"] for i in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [loans["f30"].id, loans["s10"].id, loans["s2"].id, loans["f0"].id]
+
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "fee", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/borrows/overdue", params=params).json()
+        seen += [i["current_fee"] for i in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [35, 15, 7, 6]
+
+    assert client.get("/api/borrows/overdue?cursor=garbage").status_code == 400
+    for values in ([1, 2, 3], ["2026-01-01T00:00:00", None, 3], ["2026-01-01T00:00:00", "x", 3]):
+        cursor = encode_cursor("overdue-hours", values)
+        assert client.get("/api/borrows/overdue", params={"cursor": cursor}).status_code == 400
+    assert client.get("/api/borrows/overdue?sort=title").status_code == 422
+
+
+def test_whole_hours_overdue_are_not_lost_to_float_rounding(db):
+    user = user_crud.create_user(db, "student", "secret123")
+    book = models.Book(title="Dune", author="F", isbn="9703", total_copies=99, available_copies=99)
+    db.add(book)
+    db.commit()
+    now = datetime(2026, 10, 17, 9, 41, 7, 250000)
+    for hours in range(1, 73):
+        db.add(models.Borrow(user_id=user.id, book_id=book.id, borrowed_at=now - timedelta(days=9),
+                             due_date=now - timedelta(hours=hours)))
+    db.commit()
+
+    rows, _, _, _ = borrow_crud.list_overdue_borrows(db, now=now, limit=100)
+    assert sorted(row.hours_overdue for row in rows) == list(range(1, 73))
+    assert sorted(row.current_fee for row in rows) == [5 + h for h in range(1, 73)]
@@ -0,0 +1,142 @@
+"""Every hot circulation query must be answered from an index.
+
+Each scenario runs real CRUD / service / route code while the SQL it issues
+is captured, then each statement is EXPLAINed with its own parameters. A
+full scan of borrows, reservations or users fails the test. Runs against
+SQLite always, and against PostgreSQL when TEST_POSTGRES_URL is set (with
+sequential scans disabled, since the test tables are tiny).
+"""
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.api.routes import payment as payment_routes
+from backend.app.crud import borrow_crud, reservation_crud
+from backend.app.db import models
+from backend.app.db.base import Base
+from backend.app.db.session import SessionLocal
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.overdue_checker import OverdueChecker
+from backend.app.services.payment import PaymentService
+from backend.app.services.reservation import ReservationService
+
+HOT_TABLES = ("borrows", "reservations", "users")
+
+
+def _seed(s):
+    now = datetime.utcnow()
+    reader = models.User(username="reader", hashed_password="x", role="student")
+    librarian = models.User(username="librarian", hashed_password="x", role="librarian")
+    book = models.Book(title="Dune", author="Herbert", isbn="9601", total_copies=3, available_copies=1)
+    s.add_all([reader, librarian, book])
+    s.flush()
+    s.add_all([
+        models.Borrow(user_id=reader.id, book_id=book.id, borrowed_at=now - timedelta(days=2),
+                      due_date=now - timedelta(hours=5)),
+        models.Borrow(user_id=reader.id, book_id=book.id, borrowed_at=now - timedelta(days=3),
+                      due_date=now - timedelta(days=2), returned_at=now - timedelta(days=1), fee_applied=9),
+        models.Reservation(user_id=librarian.id, book_id=book.id),
+    ])
+    s.commit()
+    return reader, librarian, book
+
+
+SCENARIOS = {
+    "list_user_borrows": lambda s, reader, lib, book: borrow_crud.list_user_borrows(s, reader.id),
+    "user_borrows_version": lambda s, reader, lib, book: borrow_crud.user_borrows_version(s, reader.id),
+    "list_all_borrows": lambda s, reader, lib, book: borrow_crud.list_all_borrows(
+        s, start_date=datetime.utcnow() - timedelta(days=7), end_date=datetime.utcnow()),
+    "open_borrows_for_books": lambda s, reader, lib, book: borrow_crud.open_borrows_for_books(s, {book.id: 1}),
+    "overdue_borrows": lambda s, reader, lib, book: borrow_crud.list_overdue_borrows(s, role="student"),
+    "checkout": lambda s, reader, lib, book: BorrowService(s).borrow(reader, book.id),
+    "list_reservations_for_book": lambda s, reader, lib, book: reservation_crud.list_reservations_for_book(s, book.id),
+    "list_reservations_for_user": lambda s, reader, lib, book: reservation_crud.list_reservations_for_user(s, lib.id),
+    "notify_reservations": lambda s, reader, lib, book: ReservationService(s).notify_available_many([book.id]),
+    "unpaid_fees": lambda s, reader, lib, book: PaymentService(s).get_unpaid_fees(reader.id),
+    "all_payment_summary": lambda s, reader, lib, book: payment_routes.get_all_payment_summary(db=s, current_user=lib),
+    "all_unpaid_fees": lambda s, reader, lib, book: payment_routes.get_all_unpaid_fees(db=s, current_user=lib),
+    "overdue_checker": lambda s, reader, lib, book: OverdueChecker.get_instance().check_now(),
+}
+
+
+@contextmanager
+def _captured(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _sqlite_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    # "SCAN borrows" / "SCAN b USING INDEX ..." are full passes; "SEARCH ..." is an index lookup
+    return [row[-1] for row in plan if re.match(r"SCAN (%s)\b" % "|".join(HOT_TABLES), row[-1])]
+
+
+def _postgres_scans(conn, statement, parameters):
+    [[plan]] = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).all()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    scans, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+
+def _assert_indexed(engine, scenario):
+    Session = sessionmaker(bind=engine, autoflush=False)
+    SessionLocal.configure(bind=engine)  # OverdueChecker and background work open their own sessions
+    with Session() as s:
+        reader, lib, book = _seed(s)
+        with _captured(engine) as statements:
+            SCENARIOS[scenario](s, reader, lib, book)
+        s.rollback()
+
+    assert statements, f"{scenario} issued no queries"
+    explain = _postgres_scans if engine.dialect.name == "postgresql" else _sqlite_scans
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            scans = explain(conn, statement, parameters)
+            assert not scans, f"{scenario} falls back to a full scan: {scans}\n{statement}"
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_sqlite_queries_use_indexes(db, scenario):
+    _assert_indexed(db.get_bind(), scenario)
+
+
+@pytest.fixture
+def postgres_engine():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_postgres_queries_use_indexes(db, postgres_engine, scenario):
+    _assert_indexed(postgres_engine, scenario)
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.security import create_access_token
+from backend.app.crud import user_crud
+from backend.app.db import models
+from backend.app.schemas.book_schema import BookCreate
+from backend.app.services.borrow_books import BorrowService, FeeDecorator
+from backend.app.services.catalogue import LibraryCatalogue
+from backend.app.services.notification import NotificationManager
+
+client = TestClient(app)
+
+
+def _loan(db, user, book, hours_overdue):
+    now = datetime.utcnow()
+    borrow = models.Borrow(user_id=user.id, book_id=book.id, borrowed_at=now - timedelta(days=1),
+                           due_date=now - timedelta(hours=hours_overdue))
+    book.available_copies -= 1
+    db.add(borrow)
+    db.commit()
+    return borrow
+
+
+@pytest.mark.parametrize("hours_overdue, fee, status", [(-2, 0, "unpaid"), (0.25, 6, "unpaid"), (3.5, 8, "unpaid")])
+def test_return_charges_late_fee_in_sql(db, hours_overdue, fee, status):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9201"))
+    user = user_crud.create_user(db, "reader", "secret123")
+    borrow = _loan(db, user, db.get(models.Book, book.id), hours_overdue)
+
+    returned = BorrowService(db).return_book(borrow.id, user.id)
+    assert returned.returned_at is not None
+    assert (returned.fee_applied, returned.payment_status) == (fee, status)
+    db.expire_all()
+    assert db.get(models.Book, book.id).available_copies == 1
+
+    with pytest.raises(ValueError, match="Already returned"):
+        BorrowService(db).return_book(borrow.id, user.id)
+    with pytest.raises(ValueError, match="another user"):
+        BorrowService(db).return_book(borrow.id, user.id + 1)
+    with pytest.raises(ValueError, match="not found"):
+        BorrowService(db).return_book(424242, user.id)
+
+
+def test_return_notifies_reservations_after_responding(db):
+    book = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9202"))
+    reader = user_crud.create_user(db, "reader", "secret123")
+    waiting = [user_crud.create_user(db, f"waiting{i}", "secret123") for i in range(3)]
+    borrow = _loan(db, reader, db.get(models.Book, book.id), -1)
+    db.add_all(models.Reservation(user_id=u.id, book_id=book.id) for u in waiting)
+    db.commit()
+
+    token = create_access_token(subject="reader", role="student")
+    r = client.post(f"/api/borrows/return/{borrow.id}", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200 and r.json()["returned_at"] is not None
+
+    manager = NotificationManager.get_instance()
+    for u in waiting:
+        [note] = [n for n in manager.get_notifications_for_user(u.id) if n["type"] == "book_available"]
+        assert note["book_title"] == "Dune" and note["username"] == u.username
+    assert db.query(models.Reservation).filter(models.Reservation.notified == 0).count() == 0
+
+
+def test_fee_decorator_defers_reservation_notices_too(db):
+    dune = LibraryCatalogue.get_instance().add_book(BookCreate(title="Dune", author="F", isbn="9203", total_copies=2))
+    reader = user_crud.create_user(db, "reader", "secret123")
+    first, second = (_loan(db, reader, db.get(models.Book, dune.id), -1) for _ in range(2))
+    service = FeeDecorator(BorrowService(db))
+
+    tasks = BackgroundTasks()
+    service.return_book(first.id, reader.id, background_tasks=tasks)
+    service.return_many(borrow_ids=[second.id], user_id=reader.id, background_tasks=tasks)
+    assert [(task.func.__name__, task.args) for task in tasks.tasks] == [
+        ("notify_reservations", ([dune.id],)), ("notify_reservations", ([dune.id],)),
+    ]
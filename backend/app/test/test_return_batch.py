@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.core.security import create_access_token
+from backend.app.crud import user_crud
+from backend.app.db import models
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.notification import NotificationManager
+
+client = TestClient(app)
+
+
+def _loan(db, user, book_id, hours_overdue, days_ago=1):
+    now = datetime.utcnow()
+    borrow = models.Borrow(user_id=user.id, book_id=book_id, borrowed_at=now - timedelta(days=days_ago),
+                           due_date=now - timedelta(hours=hours_overdue))
+    db.query(models.Book).filter(models.Book.id == book_id).update(
+        {"available_copies": models.Book.available_copies - 1}
+    )
+    db.add(borrow)
+    db.commit()
+    return borrow
+
+
+def test_batch_return_by_borrow_and_book_ids(db, librarian_headers, add_book):
+    reader = user_crud.create_user(db, "reader", "secret123")
+    waiting = user_crud.create_user(db, "waiting", "secret123")
+    dune, emma = add_book("Dune", "9401", total_copies=2), add_book("Emma", "9402")
+    late = _loan(db, reader, dune.id, 3.5, days_ago=2)
+    older = _loan(db, reader, dune.id, -1, days_ago=3)
+    emma_loan = _loan(db, reader, emma.id, -1)
+    db.add(models.Reservation(user_id=waiting.id, book_id=dune.id))
+    db.commit()
+    manager = NotificationManager.get_instance()
+    seen = len(manager.get_notifications_for_user(waiting.id))
+
+    r = client.post("/api/borrows/return/batch", headers=librarian_headers,
+                    json={"borrow_ids": [late.id, late.id, 424242], "book_ids": [dune.id, emma.id, emma.id]})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["returned"], body["failed"]) == (3, 3)
+    assert [(i["borrow_id"], i["book_id"], i["error"]) for i in body["items"]] == [
+        (late.id, dune.id, None), (late.id, None, "duplicate borrow id"),
+        (424242, None, "Borrow record not found"),
+        (older.id, dune.id, None), (emma_loan.id, emma.id, None),
+        (None, emma.id, "no open borrow for this book"),
+    ]
+    assert (body["items"][0]["borrow"]["fee_applied"], body["items"][3]["borrow"]["fee_applied"]) == (8, 0)
+
+    db.expire_all()
+    assert db.get(models.Book, dune.id).available_copies == 2
+    assert db.get(models.Book, emma.id).available_copies == 1
+    notes = manager.get_notifications_for_user(waiting.id)[seen:]
+    assert [n["type"] for n in notes] == ["book_available"]
+
+
+def test_patrons_only_return_their_own_loans(db, add_book):
+    reader = user_crud.create_user(db, "reader", "secret123")
+    other = user_crud.create_user(db, "other", "secret123")
+    book = add_book("Dune", "9403", total_copies=2)
+    mine, theirs = _loan(db, reader, book.id, -1), _loan(db, other, book.id, -1)
+    headers = {"Authorization": f"Bearer {create_access_token(subject='reader', role='student')}"}
+
+    r = client.post("/api/borrows/return/batch", headers=headers, json={"borrow_ids": [mine.id, theirs.id]})
+    assert [i["error"] for i in r.json()["items"]] == [None, "You cannot return another user's borrow"]
+    r = client.post("/api/borrows/return/batch", headers=headers, json={"book_ids": [book.id]})
+    assert r.json()["items"][0]["error"] == "no open borrow for this book"
+    assert client.post("/api/borrows/return/batch", headers=headers, json={}).status_code == 422
+
+
+def test_five_hundred_returns_in_one_batch(db):
+    users = [user_crud.create_user(db, f"reader{i}", "secret123") for i in range(5)]
+    books = [models.Book(title=f"Book {i}", author="A", isbn=f"95{i:04d}", total_copies=5, available_copies=0)
+             for i in range(100)]
+    db.add_all(books)
+    db.flush()
+    now = datetime.utcnow()
+    db.add_all(models.Borrow(user_id=u.id, book_id=b.id, borrowed_at=now - timedelta(days=1),
+                             due_date=now - timedelta(hours=2)) for b in books for u in users)
+    db.commit()
+
+    started = time.perf_counter()
+    results = BorrowService(db).return_many(book_ids=[b.id for b in books for _ in users])
+    elapsed = time.perf_counter() - started
+
+    assert all(r["borrow"] is not None for r in results) and len(results) == 500
+    assert db.query(models.Book).filter(models.Book.available_copies != 5).count() == 0
+    assert elapsed < 1.0
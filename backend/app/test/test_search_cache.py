@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.app.crud import books_crud, user_crud
+from backend.app.schemas.book_schema import BookUpdate
+from backend.app.services.borrow_books import BorrowService
+from backend.app.services.search_cache import CachedSearch, SearchCache
+
+client = TestClient(app)
+
+
+def test_repeated_searches_are_served_from_cache(db, librarian_headers, add_book):
+    dune = add_book("Dune", "9001", category="SF", total_copies=2)
+    cache = SearchCache.get_instance()
+
+    first = client.get("/api/books/", params={"q": "Dune", "category": "SF"})
+    again = client.get("/api/books/", params={"q": "  dune ", "category": "SF"})
+    assert again.json() == first.json()
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+    # availability changes keep the entry but the copy counts stay current
+    BorrowService(db).borrow(user_crud.create_user(db, "reader", "secret123"), dune.id)
+    [book] = client.get("/api/books/", params={"q": "dune", "category": "SF"}).json()["items"]
+    assert book["available_copies"] == 1
+    assert cache.stats()["hits"] == 2
+
+    # catalogue writes invalidate
+    add_book("Dune Messiah", "9002", category="SF")
+    titles = [b["title"] for b in client.get("/api/books/", params={"q": "dune", "category": "SF"}).json()["items"]]
+    assert titles == ["Dune", "Dune Messiah"]
+    books_crud.update_book(db, books_crud.get_book(db, dune.id), BookUpdate(category="Classics"))
+    titles = [b["title"] for b in client.get("/api/books/", params={"q": "dune", "category": "SF"}).json()["items"]]
+    assert titles == ["Dune Messiah"]
+
+    stats = client.get("/api/books/cache/stats", headers=librarian_headers).json()["search"]
+    assert stats["invalidations"] == 2 and stats["size"] == 1
+
+
+def test_cache_is_bounded_and_discards_stale_puts():
+    cache = SearchCache(max_entries=2, ttl_seconds=60)
+    for i in range(3):
+        cache.put(SearchCache.key(q=str(i)), CachedSearch([i]))
+    assert cache.get(SearchCache.key(q="0")) is None
+    assert cache.get(SearchCache.key(q="2")).ids == [2]
+
+    version = cache.version
+    cache.invalidate()
+    cache.put(SearchCache.key(q="3"), CachedSearch([3]), version)
+    assert cache.get(SearchCache.key(q="3")) is None
@@ -0,0 +1,67 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.core.static_files import CachedStaticFiles
+
+SHA = "ab" * 32
+CSS = b"body { color: teal; }\n" * 50
+
+
+@pytest.fixture(autouse=True)
+def sample_files(static_dir):
+    (static_dir / "covers" / SHA).mkdir(parents=True)
+    (static_dir / "covers" / SHA / "thumb.jpg").write_bytes(b"\xff\xd8\xff thumb")
+    (static_dir / "covers" / "legacy.jpg").write_bytes(b"\xff\xd8\xff legacy")
+    (static_dir / "app.css").write_bytes(CSS)
+    (static_dir / "app.css.gz").write_bytes(gzip.compress(CSS))
+    (static_dir / "app.css.br").write_bytes(b"not checked here")
+
+
+def _client(static_dir, **kwargs):
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=str(static_dir), **kwargs), name="static")
+    return TestClient(app)
+
+
+def test_content_addressed_covers_are_immutable(static_dir):
+    client = _client(static_dir)
+    r = client.get(f"/static/covers/{SHA}/thumb.jpg")
+    assert r.status_code == 200 and r.content == b"\xff\xd8\xff thumb"
+    assert r.headers["cache-control"] == "public, max-age=31536000, immutable"
+    etag = r.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    r = client.get(f"/static/covers/{SHA}/thumb.jpg", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.headers["cache-control"].endswith("immutable")
+
+    r = client.get("/static/covers/legacy.jpg")
+    assert r.headers["cache-control"] == "no-cache"
+    assert client.get("/static/covers/legacy.jpg", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+
+def test_precompressed_siblings_are_sent_when_accepted(static_dir):
+    client = _client(static_dir)
+    r = client.get("/static/app.css", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["content-type"].startswith("text/css") and r.headers["vary"] == "Accept-Encoding"
+    assert r.content == CSS  # decoded by the client
+    assert int(r.headers["content-length"]) == (static_dir / "app.css.gz").stat().st_size
+
+    r = client.get("/static/app.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers and r.content == CSS
+    assert r.headers["vary"] == "Accept-Encoding"
+
+
+def test_accel_mode_leaves_the_bytes_to_nginx(static_dir):
+    client = _client(static_dir, accel_prefix="/protected-static/")
+    r = client.get(f"/static/covers/{SHA}/thumb.jpg")
+    assert r.status_code == 200 and r.content == b""
+    assert r.headers["x-accel-redirect"] == f"/protected-static/covers/{SHA}/thumb.jpg"
+    assert r.headers["content-type"] == "image/jpeg" and r.headers["cache-control"].endswith("immutable")
+
+    r = client.get("/static/app.css", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["x-accel-redirect"] == "/protected-static/app.css" and "content-encoding" not in r.headers
+    assert client.get("/static/missing.css").status_code == 404
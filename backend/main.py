@@ -1,12 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.background import BackgroundTasks
-from fastapi.staticfiles import StaticFiles
 import os
 
 from backend.app.core.config import settings
+from backend.app.core.idempotency import IdempotencyMiddleware, REPLAYED_HEADER
+from backend.app.core.static_files import CachedStaticFiles
+from backend.app.core.body_limit import BodySizeLimitMiddleware, MULTIPART_OVERHEAD
 from backend.app.db.session import engine, SessionLocal
 from backend.app.db import base  # import to ensure models are registered
+from backend.app.db import search_index
 from backend.app.api.routes import auth as routes_auth
 from backend.app.api.routes import user as routes_users
 from backend.app.api.routes import books as routes_books
@@ -14,11 +17,22 @@ from backend.app.api.routes import borrow as routes_borrow
 from backend.app.api.routes import reservations as routes_reservations
 from backend.app.api.routes import notifications as routes_notifications
 from backend.app.api.routes import payment as routes_payment
+from backend.app.api.routes import static_covers as routes_static_covers
 from backend.app.services.notification import NotificationManager
 from backend.app.services.overdue_checker import OverdueChecker
+from backend.app.services.suggest_index import SuggestIndex
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+# refuse oversized cover uploads while they arrive, not after they were spooled
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={r"/api/books/[^/]+/cover": settings.COVER_MAX_UPLOAD_MB * 1024 * 1024 + MULTIPART_OVERHEAD},
+)
+
+# replay stored responses for retried writes (added before CORS so replays get CORS headers too)
+app.add_middleware(IdempotencyMiddleware)
+
 # CORS (dev friendly)
 app.add_middleware(
     CORSMiddleware,
@@ -26,12 +40,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REPLAYED_HEADER],
 )
 
 @app.on_event("startup")
 def on_startup():
     # create tables for quick demo (use alembic in prod)
     base.Base.metadata.create_all(bind=engine)
+    # full-text index over books (FTS5 / tsvector), kept in sync by the database
+    search_index.install(engine)
+    # autocomplete prefix index, kept current by catalogue events afterwards
+    db = SessionLocal()
+    try:
+        SuggestIndex.get_instance().load(db)
+    finally:
+        db.close()
     # start notification manager background worker
     NotificationManager.get_instance().start_worker()
     # start overdue checker background worker
@@ -51,10 +74,17 @@ app.include_router(routes_reservations.router, prefix="/api/reservations", tags=
 app.include_router(routes_notifications.router, prefix="/api/notifications", tags=["notifications"])
 app.include_router(routes_payment.router, prefix="/api/payments", tags=["payments"])
 
-# serve static files (covers/uploads)
-static_dir = os.path.join(os.path.dirname(__file__), "static")
+# resized cover variants, rendered on demand; must come before the /static mount
+app.include_router(routes_static_covers.router, prefix="/static", tags=["static"])
+
+# serve static files (covers/uploads); content-addressed covers are cached as immutable
+static_dir = settings.STATIC_DIR
 os.makedirs(static_dir, exist_ok=True)
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount(
+    "/static",
+    CachedStaticFiles(directory=static_dir, accel_prefix=settings.STATIC_ACCEL_PREFIX or None),
+    name="static",
+)
 
 @app.get("/healthz")
 def health():
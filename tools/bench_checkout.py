@@ -0,0 +1,145 @@
+"""Benchmark concurrent checkouts and check that no copies are oversold.
+
+Usage:
+    python tools/bench_checkout.py [--threads 16] [--books 20] [--copies 5] [--attempts 400]
+                                   [--database-url sqlite:////tmp/bench.db]
+
+Every thread repeatedly tries to check out a random book. The run is done
+twice against a fresh database: once with the previous read-modify-write
+checkout (three commits, copies decremented in Python) and once with
+BorrowService.borrow. For each it reports throughput and compares the
+number of borrow rows with the copies that existed.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, func  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.app.db.base import Base  # noqa: E402
+from backend.app.db import models  # noqa: E402
+from backend.app.crud.borrow_crud import BORROW_HOURS_DEFAULT  # noqa: E402
+from backend.app.services.borrow_books import BorrowService  # noqa: E402
+
+
+def legacy_borrow(db, user, book_id):
+    """The checkout as it was before the single-statement rewrite."""
+    book = db.query(models.Book).filter(models.Book.id == book_id).first()
+    if not book:
+        raise ValueError("book not found")
+    if int(book.available_copies) <= 0:
+        raise ValueError("no copies available")
+    db.query(models.Borrow).filter(models.Borrow.user_id == user.id, models.Borrow.returned_at.is_(None)).count()
+    book.available_copies -= 1
+    db.add(book)
+    db.commit()
+    borrow = models.Borrow(user_id=user.id, book_id=book_id,
+                           due_date=datetime.utcnow() + timedelta(hours=BORROW_HOURS_DEFAULT))
+    db.add(borrow)
+    db.commit()
+    db.refresh(borrow)
+    return borrow
+
+
+def service_borrow(db, user, book_id):
+    return BorrowService(db).borrow(user, book_id)
+
+
+def _setup(url, books, copies, threads):
+    engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add_all(models.User(username=f"bench{i}", hashed_password="x") for i in range(threads))
+        db.add_all(
+            models.Book(title=f"Book {i}", author="Bench", isbn=f"99{i:06d}",
+                        total_copies=copies, available_copies=copies)
+            for i in range(books)
+        )
+        db.commit()
+    return engine, Session
+
+
+def run(checkout, url, threads, books, copies, attempts):
+    engine, Session = _setup(url, books, copies, threads)
+    ok = [0] * threads
+    errors = [0] * threads
+
+    def worker(n):
+        rnd = random.Random(n)
+        with Session() as db:
+            user = db.query(models.User).filter(models.User.username == f"bench{n}").one()
+            for _ in range(attempts // threads):
+                try:
+                    checkout(db, user, rnd.randint(1, books))
+                    ok[n] += 1
+                except ValueError:
+                    db.rollback()
+                except Exception:
+                    # e.g. "database is locked" under write contention
+                    db.rollback()
+                    errors[n] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with Session() as db:
+        borrows = db.query(func.count(models.Borrow.id)).scalar()
+        negative = db.query(func.count(models.Book.id)).filter(models.Book.available_copies < 0).scalar()
+    engine.dispose()
+    return {
+        "checkouts": sum(ok),
+        "errors": sum(errors),
+        "seconds": elapsed,
+        "attempts_per_second": (attempts // threads * threads) / elapsed,
+        "borrow_rows": borrows,
+        "copies": books * copies,
+        "oversold": max(0, borrows - books * copies),
+        "negative_stock_books": negative,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=5)
+    parser.add_argument("--attempts", type=int, default=400, help="total checkout attempts per run")
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    args = parser.parse_args(argv)
+
+    url = args.database_url
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_checkout_"), "bench.db")
+
+    failed = False
+    for name, checkout in (("legacy", legacy_borrow), ("atomic", service_borrow)):
+        r = run(checkout, url, args.threads, args.books, args.copies, args.attempts)
+        print(
+            f"{name:>7}: {r['attempts_per_second']:8.1f} attempts/s | {r['checkouts']} checkouts | "
+            f"{r['borrow_rows']}/{r['copies']} copies lent | oversold {r['oversold']} | "
+            f"{r['errors']} errors"
+        )
+        if name == "atomic" and (r["oversold"] or r["negative_stock_books"]):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
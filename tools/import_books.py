@@ -0,0 +1,59 @@
+"""Bulk-load a CSV or NDJSON acquisition file into the catalogue.
+
+Usage:
+    python tools/import_books.py books.csv [--format csv|ndjson] [--batch-size 500]
+
+Files ending in .gz are decompressed on the fly. Rows are upserted on ISBN
+the same way as POST /api/books/import.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.app.db.base import Base  # noqa: E402
+from backend.app.db import models  # noqa: E402,F401
+from backend.app.db import search_index  # noqa: E402
+from backend.app.db.session import SessionLocal, engine  # noqa: E402
+from backend.app.services.catalogue_import import CatalogueImporter, DEFAULT_BATCH_SIZE  # noqa: E402
+
+
+def _progress(report):
+    print(
+        f"  {report['rows']:>9} rows | {report['created']} created | {report['updated']} updated | "
+        f"{report['errors']} errors | {report['rows_per_second'] or 0:.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    name = args.path[:-3] if args.path.endswith(".gz") else args.path
+    fmt = args.format or ("csv" if name.endswith(".csv") else "ndjson")
+    opener = gzip.open if args.path.endswith(".gz") else open
+
+    Base.metadata.create_all(bind=engine)
+    search_index.install(engine)
+    db = SessionLocal()
+    try:
+        with opener(args.path, "rt", encoding="utf-8-sig", newline="") as fh:
+            report = CatalogueImporter(db, batch_size=args.batch_size, progress=_progress).run(fh, fmt)
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())